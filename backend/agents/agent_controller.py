@@ -1,12 +1,166 @@
-from agents.explanation_service import generate_explanation
-from agents.agent_recommendation import generate_recommendations
+import os
+import time
+from concurrent.futures import as_completed, TimeoutError as FutureTimeout
+from agents import explanation_service, agent_recommendation
+from agents.explanation_service import cached_explanation, explanation_prompt, parse_explanation, template_explanation
+from agents.agent_recommendation import (
+    cached_recommendations,
+    recommendations_prompt,
+    parse_recommendations,
+    template_recommendations
+)
+from agents.llm_cache import bucket_risk_score
+from agents.llm_guard import deadline_for, submit_llm_call, await_llm_call, settle_llm_call
+from services.cache import TTLCache
 
-def agent_pipeline(prediction):
+# LLM output depends only on these prediction fields, so repeat
+# predictions (e.g. the same hotspot) reuse the previous answer
+agent_cache = TTLCache(
+    "agent",
+    maxsize=int(os.environ.get("AGENT_CACHE_SIZE", 1024)),
+    ttl=float(os.environ.get("AGENT_CACHE_TTL", 3600))
+)
 
-    explanation = generate_explanation(prediction)
-    recommendation = generate_recommendations(prediction)
 
-    prediction["explanation"] = explanation
-    prediction["recommendation"] = recommendation
+def agent_cache_key(prediction):
+    return (
+        prediction["risk_level"],
+        bucket_risk_score(prediction["risk_score"]),
+        tuple(prediction["top_factors"])
+    )
+
+
+# Per agent: persistent-cache lookup, chat model, prompt builder, output
+# parser (caches valid JSON, None for anything else) and template
+# fallback. Only the model call itself runs under the circuit breaker
+# and latency budget.
+AGENTS = {
+    "explanation": {
+        "cached": cached_explanation,
+        "llm": explanation_service.llm,
+        "prompt": explanation_prompt,
+        "parse": parse_explanation,
+        "template": template_explanation
+    },
+    "recommendation": {
+        "cached": cached_recommendations,
+        "llm": agent_recommendation.llm,
+        "prompt": recommendations_prompt,
+        "parse": parse_recommendations,
+        "template": template_recommendations
+    }
+}
+
+
+def iter_agent_outputs(prediction, endpoint="predict"):
+    """
+    Runs the explanation and recommendation LLM calls concurrently under
+    the endpoint's latency budget and yields (name, output, ok) as each one
+    finishes, so latency is roughly the slower of the two rather than their
+    sum. Persistent-cache hits are served without touching the breaker;
+    anything over budget (or refused by the circuit breaker) is replaced
+    by its template.
+    """
+
+    deadline = deadline_for(endpoint)
+
+    futures = {}
+    settled = set()
+    try:
+        for name, agent in AGENTS.items():
+            cached = agent["cached"](prediction)
+            if cached is not None:
+                yield name, cached, True
+                continue
+
+            future = submit_llm_call(agent["llm"].invoke, agent["prompt"](prediction))
+            if future is None:
+                yield name, agent["template"](prediction), False
+            else:
+                futures[future] = name
+
+        try:
+            for future in as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+                name = futures[future]
+                response, ok = await_llm_call(future, deadline, name.capitalize())
+                settled.add(future)
+                # Non-JSON output is served as the template, never cached
+                output = AGENTS[name]["parse"](prediction, response.content) if ok else None
+                if output is not None:
+                    yield name, output, True
+                else:
+                    yield name, AGENTS[name]["template"](prediction), False
+        except FutureTimeout:
+            pass
+
+        # Over budget: record the timeouts and serve templates
+        for future, name in futures.items():
+            if future not in settled:
+                await_llm_call(future, deadline, name.capitalize())
+                settled.add(future)
+                yield name, AGENTS[name]["template"](prediction), False
+    finally:
+        # Consumer gone (e.g. /predict/stream client disconnected): calls
+        # nobody awaited still report to the breaker
+        for future in futures:
+            if future not in settled:
+                settle_llm_call(future)
+
+
+def run_agents(prediction, endpoint="predict"):
+
+    outputs = {}
+    complete = True
+
+    for name, output, ok in iter_agent_outputs(prediction, endpoint):
+        outputs[name] = output
+        complete = complete and ok
+
+    return outputs, complete
+
+
+def agent_pipeline(prediction, endpoint="predict"):
+
+    key = agent_cache_key(prediction)
+    cached = agent_cache.get(key)
+
+    if cached is None:
+        cached, complete = run_agents(prediction, endpoint)
+
+        # Never pin a fallback answer in the cache
+        if complete:
+            agent_cache.set(key, cached)
+
+    prediction["explanation"] = cached["explanation"]
+    prediction["recommendation"] = cached["recommendation"]
 
     return prediction
+
+
+def stream_agent_pipeline(prediction, endpoint="predict"):
+    """
+    Streaming variant of agent_pipeline: yields ("explanation" |
+    "recommendation", output) as soon as each is available and leaves
+    the prediction populated exactly like agent_pipeline does
+    """
+
+    key = agent_cache_key(prediction)
+    cached = agent_cache.get(key)
+
+    if cached is None:
+        cached = {}
+        complete = True
+
+        for name, output, ok in iter_agent_outputs(prediction, endpoint):
+            cached[name] = output
+            complete = complete and ok
+            yield name, output
+
+        if complete:
+            agent_cache.set(key, cached)
+    else:
+        for name in AGENTS:
+            yield name, cached[name]
+
+    prediction["explanation"] = cached["explanation"]
+    prediction["recommendation"] = cached["recommendation"]
@@ -1,6 +1,8 @@
 from langchain_groq import ChatGroq
 import os
 import json
+from agents.llm_cache import llm_cache, llm_cache_key, bucket_risk_score
+from agents.llm_guard import LLM_REQUEST_TIMEOUT
 
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 
@@ -8,21 +10,78 @@ llm = ChatGroq(
     model="llama-3.3-70b-versatile",
     api_key=GROQ_API_KEY,
     temperature=0.1,
-    max_tokens=250
+    max_tokens=250,
+    timeout=LLM_REQUEST_TIMEOUT
 )
 
 
-def generate_recommendations(prediction):
+# ---------------------------------------------------
+# Template recommendations (LLM over budget / unavailable)
+# ---------------------------------------------------
+FACTOR_ACTIONS = {
+    "Speed_limit": "Review the posted speed limit and add speed cameras or traffic calming.",
+    "Light_Conditions": "Upgrade street lighting along this stretch.",
+    "Weather_Conditions": "Install weather-activated warning signs and variable speed limits.",
+    "Road_Surface_Conditions": "Resurface and improve drainage to keep the carriageway dry and skid-resistant.",
+    "Junction_Detail": "Redesign the junction layout to reduce conflict points.",
+    "Junction_Control": "Upgrade junction control with signals or a roundabout.",
+    "Pedestrian_Crossing-Human_Control": "Provide staffed or signal-controlled pedestrian crossings.",
+    "Pedestrian_Crossing-Physical_Facilities": "Add or upgrade signalised pedestrian crossings.",
+    "Carriageway_Hazards": "Schedule regular inspections to clear carriageway hazards.",
+    "Special_Conditions_at_Site": "Fix faulty signals, signage and road markings at the site.",
+    "Road_Type": "Add central barriers or lane separation suited to this road type.",
+    "Urban_or_Rural_Area": "Add rural-road warning signs and rumble strips on approach.",
+    "1st_Road_Class": "Apply route-level safety treatment on this class of road.",
+    "2nd_Road_Class": "Improve sightlines and priority signage where the secondary road joins.",
+    "Number_of_Vehicles": "Add lane markings and advance warning signs to reduce multi-vehicle conflicts.",
+    "Hour": "Increase enforcement and signal timing adjustments during peak-risk hours.",
+    "Day_of_Week": "Target enforcement on the highest-risk days of the week.",
+    "Month": "Run seasonal maintenance ahead of the highest-risk months.",
+}
+
+DEFAULT_ACTIONS = [
+    "Install high-visibility warning signage on approach to this location.",
+    "Add road markings and delineators to improve lane guidance.",
+    "Deploy speed enforcement at this location."
+]
+
+
+def template_recommendations(prediction):
     """
-    AI-based recommendation generator using SHAP factors.
-    Produces structured, short, actionable outputs.
+    Deterministic recommendations mapped from the SHAP factors
+    """
+
+    actions = []
+    for factor in prediction["top_factors"]:
+        action = FACTOR_ACTIONS.get(factor)
+        if action and action not in actions:
+            actions.append(action)
+
+    for action in DEFAULT_ACTIONS:
+        if len(actions) >= 3:
+            break
+        if action not in actions:
+            actions.append(action)
+
+    return {
+        "recommended_actions": actions[:3]
+    }
+
+
+def cached_recommendations(prediction):
+    """
+    Recommendations from the persistent LLM cache, or None
     """
+    return llm_cache.get(llm_cache_key("recommendation", prediction))
+
+
+def recommendations_prompt(prediction):
 
     risk_level = prediction["risk_level"]
-    risk_score = prediction["risk_score"]
+    risk_score = bucket_risk_score(prediction["risk_score"])
     top_factors = prediction["top_factors"]
 
-    prompt = f"""
+    return f"""
 You are an intelligent traffic safety planning assistant.
 
 Context:
@@ -49,14 +108,32 @@ Return output strictly in JSON format:
 }}
 """
 
-    response = llm.invoke(prompt)
 
-    # Convert LLM output → JSON safely
+def parse_recommendations(prediction, content):
+    """
+    LLM output string → recommendations dict, or None when it isn't JSON;
+    only valid JSON is cached
+    """
+
     try:
-        return json.loads(response.content)
-    except:
-        return {
-            "recommended_actions": [
-                response.content
-            ]
-        }
+        recommendations = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+
+    llm_cache.set(llm_cache_key("recommendation", prediction), "recommendation", recommendations)
+    return recommendations
+
+
+def generate_recommendations(prediction):
+    """
+    AI-based recommendation generator using SHAP factors.
+    Produces structured, short, actionable outputs.
+    """
+
+    cached = cached_recommendations(prediction)
+    if cached is not None:
+        return cached
+
+    response = llm.invoke(recommendations_prompt(prediction))
+    recommendations = parse_recommendations(prediction, response.content)
+    return recommendations if recommendations is not None else template_recommendations(prediction)
@@ -5,23 +5,60 @@ load_dotenv()
 from langchain_groq import ChatGroq
 import os
 import json
+from agents.llm_cache import llm_cache, llm_cache_key, bucket_risk_score
+from agents.llm_guard import LLM_REQUEST_TIMEOUT
 
 llm = ChatGroq(
     model="llama-3.3-70b-versatile",
     api_key=os.environ.get("GROQ_API_KEY"),
     temperature=0.1,
-    max_tokens=250
+    max_tokens=250,
+    timeout=LLM_REQUEST_TIMEOUT
 )
 
 
-def generate_explanation(prediction):
+def readable_factor(feature):
+    return feature.replace("_", " ").replace("(", "").replace(")", "").lower()
+
+
+def template_explanation(prediction):
+    """
+    Deterministic SHAP-based explanation, served when the LLM is
+    over budget or the circuit breaker is open
+    """
+
+    drivers = prediction["top_factors"][:3]
+    names = [readable_factor(f) for f in drivers]
+
+    if len(names) > 1:
+        factor_text = ", ".join(names[:-1]) + f" and {names[-1]}"
+    else:
+        factor_text = names[0] if names else "no single dominant factor"
+
+    return {
+        "risk_summary": (
+            f"The model rates this scenario as {prediction['risk_level']} risk "
+            f"({float(prediction['risk_score']):.0%} confidence). "
+            f"The strongest contributing factors are {factor_text}."
+        ),
+        "primary_drivers": drivers
+    }
+
+
+def cached_explanation(prediction):
+    """
+    Explanation from the persistent LLM cache, or None
+    """
+    return llm_cache.get(llm_cache_key("explanation", prediction))
 
-    prompt = f"""
+
+def explanation_prompt(prediction):
+    return f"""
 You are an AI road safety analysis system.
 
 Context:
 - Accident Risk Level: {prediction['risk_level']}
-- Risk Score: {prediction['risk_score']}
+- Risk Score: {bucket_risk_score(prediction['risk_score'])}
 - Model Identified Risk Drivers: {prediction['top_factors']}
 
 Instructions:
@@ -40,13 +77,28 @@ Return output strictly in JSON format:
 }}
 """
 
-    response = llm.invoke(prompt)
 
-    # Convert LLM output string → JSON
+def parse_explanation(prediction, content):
+    """
+    LLM output string → explanation dict, or None when it isn't JSON;
+    only valid JSON is cached
+    """
+
     try:
-        return json.loads(response.content)
-    except:
-        return {
-            "risk_summary": response.content,
-            "primary_drivers": prediction["top_factors"]
-        }
+        explanation = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+
+    llm_cache.set(llm_cache_key("explanation", prediction), "explanation", explanation)
+    return explanation
+
+
+def generate_explanation(prediction):
+
+    cached = cached_explanation(prediction)
+    if cached is not None:
+        return cached
+
+    response = llm.invoke(explanation_prompt(prediction))
+    explanation = parse_explanation(prediction, response.content)
+    return explanation if explanation is not None else template_explanation(prediction)
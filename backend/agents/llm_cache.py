@@ -0,0 +1,175 @@
+"""
+Persistent LLM Output Cache
+SQLite-backed cache for explanation / recommendation outputs, shared by
+every uvicorn worker on the host and kept across restarts.
+
+Prompts only depend on risk_level, risk_score and top_factors, so the
+key is those inputs normalized, with the score bucketed.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Any, Optional
+
+from services.cache import CACHES
+
+
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3")
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 50000))
+
+# Risk scores are bucketed so near-identical confidences share an answer
+RISK_SCORE_BUCKET = 0.05
+
+# Expired / overflow rows are pruned every N writes
+PRUNE_EVERY = 100
+
+
+# ---------------------------------------------------
+# Key Normalization
+# ---------------------------------------------------
+def bucket_risk_score(risk_score):
+    return round(round(float(risk_score) / RISK_SCORE_BUCKET) * RISK_SCORE_BUCKET, 2)
+
+
+def normalize_prompt_inputs(prediction) -> Dict[str, Any]:
+    """
+    The subset of a prediction the prompts actually use
+    """
+    return {
+        "risk_level": str(prediction["risk_level"]).strip(),
+        "risk_score": bucket_risk_score(prediction["risk_score"]),
+        "top_factors": [str(f).strip() for f in prediction["top_factors"]]
+    }
+
+
+def llm_cache_key(kind, prediction):
+    payload = json.dumps(
+        {"kind": kind, **normalize_prompt_inputs(prediction)},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------
+# SQLite Cache
+# ---------------------------------------------------
+class LLMCache:
+    """
+    Key/value store on SQLite (WAL mode, so concurrent workers can read
+    while one writes). One connection per thread.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_created ON llm_cache (created_at)")
+
+        CACHES["llm_persistent"] = self
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key) -> Optional[Any]:
+        try:
+            row = self._connection().execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"LLM cache read failed: {e}")
+            return None
+
+        if row is None or (self.ttl and row[1] + self.ttl <= time.time()):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, kind, value):
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO llm_cache (key, kind, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, kind, json.dumps(value), time.time())
+            )
+        except sqlite3.Error as e:
+            print(f"LLM cache write failed: {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """
+        Drops expired rows, then the oldest rows beyond max_entries
+        """
+        conn = self._connection()
+        try:
+            if self.ttl:
+                conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (time.time() - self.ttl,))
+            conn.execute(
+                """
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+        except sqlite3.Error as e:
+            print(f"LLM cache prune failed: {e}")
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "size": len(self),
+            "maxsize": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+
+llm_cache = LLMCache()
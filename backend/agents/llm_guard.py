@@ -0,0 +1,302 @@
+"""
+LLM Latency Guard
+Every ChatGroq call runs on a shared bounded pool under a per-endpoint
+latency budget, behind a circuit breaker. When the budget runs out or the
+breaker is open, callers serve their deterministic template instead.
+"""
+
+import os
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Any
+
+
+# ---------------------------------------------------
+# Per-endpoint latency budgets (seconds)
+# ---------------------------------------------------
+LATENCY_BUDGETS = {
+    "predict": float(os.environ.get("LLM_BUDGET_PREDICT", 5)),
+    "predict_location": float(os.environ.get("LLM_BUDGET_PREDICT_LOCATION", 5)),
+    "safety_ai": float(os.environ.get("LLM_BUDGET_SAFETY_AI", 8))
+}
+
+DEFAULT_BUDGET = float(os.environ.get("LLM_BUDGET_DEFAULT", 5))
+
+# Hard cap on a single HTTP request to Groq, so abandoned calls
+# don't hold pool threads forever
+LLM_REQUEST_TIMEOUT = float(os.environ.get("LLM_REQUEST_TIMEOUT", 30))
+
+
+def latency_budget(endpoint):
+    return LATENCY_BUDGETS.get(endpoint, DEFAULT_BUDGET)
+
+
+def deadline_for(endpoint):
+    return time.monotonic() + latency_budget(endpoint)
+
+
+# ---------------------------------------------------
+# Circuit Breaker
+# ---------------------------------------------------
+class CircuitBreaker:
+    """
+    closed    → calls flow; outcomes are tracked over a sliding window
+    open      → error rate tripped; calls are refused for `cooldown` seconds
+    half_open → one probe call is let through; success closes the
+                breaker, failure re-opens it. A probe with no outcome
+                after `cooldown` seconds is written off and another
+                one is let through
+    """
+
+    def __init__(self, name, failure_rate=0.5, min_calls=5, window=60.0, cooldown=30.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._outcomes = deque()  # (timestamp, ok)
+        self._lock = threading.Lock()
+
+        self.rejected = 0
+        self.trips = 0
+
+    def _trim(self, now):
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+    def allow_request(self):
+        with self._lock:
+            now = time.monotonic()
+
+            if self.state == "open" and now - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probe_in_flight = False
+
+            if self.state == "closed":
+                return True
+
+            if self.state == "half_open" and (
+                    not self._probe_in_flight or now - self._probe_started >= self.cooldown):
+                self._probe_in_flight = True
+                self._probe_started = now
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state == "open":
+                return  # late result from a call started before the trip
+            if self.state == "half_open":
+                self.state = "closed"
+                self._outcomes.clear()
+                self._probe_in_flight = False
+                return
+
+            now = time.monotonic()
+            self._outcomes.append((now, True))
+            self._trim(now)
+
+    def release_probe(self):
+        """
+        For a call given up without an outcome (e.g. the client went
+        away): lets the next call probe instead
+        """
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+
+            if self.state == "open":
+                return
+            if self.state == "half_open":
+                self._open(now)
+                return
+
+            self._outcomes.append((now, False))
+            self._trim(now)
+
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if (len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open(now)
+
+    def _open(self, now):
+        self.state = "open"
+        self._opened_at = now
+        self._probe_in_flight = False
+        self._outcomes.clear()
+        self.trips += 1
+        print(f"Circuit breaker '{self.name}' opened; serving template responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim(time.monotonic())
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                "state": self.state,
+                "window_calls": len(self._outcomes),
+                "window_failures": failures,
+                "trips": self.trips,
+                "rejected": self.rejected
+            }
+
+
+groq_breaker = CircuitBreaker(
+    "groq",
+    failure_rate=float(os.environ.get("LLM_BREAKER_FAILURE_RATE", 0.5)),
+    min_calls=int(os.environ.get("LLM_BREAKER_MIN_CALLS", 5)),
+    window=float(os.environ.get("LLM_BREAKER_WINDOW", 60)),
+    cooldown=float(os.environ.get("LLM_BREAKER_COOLDOWN", 30))
+)
+
+
+# ---------------------------------------------------
+# Guarded Calls
+# ---------------------------------------------------
+llm_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("LLM_WORKERS", 8)),
+    thread_name_prefix="llm"
+)
+
+
+def submit_llm_call(fn, *args):
+    """
+    Starts an LLM-backed call on the shared pool.
+    Returns None when the breaker refuses it.
+    """
+    if not groq_breaker.allow_request():
+        return None
+    return llm_executor.submit(fn, *args)
+
+
+def await_llm_call(future, deadline, name):
+    """
+    Waits for a submitted call until the deadline.
+    Returns (result, ok); ok is False on refusal, timeout or error.
+    """
+
+    if future is None:
+        return None, False
+
+    try:
+        result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeout:
+        future.cancel()
+        groq_breaker.record_failure()
+        print(f"{name} exceeded its latency budget")
+        return None, False
+    except Exception as e:
+        groq_breaker.record_failure()
+        print(f"{name} failed: {e}")
+        return None, False
+
+    groq_breaker.record_success()
+    return result, True
+
+
+def settle_llm_call(future):
+    """
+    For a submitted call nobody will await: its outcome still reaches the
+    breaker, once the call finishes
+    """
+
+    def record(done):
+        if done.cancelled() or done.exception() is not None:
+            groq_breaker.record_failure()
+        else:
+            groq_breaker.record_success()
+
+    future.add_done_callback(record)
+
+
+def call_llm(fn, *args, deadline, name):
+    """
+    submit_llm_call + await_llm_call for a single call
+    """
+    return await_llm_call(submit_llm_call(fn, *args), deadline, name)
+
+
+def stream_llm_call(stream_fn, prompt, deadline, name, status=None):
+    """
+    Yields text chunks from a streaming LLM call (e.g. llm.stream) until
+    it finishes or the deadline passes. Yields nothing when the breaker
+    refuses the call. The producer runs on the shared pool and stops
+    early once the consumer gives up.
+
+    status["complete"] is set to True only when the stream ran to its
+    end; chunks from a call cut short by the deadline or an error are a
+    truncated answer.
+    """
+
+    if status is None:
+        status = {}
+    status["complete"] = False
+
+    if not groq_breaker.allow_request():
+        return
+
+    chunks = queue.Queue()
+    abandoned = threading.Event()
+
+    def produce():
+        try:
+            for chunk in stream_fn(prompt):
+                if abandoned.is_set():
+                    return
+                chunks.put(("chunk", chunk.content))
+            chunks.put(("done", None))
+        except Exception as e:
+            chunks.put(("error", e))
+
+    llm_executor.submit(produce)
+    settled = False
+
+    try:
+        while True:
+            try:
+                kind, value = chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                settled = True
+                groq_breaker.record_failure()
+                print(f"{name} exceeded its latency budget")
+                return
+
+            if kind == "chunk":
+                if value:
+                    yield value
+            elif kind == "done":
+                settled = True
+                groq_breaker.record_success()
+                status["complete"] = True
+                return
+            else:
+                settled = True
+                groq_breaker.record_failure()
+                print(f"{name} failed: {value}")
+                return
+    finally:
+        abandoned.set()
+        # Consumer closed mid-stream: no outcome, but a probe must not
+        # stay in flight
+        if not settled:
+            groq_breaker.release_probe()
+
+
+def llm_status() -> Dict[str, Any]:
+    return {
+        "budgets_seconds": LATENCY_BUDGETS,
+        "breaker": groq_breaker.stats()
+    }
@@ -0,0 +1,71 @@
+"""
+Pre-populates the persistent LLM cache for the most common
+(risk level, score bucket, top factors) combinations in the dataset.
+
+Run from backend/:
+    python -m agents.warm_llm_cache [--sample 2000] [--limit 200]
+"""
+
+import argparse
+from collections import Counter
+
+from services.dataset import dataset
+from services.predict import feature_columns, predict_pipeline_batch
+from agents.explanation_service import generate_explanation
+from agents.agent_recommendation import generate_recommendations
+from agents.llm_cache import llm_cache, llm_cache_key, normalize_prompt_inputs
+
+
+def common_prompt_inputs(sample_size, limit):
+    """
+    Scores a sample of the dataset and returns the most frequent
+    normalized prompt inputs, most common first
+    """
+
+    sample = dataset.sample(min(sample_size, len(dataset)), random_state=42)
+    X = sample.reindex(columns=feature_columns).to_numpy(dtype="float32", na_value=float("nan"))
+
+    counts = Counter()
+    examples = {}
+    for prediction in predict_pipeline_batch(X):
+        normalized = normalize_prompt_inputs(prediction)
+        key = (normalized["risk_level"], normalized["risk_score"], tuple(normalized["top_factors"]))
+        counts[key] += 1
+        examples[key] = normalized
+
+    return [(examples[key], count) for key, count in counts.most_common(limit)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the persistent LLM cache")
+    parser.add_argument("--sample", type=int, default=2000, help="dataset rows to score")
+    parser.add_argument("--limit", type=int, default=200, help="combinations to pre-generate")
+    args = parser.parse_args()
+
+    combos = common_prompt_inputs(args.sample, args.limit)
+    covered = sum(count for _, count in combos)
+    print(f"{len(combos)} combinations cover {covered:,}/{args.sample:,} sampled predictions")
+
+    generated = 0
+    for i, (prediction, count) in enumerate(combos, 1):
+        for kind, generate in (("explanation", generate_explanation),
+                               ("recommendation", generate_recommendations)):
+            if llm_cache.get(llm_cache_key(kind, prediction)) is not None:
+                continue
+            try:
+                generate(prediction)
+                if llm_cache.get(llm_cache_key(kind, prediction)) is None:
+                    print(f"   {kind} for {prediction['top_factors']}: LLM output wasn't JSON")
+                    continue
+                generated += 1
+            except Exception as e:
+                print(f"   {kind} failed for {prediction['top_factors']}: {e}")
+
+        if i % 10 == 0 or i == len(combos):
+            print(f"   {i}/{len(combos)} combinations processed")
+
+    print(f"Generated {generated} new entries; cache now holds {len(llm_cache)}")
+
+
+if __name__ == "__main__":
+    main()
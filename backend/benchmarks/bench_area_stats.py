@@ -0,0 +1,92 @@
+"""
+Benchmark: area totals from summed-area tables vs scanning the rows, for
+random rectangles from street to country size, as the table grows.
+
+The scan counts rows whose raster cell lies in the cells the rectangle
+is snapped to, so both sides answer the same question; exits non-zero
+if any total differs.
+
+Run from backend/:
+    python -m benchmarks.bench_area_stats [max_rows]
+"""
+
+import sys
+import time
+import numpy as np
+
+from services.area_stats import build_area_tables, area_totals, covering_cells, raster_cells, LAYERS, SEVERITY_LAYERS
+from benchmarks.bench_dashboard_engine import print_section, synthetic_dataset
+
+DEFAULT_MAX_ROWS = 4_000_000
+QUERIES = 2000
+CHECKED = 50     # rectangles also answered by a scan
+
+
+def random_boxes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    sizes = 10 ** rng.uniform(-2, 1, (n, 2))   # 0.01° .. 10° per side
+    lat = rng.normal(52.5, 1.2, n)
+    lon = rng.normal(-1.5, 1.0, n)
+    return [
+        (lat[i] - sizes[i, 0] / 2, lon[i] - sizes[i, 1] / 2, lat[i] + sizes[i, 0] / 2, lon[i] + sizes[i, 1] / 2)
+        for i in range(n)
+    ]
+
+
+def scan_totals(df, lat_cells, lon_cells, box, size):
+    first_lat, last_lat = covering_cells(box[0], box[2], size)
+    first_lon, last_lon = covering_cells(box[1], box[3], size)
+    inside = (
+        (lat_cells >= first_lat) & (lat_cells <= last_lat) &
+        (lon_cells >= first_lon) & (lon_cells <= last_lon)
+    )
+    severity = df["Accident_Severity"].to_numpy()[inside]
+    return dict(zip(LAYERS, [
+        int(inside.sum()),
+        int(df["Number_of_Casualties"].to_numpy()[inside].sum())
+    ] + [int((severity == key).sum()) for key, _ in SEVERITY_LAYERS]))
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MAX_ROWS
+    sizes = [n for n in (250_000, 1_000_000, 2_000_000, 4_000_000, 8_000_000) if n <= max_rows]
+    boxes = random_boxes(QUERIES)
+
+    print_section(f"{QUERIES:,} RANDOM RECTANGLES (0.01° to 10° per side)")
+    ok = True
+    for n_rows in sizes:
+        df = synthetic_dataset(n_rows)
+
+        start = time.perf_counter()
+        sat = build_area_tables(df)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for box in boxes:
+            area_totals(sat, box)
+        query_us = (time.perf_counter() - start) / len(boxes) * 1e6
+
+        size = sat["cell_degrees"]
+        lat_cells = raster_cells(df["latitude"].to_numpy(dtype=np.float64), size)
+        lon_cells = raster_cells(df["longitude"].to_numpy(dtype=np.float64), size)
+
+        start = time.perf_counter()
+        same = True
+        for box in boxes[:CHECKED]:
+            totals = area_totals(sat, box)
+            same = same and all(totals[layer] == value for layer, value in scan_totals(df, lat_cells, lon_cells, box, size).items())
+        scan_ms = (time.perf_counter() - start) / CHECKED * 1000
+        ok = ok and same
+
+        print(f"   {n_rows:>10,} rows   build {build_ms:8.1f} ms ({sat['tables'].nbytes / 1e6:5.1f} MB)   "
+              f"table query {query_us:6.1f} µs   scan {scan_ms:8.2f} ms   {'identical' if same else 'DIFFERENT'}")
+
+    if ok:
+        print("\n   ✅ summed-area totals match a scan of the rows")
+    else:
+        print("\n   ❌ summed-area totals differ from a scan of the rows")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
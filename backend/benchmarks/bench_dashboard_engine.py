@@ -0,0 +1,484 @@
+"""
+Benchmark + parity check: fused dashboard engine vs the previous
+per-endpoint pandas implementations (value_counts, groupby.apply with
+Python lambdas, dataframe copies), on a synthetic table shaped like the
+shared dataset (int8 categorical columns, float64 coordinates).
+
+The six /dashboard/* payloads built from the engine must equal the
+legacy ones; the script exits non-zero otherwise.
+
+Run from backend/:
+    python -m benchmarks.bench_dashboard_engine [n_rows]
+    python -m benchmarks.bench_dashboard_engine 10000000
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from services import dashboard_service
+from services.dashboard_engine import compute_dashboard_aggregates
+from services.hotspot_engine import compute_hotspots, ranked_positions
+from services.dashboard_service import (
+    DAY_OF_WEEK_MAP,
+    LIGHT_CONDITIONS_MAP,
+    WEATHER_CONDITIONS_MAP,
+    ROAD_SURFACE_MAP
+)
+
+DEFAULT_ROWS = 10_000_000
+
+
+def print_section(title):
+    print("\n" + "=" * 60)
+    print(f"  {title}")
+    print("=" * 60)
+
+
+def synthetic_dataset(n, seed=0):
+    rng = np.random.default_rng(seed)
+    small = lambda low, high: rng.integers(low, high, n, dtype=np.int8)
+
+    return pd.DataFrame({
+        "Accident_Severity": rng.choice(np.array([0, 1, 2], dtype=np.int8), n, p=[.02, .15, .83]),
+        "Hour": small(0, 24),
+        "Day_of_Week": small(1, 8),
+        "Month": small(1, 13),
+        "Weather_Conditions": small(1, 10),
+        "Light_Conditions": rng.choice(np.array([1, 4, 5, 6, 7], dtype=np.int8), n),
+        "Road_Surface_Conditions": small(1, 8),
+        "Speed_limit": rng.choice(np.array([20, 30, 40, 50, 60, 70], dtype=np.int8), n),
+        "Urban_or_Rural_Area": small(1, 3),
+        "Number_of_Vehicles": small(1, 8),
+        "Number_of_Casualties": small(1, 6),
+        "latitude": rng.normal(52.5, 1.2, n),
+        "longitude": rng.normal(-1.5, 1.0, n)
+    })
+
+
+# ---------------------------------------------------
+# Legacy: Dashboard Statistics
+# ---------------------------------------------------
+def legacy_dashboard_statistics(df):
+    """
+    Returns overall statistics about accidents in the dataset
+    """
+    
+    total_accidents = len(df)
+    
+    # Severity distribution (0=Fatal, 1=Serious, 2=Slight)
+    severity_counts = df['Accident_Severity'].value_counts().to_dict()
+    severity_distribution = {
+        "fatal": int(severity_counts.get(0.0, 0)),
+        "serious": int(severity_counts.get(1.0, 0)),
+        "slight": int(severity_counts.get(2.0, 0))
+    }
+    
+    # High risk locations (Fatal + Serious accidents)
+    high_risk_count = int((df['Accident_Severity'] <= 1.0).sum())
+    
+    # Total casualties
+    total_casualties = int(df['Number_of_Casualties'].sum())
+    
+    # Average vehicles per accident
+    avg_vehicles = int(df['Number_of_Vehicles'].mean())
+    
+    # Most dangerous hour
+    dangerous_hour = int(df.groupby('Hour')['Accident_Severity'].apply(
+        lambda x: (x <= 1.0).sum()
+    ).idxmax())
+    
+    # Most dangerous day
+    dangerous_day_num = int(df.groupby('Day_of_Week')['Accident_Severity'].apply(
+        lambda x: (x <= 1.0).sum()
+    ).idxmax())
+    dangerous_day = DAY_OF_WEEK_MAP.get(dangerous_day_num, "Unknown")
+    
+    return {
+        "total_accidents": total_accidents,
+        "total_casualties": total_casualties,
+        "high_risk_locations": high_risk_count,
+        "severity_distribution": severity_distribution,
+        "avg_vehicles_per_accident": round(avg_vehicles, 2),
+        "most_dangerous_hour": dangerous_hour,
+        "most_dangerous_day": dangerous_day,
+        "date_range": {
+            "months_covered": "12 months",
+            "description": "Comprehensive accident data analysis"
+        }
+    }
+
+
+# ---------------------------------------------------
+# Legacy: Risk Factors Distribution
+# ---------------------------------------------------
+def legacy_risk_factors_distribution(df):
+    """
+    Returns distribution of top contributing factors
+    """
+    
+    factors = {}
+    
+    # Weather conditions distribution (top 5)
+    weather_counts = df['Weather_Conditions'].value_counts().head(5)
+    factors['weather_conditions'] = [
+        {
+            "condition": WEATHER_CONDITIONS_MAP.get(float(k), f"Code {int(k)}"),
+            "count": int(v),
+            "percentage": round((v / len(df)) * 100, 2)
+        }
+        for k, v in weather_counts.items()
+    ]
+    
+    # Light conditions distribution (top 5)
+    light_counts = df['Light_Conditions'].value_counts().head(5)
+    factors['light_conditions'] = [
+        {
+            "condition": LIGHT_CONDITIONS_MAP.get(float(k), f"Code {int(k)}"),
+            "count": int(v),
+            "percentage": round((v / len(df)) * 100, 2)
+        }
+        for k, v in light_counts.items()
+    ]
+    
+    # Road surface conditions (top 5)
+    road_counts = df['Road_Surface_Conditions'].value_counts().head(5)
+    factors['road_surface_conditions'] = [
+        {
+            "condition": ROAD_SURFACE_MAP.get(float(k), f"Code {int(k)}"),
+            "count": int(v),
+            "percentage": round((v / len(df)) * 100, 2)
+        }
+        for k, v in road_counts.items()
+    ]
+    
+    # Speed limit distribution
+    speed_counts = df['Speed_limit'].value_counts().head(5)
+    factors['speed_limits'] = [
+        {
+            "speed": int(k),
+            "count": int(v),
+            "percentage": round((v / len(df)) * 100, 2)
+        }
+        for k, v in speed_counts.items()
+    ]
+    
+    # Urban vs Rural
+    urban_rural_counts = df['Urban_or_Rural_Area'].value_counts()
+    factors['urban_rural'] = [
+        {
+            "area": "Urban" if k == 1.0 else "Rural",
+            "count": int(v),
+            "percentage": round((v / len(df)) * 100, 2)
+        }
+        for k, v in urban_rural_counts.items()
+    ]
+    
+    return factors
+
+
+# ---------------------------------------------------
+# Legacy: Top Risky Locations
+# ---------------------------------------------------
+def legacy_top_risky_locations(df, limit=10):
+    """
+    Returns top locations with highest accident frequency and severity
+    """
+    
+    # Round coordinates to reduce granularity (cluster nearby accidents)
+    df_copy = df.copy()
+    df_copy['lat_rounded'] = df_copy['latitude'].astype(np.float64).round(3)
+    df_copy['lon_rounded'] = df_copy['longitude'].astype(np.float64).round(3)
+    
+    # Group by rounded location
+    location_groups = df_copy.groupby(['lat_rounded', 'lon_rounded']).agg({
+        'Accident_Severity': ['count', 'mean'],
+        'Number_of_Casualties': 'sum'
+    }).reset_index()
+    
+    location_groups.columns = ['lat', 'lon', 'accident_count', 'avg_severity', 'total_casualties']
+    
+    # Calculate risk score (lower severity number = more severe)
+    # 0=Fatal, 1=Serious, 2=Slight, so we invert it
+    location_groups['risk_score'] = (
+        (location_groups['accident_count'] * 0.4) + 
+        ((3 - location_groups['avg_severity']) * 10) +  # Invert severity
+        (location_groups['total_casualties'] * 0.3)
+    )
+    
+    # Sort by risk score
+    top_locations = location_groups.nlargest(limit, 'risk_score')
+    
+    result = []
+    for idx, row in top_locations.iterrows():
+        # Determine risk level based on severity
+        if row['avg_severity'] <= 0.5:
+            risk_level = "Critical"
+        elif row['avg_severity'] <= 1.2:
+            risk_level = "High"
+        else:
+            risk_level = "Medium"
+            
+        result.append({
+            "rank": len(result) + 1,
+            "lat": float(row['lat']),
+            "lon": float(row['lon']),
+            "accident_count": int(row['accident_count']),
+            "avg_severity": float(round(row['avg_severity'], 2)),
+            "total_casualties": int(row['total_casualties']),
+            "risk_score": float(round(row['risk_score'], 2)),
+            "risk_level": risk_level
+        })
+    
+    return result
+
+
+# ---------------------------------------------------
+# Legacy: Severity Analysis by Conditions
+# ---------------------------------------------------
+def legacy_severity_by_conditions(df):
+    """
+    Returns severity breakdown by different conditions
+    """
+    
+    result = {}
+    
+    # Severity by Speed Limit
+    speed_severity = df.groupby('Speed_limit').agg({
+        'Accident_Severity': ['mean', 'count']
+    }).reset_index()
+    speed_severity.columns = ['speed_limit', 'avg_severity', 'count']
+    speed_severity = speed_severity[speed_severity['count'] >= 10]  # Filter low counts
+    
+    result['by_speed_limit'] = [
+        {
+            "speed": int(row['speed_limit']),
+            "avg_severity": float(round(row['avg_severity'], 2)),
+            "accident_count": int(row['count'])
+        }
+        for _, row in speed_severity.sort_values('speed_limit').iterrows()
+    ]
+    
+    # Severity by Hour of Day
+    hourly_severity = df.groupby('Hour').agg({
+        'Accident_Severity': ['mean', 'count']
+    }).reset_index()
+    hourly_severity.columns = ['hour', 'avg_severity', 'count']
+    
+    result['by_hour'] = [
+        {
+            "hour": int(row['hour']),
+            "avg_severity": float(round(row['avg_severity'], 2)),
+            "accident_count": int(row['count'])
+        }
+        for _, row in hourly_severity.sort_values('hour').iterrows()
+    ]
+    
+    # Severity by Day of Week
+    daily_severity = df.groupby('Day_of_Week').agg({
+        'Accident_Severity': ['mean', 'count']
+    }).reset_index()
+    daily_severity.columns = ['day', 'avg_severity', 'count']
+    
+    result['by_day_of_week'] = [
+        {
+            "day": DAY_OF_WEEK_MAP.get(row['day'], "Unknown"),
+            "avg_severity": float(round(row['avg_severity'], 2)),
+            "accident_count": int(row['count'])
+        }
+        for _, row in daily_severity.sort_values('day').iterrows()
+    ]
+    
+    # Severity by Weather
+    weather_severity = df.groupby('Weather_Conditions').agg({
+        'Accident_Severity': ['mean', 'count']
+    }).reset_index()
+    weather_severity.columns = ['weather', 'avg_severity', 'count']
+    weather_severity = weather_severity[weather_severity['count'] >= 50]
+    
+    result['by_weather'] = [
+        {
+            "weather": WEATHER_CONDITIONS_MAP.get(row['weather'], f"Code {int(row['weather'])}"),
+            "avg_severity": float(round(row['avg_severity'], 2)),
+            "accident_count": int(row['count'])
+        }
+        for _, row in weather_severity.sort_values('avg_severity').iterrows()
+    ]
+    
+    # Severity by Number of Vehicles
+    vehicle_severity = df.groupby('Number_of_Vehicles').agg({
+        'Accident_Severity': ['mean', 'count']
+    }).reset_index()
+    vehicle_severity.columns = ['vehicles', 'avg_severity', 'count']
+    vehicle_severity = vehicle_severity[vehicle_severity['vehicles'] <= 5]
+    
+    result['by_vehicle_count'] = [
+        {
+            "vehicle_count": int(row['vehicles']),
+            "avg_severity": float(round(row['avg_severity'], 2)),
+            "accident_count": int(row['count'])
+        }
+        for _, row in vehicle_severity.sort_values('vehicles').iterrows()
+    ]
+    
+    return result
+
+
+# ---------------------------------------------------
+# Legacy: Geographical Distribution
+# ---------------------------------------------------
+def legacy_geographical_distribution(df):
+    """
+    Returns accidents grouped by geographical regions (grid-based)
+    """
+    
+    # Create geographical grid (0.1 degree bins ≈ 11km)
+    df_copy = df.copy()
+    df_copy['lat_bin'] = (df_copy['latitude'].astype(np.float64) / 0.1).astype(int) * 0.1
+    df_copy['lon_bin'] = (df_copy['longitude'].astype(np.float64) / 0.1).astype(int) * 0.1
+    
+    geo_distribution = df_copy.groupby(['lat_bin', 'lon_bin']).agg({
+        'Accident_Severity': ['count', 'mean']
+    }).reset_index()
+    
+    geo_distribution.columns = ['lat', 'lon', 'accident_count', 'avg_severity']
+    
+    # Filter out low-count areas
+    geo_distribution = geo_distribution[geo_distribution['accident_count'] >= 5]
+    
+    # Sort by accident count and take top 30
+    geo_distribution = geo_distribution.nlargest(30, 'accident_count')
+    
+    result = []
+    for _, row in geo_distribution.iterrows():
+        result.append({
+            "lat": float(row['lat'] + 0.05),  # Center of bin
+            "lon": float(row['lon'] + 0.05),
+            "accident_count": int(row['accident_count']),
+            "avg_severity": float(round(row['avg_severity'], 2))
+        })
+    
+    return result
+
+
+# ---------------------------------------------------
+# Legacy: Time-based Trends
+# ---------------------------------------------------
+def legacy_time_trends(df):
+    """
+    Returns accident trends by time (hourly, daily, monthly)
+    """
+    
+    # Monthly distribution
+    monthly = df.groupby('Month').agg({
+        'Accident_Severity': ['count', 'mean']
+    }).reset_index()
+    monthly.columns = ['month', 'count', 'avg_severity']
+    
+    month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
+                   'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    
+    monthly_data = [
+        {
+            "month": month_names[int(row['month'])-1],
+            "accident_count": int(row['count']),
+            "avg_severity": float(round(row['avg_severity'], 2))
+        }
+        for _, row in monthly.sort_values('month').iterrows()
+    ]
+    
+    # Hourly distribution
+    hourly = df.groupby('Hour').size().reset_index(name='count')
+    hourly_data = [
+        {
+            "hour": int(row['Hour']),
+            "accident_count": int(row['count'])
+        }
+        for _, row in hourly.sort_values('Hour').iterrows()
+    ]
+    
+    # Day of week distribution
+    daily = df.groupby('Day_of_Week').size().reset_index(name='count')
+    daily_data = [
+        {
+            "day": DAY_OF_WEEK_MAP.get(row['Day_of_Week'], "Unknown"),
+            "accident_count": int(row['count'])
+        }
+        for _, row in daily.sort_values('Day_of_Week').iterrows()
+    ]
+    
+    return {
+        "monthly": monthly_data,
+        "hourly": hourly_data,
+        "daily": daily_data
+    }
+
+
+LEGACY = [
+    ("statistics", legacy_dashboard_statistics, "get_dashboard_statistics"),
+    ("risk-factors", legacy_risk_factors_distribution, "get_risk_factors_distribution"),
+    ("risky-locations", legacy_top_risky_locations, "get_top_risky_locations"),
+    ("severity-analysis", legacy_severity_by_conditions, "get_severity_by_conditions"),
+    ("geo-distribution", legacy_geographical_distribution, "get_geographical_distribution"),
+    ("time-trends", legacy_time_trends, "get_time_trends")
+]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+
+    df = synthetic_dataset(n_rows)
+
+    print_section(f"LEGACY: one pandas pass per endpoint ({n_rows:,} rows)")
+    legacy_results = {}
+    legacy_total = 0.0
+    for endpoint, legacy_fn, _ in LEGACY:
+        legacy_results[endpoint], seconds = timed(legacy_fn, df)
+        legacy_total += seconds
+        print(f"   /dashboard/{endpoint:<20} {seconds * 1000:10.1f} ms")
+    print(f"   {'all six':<31} {legacy_total * 1000:10.1f} ms")
+
+    print_section("FUSED: one pass for all six endpoints")
+    aggregates, engine_s = timed(compute_dashboard_aggregates, df)
+    print(f"   {'aggregation pass':<31} {engine_s * 1000:10.1f} ms")
+    grids, hotspot_s = timed(compute_hotspots, df)
+    engine_s += hotspot_s
+    print(f"   {'hotspot grids':<31} {hotspot_s * 1000:10.1f} ms")
+
+    # Format every payload from this table's aggregates (bypassing the
+    # memoized wrappers, which serve the shared dataset)
+    dashboard_service.dashboard_aggregates = lambda: aggregates
+    dashboard_service.top_hotspots = lambda decimals, score, limit, offset=0: (
+        grids[decimals], ranked_positions(grids[decimals], score, limit, offset)
+    )
+    engine_results = {}
+    format_total = 0.0
+    for endpoint, _, name in LEGACY:
+        engine_results[endpoint], seconds = timed(getattr(dashboard_service, name).__wrapped__)
+        format_total += seconds
+    print(f"   {'formatting (all six)':<31} {format_total * 1000:10.1f} ms")
+    print(f"   {'speedup':<31} {legacy_total / (engine_s + format_total):10.1f}x")
+
+    print_section("PARITY")
+    ok = True
+    for endpoint, _, _ in LEGACY:
+        same = engine_results[endpoint] == legacy_results[endpoint]
+        ok = ok and same
+        print(f"   /dashboard/{endpoint:<20} {'identical' if same else 'DIFFERENT'}")
+
+    if ok:
+        print("\n   ✅ fused engine matches the legacy payloads")
+    else:
+        print("\n   ❌ fused engine payloads differ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark + parity check: explanation backends in services/predict.py
+- native:        booster.predict(pred_contribs=True)  (exact Tree SHAP)
+- native_approx: booster.predict(approx_contribs=True) (Saabas)
+- shap:          shap.TreeExplainer.shap_values
+
+The exact native backend must rank the same top factors as shap;
+the script exits non-zero if any row disagrees.
+
+Run from backend/:
+    python -m benchmarks.bench_explainers [n_rows]
+"""
+
+import sys
+import time
+import numpy as np
+
+from services.dataset import dataset
+from services.predict import (
+    feature_columns,
+    predict_severity_batch,
+    get_shap_explanation_batch
+)
+
+BACKENDS = ["shap", "native", "native_approx"]
+N_SINGLE_CALLS = 20
+
+
+def print_section(title):
+    print("\n" + "=" * 60)
+    print(f"  {title}")
+    print("=" * 60)
+
+
+def sample_matrix(n_rows):
+    sample = dataset.sample(min(n_rows, len(dataset)), random_state=42)
+    return sample.reindex(columns=feature_columns).to_numpy(dtype=np.float32, na_value=np.nan)
+
+
+def time_backend(backend, X, pred_classes):
+    # Warm up (first shap call also pays for the import + explainer setup)
+    get_shap_explanation_batch(X[:1], pred_classes[:1], backend)
+
+    start = time.perf_counter()
+    for i in range(N_SINGLE_CALLS):
+        get_shap_explanation_batch(X[i:i + 1], pred_classes[i:i + 1], backend)
+    single_ms = (time.perf_counter() - start) / N_SINGLE_CALLS * 1000
+
+    start = time.perf_counter()
+    factors = get_shap_explanation_batch(X, pred_classes, backend)
+    batch_ms = (time.perf_counter() - start) / len(X) * 1000
+
+    return factors, single_ms, batch_ms
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    X = sample_matrix(n_rows)
+    pred_classes, _ = predict_severity_batch(X)
+
+    print_section(f"LATENCY ({len(X)} rows)")
+    results = {}
+    for backend in BACKENDS:
+        factors, single_ms, batch_ms = time_backend(backend, X, pred_classes)
+        results[backend] = factors
+        print(f"   {backend:<14} single call {single_ms:8.3f} ms   batched {batch_ms:8.3f} ms/row")
+
+    print_section("PARITY vs shap")
+    reference = results["shap"]
+    ok = True
+    for backend in BACKENDS[1:]:
+        exact = sum(a == b for a, b in zip(results[backend], reference))
+        top1 = sum(a[:1] == b[:1] for a, b in zip(results[backend], reference))
+        overlap = np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(results[backend], reference)])
+        print(f"   {backend:<14} identical ranking {exact}/{len(X)}   same top factor {top1}/{len(X)}   set overlap {overlap:.1%}")
+
+        if backend == "native" and exact != len(X):
+            ok = False
+
+    if ok:
+        print("\n   ✅ native ranks the same top factors as shap")
+    else:
+        print("\n   ❌ native and shap rankings differ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
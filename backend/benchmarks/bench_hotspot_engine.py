@@ -0,0 +1,116 @@
+"""
+Benchmark + parity check: precomputed hotspot engine vs the previous
+copy / round / groupby / nlargest implementations of
+dashboard_service.get_top_risky_locations (3 decimals) and
+safetyai.get_top_risky_areas (2 decimals), including deep pages.
+
+Exits non-zero if any engine result differs from the legacy one.
+
+Run from backend/:
+    python -m benchmarks.bench_hotspot_engine [n_rows]
+"""
+
+import sys
+import time
+import numpy as np
+
+from services import dashboard_service, safetyai
+from services.hotspot_engine import compute_hotspots, ranked_positions, HOTSPOT_RANKED_DEPTH
+from benchmarks.bench_dashboard_engine import print_section, synthetic_dataset, legacy_top_risky_locations
+
+DEFAULT_ROWS = 2_000_000
+LIMITS = [10, 50]
+PAGES = [(0, 10), (HOTSPOT_RANKED_DEPTH - 5, 10), (5000, 25)]  # (offset, limit)
+
+
+# ---------------------------------------------------
+# Legacy: Top Risky Areas (safetyai)
+# ---------------------------------------------------
+def legacy_top_risky_areas(df, limit=10):
+    dataset_copy = df.copy()
+    dataset_copy['lat_rounded'] = dataset_copy['latitude'].astype(np.float64).round(2)
+    dataset_copy['lon_rounded'] = dataset_copy['longitude'].astype(np.float64).round(2)
+
+    location_stats = dataset_copy.groupby(['lat_rounded', 'lon_rounded']).agg({
+        'Accident_Severity': ['count', 'mean']
+    }).reset_index()
+    location_stats.columns = ['lat', 'lon', 'accident_count', 'avg_severity']
+
+    location_stats['risk_score'] = (
+        location_stats['accident_count'] * 0.5 +
+        location_stats['avg_severity'] * 0.5
+    )
+
+    top_locations = location_stats.nlargest(limit, 'risk_score')
+
+    return [
+        {
+            "lat": float(row['lat']),
+            "lon": float(row['lon']),
+            "accident_count": int(row['accident_count']),
+            "avg_severity": float(row['avg_severity']),
+            "risk_score": float(row['risk_score'])
+        }
+        for _, row in top_locations.iterrows()
+    ]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+
+    df = synthetic_dataset(n_rows)
+
+    print_section(f"PRECOMPUTE ({n_rows:,} rows)")
+    grids, build_s = timed(compute_hotspots, df)
+    for decimals, cells in grids.items():
+        print(f"   {decimals} decimals: {len(cells['lat']):>10,} cells")
+    print(f"   {'build (once per dataset version)':<34} {build_s * 1000:10.1f} ms")
+
+    # Serve this table's grids (bypassing the memoized wrappers, which
+    # serve the shared dataset)
+    top_hotspots = lambda decimals, score, limit, offset=0: (
+        grids[decimals], ranked_positions(grids[decimals], score, limit, offset)
+    )
+    dashboard_service.top_hotspots = top_hotspots
+    safetyai.top_hotspots = top_hotspots
+
+    callers = [
+        ("risky-locations", legacy_top_risky_locations, dashboard_service.get_top_risky_locations.__wrapped__),
+        ("risky-areas", legacy_top_risky_areas, safetyai.get_top_risky_areas.__wrapped__)
+    ]
+
+    print_section("PER REQUEST: legacy copy + groupby vs engine")
+    ok = True
+    for name, legacy_fn, engine_fn in callers:
+        for limit in LIMITS:
+            legacy, legacy_s = timed(legacy_fn, df, limit)
+            engine, engine_s = timed(engine_fn, limit)
+            same = engine == legacy
+            ok = ok and same
+            print(f"   {name:<16} limit={limit:<4} legacy {legacy_s * 1000:9.1f} ms   "
+                  f"engine {engine_s * 1000:7.3f} ms   {'identical' if same else 'DIFFERENT'}")
+
+    print_section("PAGING: risky-locations pages vs slices of one legacy ranking")
+    deepest = max(offset + limit for offset, limit in PAGES)
+    legacy_all = legacy_top_risky_locations(df, deepest)
+    for offset, limit in PAGES:
+        page, page_s = timed(dashboard_service.get_top_risky_locations.__wrapped__, limit, offset)
+        same = page == legacy_all[offset:offset + limit]
+        ok = ok and same
+        print(f"   offset={offset:<6} limit={limit:<4} {page_s * 1000:7.3f} ms   {'identical' if same else 'DIFFERENT'}")
+
+    if ok:
+        print("\n   ✅ hotspot engine matches the legacy rankings")
+    else:
+        print("\n   ❌ hotspot engine rankings differ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: nearest accident lookup for /predict_location
+Compares the legacy per-request linear scan (squared degree distance +
+idxmin) against the prebuilt haversine BallTree on synthetic UK data.
+
+Run from backend/:
+    python -m benchmarks.bench_nearest_location [sizes...]
+    python -m benchmarks.bench_nearest_location 100000 1000000
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from services.spatial_index import build_location_index, query_nearest
+
+DEFAULT_SIZES = [100_000, 1_000_000, 10_000_000]
+N_QUERIES = 200
+
+
+def print_section(title):
+    print("\n" + "=" * 60)
+    print(f"  {title}")
+    print("=" * 60)
+
+
+def synthetic_uk_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(50.0, 58.5, n).astype(np.float32)
+    lons = rng.uniform(-6.0, 1.8, n).astype(np.float32)
+    return pd.DataFrame({"latitude": lats, "longitude": lons})
+
+
+def linear_scan(dataset, lat, lon):
+    distances = (
+        (dataset["latitude"] - lat) ** 2 +
+        (dataset["longitude"] - lon) ** 2
+    )
+    return distances.idxmin()
+
+
+def bench_size(n):
+    print_section(f"{n:,} rows")
+
+    dataset = synthetic_uk_points(n)
+    rng = np.random.default_rng(1)
+    q_lats = rng.uniform(50.0, 58.5, N_QUERIES)
+    q_lons = rng.uniform(-6.0, 1.8, N_QUERIES)
+
+    start = time.perf_counter()
+    index = build_location_index(dataset["latitude"], dataset["longitude"])
+    build_s = time.perf_counter() - start
+
+    # Linear scan is slow at 10M rows; a smaller query count is enough
+    n_linear = min(N_QUERIES, max(5, 20_000_000 // n))
+    start = time.perf_counter()
+    linear_hits = [linear_scan(dataset, q_lats[i], q_lons[i]) for i in range(n_linear)]
+    linear_ms = (time.perf_counter() - start) / n_linear * 1000
+
+    start = time.perf_counter()
+    for i in range(N_QUERIES):
+        query_nearest(index, [q_lats[i]], [q_lons[i]])
+    tree_ms = (time.perf_counter() - start) / N_QUERIES * 1000
+
+    tree_hits, _ = query_nearest(index, q_lats[:n_linear], q_lons[:n_linear])
+    disagree = int(np.sum(np.asarray(linear_hits) != tree_hits))
+
+    print(f"   Index build:          {build_s:.2f}s (once per process)")
+    print(f"   Linear scan:          {linear_ms:.3f} ms/request")
+    print(f"   BallTree (haversine): {tree_ms:.3f} ms/request")
+    print(f"   Speedup:              {linear_ms / tree_ms:.1f}x")
+    print(f"   Degree-distance picked a different neighbour in {disagree}/{n_linear} queries")
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1:]] or DEFAULT_SIZES
+    for n in sizes:
+        bench_size(n)
+
+
+if __name__ == "__main__":
+    main()
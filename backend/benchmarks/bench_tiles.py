@@ -0,0 +1,94 @@
+"""
+Benchmark: /tiles/{z}/{x}/{y} from the precomputed pyramid vs
+re-aggregating the whole table per view (what /risk_heatmap_clustered
+does), plus a brute-force check of every served tile's totals.
+
+A "view" is the 3 x 3 block of tiles around the centre of the data at
+each zoom, i.e. one screen of a slippy map.
+
+Run from backend/:
+    python -m benchmarks.bench_tiles [n_rows]
+"""
+
+import sys
+import time
+import numpy as np
+
+from services import tile_service
+from services.tile_service import build_pyramid, mercator_cells, TILE_CELL_BITS, TILE_MAX_ZOOM
+from benchmarks.bench_dashboard_engine import print_section, synthetic_dataset
+
+DEFAULT_ROWS = 2_000_000
+ZOOMS = [4, 6, 8, 10, TILE_MAX_ZOOM]
+
+
+def regrid_whole_table(df, grid_size):
+    """
+    Per-request cost of the clustered endpoint: group every row
+    """
+    binned = df.assign(
+        lat_bin=(df["latitude"].astype(np.float64) / grid_size).astype(int),
+        lon_bin=(df["longitude"].astype(np.float64) / grid_size).astype(int)
+    )
+    return binned.groupby(["lat_bin", "lon_bin"]).agg({
+        "Accident_Severity": ["count", "mean"],
+        "Number_of_Casualties": "sum",
+        "Number_of_Vehicles": "sum"
+    })
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+
+    df = synthetic_dataset(n_rows)
+    lat = df["latitude"].to_numpy(dtype=np.float64)
+    lon = df["longitude"].to_numpy(dtype=np.float64)
+
+    print_section(f"PYRAMID BUILD ({n_rows:,} rows)")
+    start = time.perf_counter()
+    pyramid = build_pyramid(df)
+    build_s = time.perf_counter() - start
+    cells = sum(len(level["keys"]) for level in pyramid["levels"].values())
+    print(f"   {cells:,} cells over {len(pyramid['levels'])} zoom levels in {build_s * 1000:.1f} ms")
+
+    # Serve this table's pyramid (bypassing the memoized wrapper)
+    tile_service.tile_pyramid = lambda: pyramid
+
+    print_section("PER VIEW: 3 x 3 tiles vs whole-table re-aggregation")
+    ok = True
+    for z in ZOOMS:
+        cx, cy = mercator_cells(np.array([52.5]), np.array([-1.5]), z)
+        tiles = [(int(cx[0]) + dx, int(cy[0]) + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+        start = time.perf_counter()
+        payloads = [tile_service.get_tile(z, x, y) for x, y in tiles]
+        view_s = time.perf_counter() - start
+        served = sum(len(p["cells"]) for p in payloads)
+
+        # Brute force: rows whose cell falls in each tile
+        row_x, row_y = mercator_cells(lat, lon, z + TILE_CELL_BITS)
+        for (x, y), payload in zip(tiles, payloads):
+            inside = ((row_x >> TILE_CELL_BITS) == x) & ((row_y >> TILE_CELL_BITS) == y)
+            same = (
+                sum(c["accident_count"] for c in payload["cells"]) == int(inside.sum())
+                and sum(c["total_casualties"] for c in payload["cells"]) == int(df["Number_of_Casualties"].to_numpy()[inside].sum())
+            )
+            ok = ok and same
+
+        grid_size = 360.0 / (1 << (z + TILE_CELL_BITS))
+        start = time.perf_counter()
+        regrid_whole_table(df, grid_size)
+        regrid_s = time.perf_counter() - start
+
+        print(f"   z={z:<3} {served:>6,} cells   tiles {view_s * 1000:8.2f} ms   "
+              f"re-aggregate {regrid_s * 1000:8.1f} ms")
+
+    if ok:
+        print("\n   ✅ every tile matches a brute-force count of its rows")
+    else:
+        print("\n   ❌ tile totals differ from the rows they cover")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: viewport (bounding-box) queries through the grid index vs a
+full-table coordinate scan, as the table grows.
+
+Two growth patterns:
+- "elsewhere": extra rows land outside the viewports (more regions,
+  more years of other areas), so each box holds the same rows; index
+  queries should stay flat while the scan grows with the table
+- "denser": the same area gets denser, so the rows inside each box grow
+  too; index cost follows the rows in the box, not the table
+
+Every query is checked against the scan; exits non-zero on a mismatch.
+
+Run from backend/:
+    python -m benchmarks.bench_viewport_index [max_rows]
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from services.grid_index import build_grid_index, query_box
+from benchmarks.bench_dashboard_engine import print_section, synthetic_dataset
+
+DEFAULT_MAX_ROWS = 4_000_000
+BASE_ROWS = 250_000
+REPEATS = 20
+
+# (name, (min_lat, min_lon, max_lat, max_lon)) around the data's centre
+VIEWPORTS = [
+    ("street  0.01°", (52.50, -1.50, 52.51, -1.49)),
+    ("town    0.05°", (52.48, -1.53, 52.53, -1.48)),
+    ("city    0.2°", (52.40, -1.60, 52.60, -1.40))
+]
+
+
+def scan_box(lat, lon, box):
+    min_lat, min_lon, max_lat, max_lon = box
+    return np.flatnonzero((lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon))
+
+
+def best_ms(fn, *args):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def grown_elsewhere(base, n_rows):
+    """
+    base plus n_rows - len(base) rows 20° north of every viewport
+    """
+    extra = synthetic_dataset(n_rows - len(base), seed=1)
+    extra["latitude"] += 20.0
+    return pd.concat([base, extra], ignore_index=True)
+
+
+def run(name, tables):
+    print_section(f"GROWTH: {name}")
+    ok = True
+    for df in tables:
+        start = time.perf_counter()
+        index = build_grid_index(df)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        lat = df["latitude"].to_numpy(dtype=np.float64)
+        lon = df["longitude"].to_numpy(dtype=np.float64)
+        print(f"   {len(df):>10,} rows   index build {build_ms:8.1f} ms (once per dataset version)")
+
+        for label, box in VIEWPORTS:
+            indexed, index_ms = best_ms(query_box, index, box)
+            scanned, scan_ms = best_ms(scan_box, lat, lon, box)
+            same = np.array_equal(indexed, scanned)
+            ok = ok and same
+            print(f"      {label:<14} {len(indexed):>7,} in box   index {index_ms:8.3f} ms   "
+                  f"scan {scan_ms:8.2f} ms   {'identical' if same else 'DIFFERENT'}")
+    return ok
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MAX_ROWS
+    sizes = [n for n in (BASE_ROWS, 1_000_000, 2_000_000, 4_000_000, 8_000_000) if n <= max_rows]
+
+    base = synthetic_dataset(BASE_ROWS)
+    ok = run("elsewhere (rows in each box fixed)", (
+        base if n == BASE_ROWS else grown_elsewhere(base, n) for n in sizes
+    ))
+    ok = run("denser (rows in each box grow with the table)", (
+        synthetic_dataset(n) for n in sizes
+    )) and ok
+
+    if ok:
+        print("\n   ✅ every index query matches a full scan")
+    else:
+        print("\n   ❌ index queries differ from a full scan")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
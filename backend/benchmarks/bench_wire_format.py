@@ -0,0 +1,99 @@
+"""
+Benchmark: JSON records vs the columnar binary encoding
+(Accept: application/vnd.risk.columnar) for the map payloads of
+/risk_heatmap, /risk_heatmap_clustered and /dashboard/geo-distribution —
+payload size (raw and gzip) and encode time — plus a round-trip check
+that every decoded column equals the JSON values at the wire precision
+(float32 for floats, exact for integers and labels). Payloads are capped
+(5000 points, 500 clusters, 30 bins), so the shared dataset is used as is.
+
+Exits non-zero on any mismatch.
+
+Run from backend/:
+    python -m benchmarks.bench_wire_format
+"""
+
+import sys
+import gzip
+import time
+import numpy as np
+import orjson
+
+from services.heatmap_service import get_heatmap_columns, get_clustered_heatmap_columns
+from services.dashboard_service import get_geographical_distribution_columns
+from services.serialization import to_records, encode_columns, decode_columns
+from benchmarks.bench_dashboard_engine import print_section
+
+REPEATS = 20
+
+
+def timed(fn, *args):
+    """
+    Best of REPEATS, in ms
+    """
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def encode_json(columns):
+    return orjson.dumps(to_records(columns), option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def same_values(records, name, decoded):
+    """
+    JSON column vs decoded column, at the precision the binary carries
+    """
+
+    values = [record[name] for record in records]
+    if decoded.dtype == object:
+        return values == decoded.tolist()
+    if decoded.dtype.kind == "f":
+        expected = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        return np.array_equal(expected.astype(decoded.dtype), decoded, equal_nan=True)
+    return values == decoded.tolist()
+
+
+def main():
+    payloads = [
+        ("risk_heatmap 1000", lambda: get_heatmap_columns(1000)),
+        ("risk_heatmap 5000", lambda: get_heatmap_columns(5000)),
+        ("heatmap_clustered 0.05", lambda: get_clustered_heatmap_columns(0.05)),
+        ("heatmap_clustered 0.01", lambda: get_clustered_heatmap_columns(0.01)),
+        ("geo-distribution", get_geographical_distribution_columns)
+    ]
+
+    print_section("PAYLOAD SIZE (bytes) AND ENCODE TIME (best of 20)")
+    print(f"   {'endpoint':<24} {'points':>6}   {'json':>9} {'binary':>9} {'gz json':>9} {'gz bin':>9}"
+          f"   {'json ms':>8} {'bin ms':>8}")
+
+    ok = True
+    for name, columns_fn in payloads:
+        columns = columns_fn()
+
+        json_bytes, json_ms = timed(encode_json, columns)
+        binary, binary_ms = timed(encode_columns, columns)
+
+        records = orjson.loads(json_bytes)
+        decoded = decode_columns(binary)
+        same = decoded["rows"] == len(records) and all(
+            same_values(records, column, values) for column, values in decoded["columns"].items()
+        )
+        ok = ok and same
+
+        print(f"   {name:<24} {len(records):>6,}   {len(json_bytes):>9,} {len(binary):>9,} "
+              f"{len(gzip.compress(json_bytes)):>9,} {len(gzip.compress(binary)):>9,}   "
+              f"{json_ms:8.3f} {binary_ms:8.3f}   {'round-trips' if same else 'DIFFERENT'}")
+
+    if ok:
+        print("\n   ✅ columnar payloads decode to the JSON values")
+    else:
+        print("\n   ❌ columnar payloads differ from the JSON values")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,77 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
+import json
 import requests
-from services.safetyai import process_safety_query
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
+from contextlib import asynccontextmanager
+from services.safetyai import process_safety_query, stream_safety_query
+from services.intent_classifier import classifier_stats
 
 
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-from services.predict import predict_pipeline
-from services.location_service import get_features_from_location
-from agents.agent_controller import agent_pipeline
+from services.predict import predict_pipeline, predict_pipeline_batch, prepare_matrix
+from services.location_service import get_features_from_location, get_features_from_locations
+from agents.agent_controller import agent_pipeline, stream_agent_pipeline
+from services.cache import cache_stats
+from services.serialization import ORJSONResponse, wants_columnar, columnar_response
+from services.dashboard_cube import normalize_filters, warm_dashboard_cube
+from services.geocode_service import (
+    enrich_with_address_async,
+    queue_addresses,
+    prewarm_hotspot_addresses,
+    geocode_status,
+    GEOCODE_FOLLOWUP_DEADLINE
+)
+from services.tile_service import get_tile, valid_tile, tile_etag, etag_matches, TILE_MAX_AGE
+from services.grid_index import bounding_box
+from services.area_stats import get_area_stats
+from starlette.concurrency import run_in_threadpool
+from agents.llm_guard import llm_status
 from pydantic import BaseModel
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel  
-from services.heatmap_service import get_heatmap_data, get_clustered_heatmap_data
+from services.heatmap_service import (
+    get_heatmap_data,
+    get_heatmap_columns,
+    get_clustered_heatmap_data,
+    get_clustered_heatmap_columns
+)
 from services.dashboard_service import (
     get_dashboard_statistics,
     get_risk_factors_distribution,
     get_top_risky_locations,
     get_severity_by_conditions,
     get_geographical_distribution,
+    get_geographical_distribution_columns,
     get_time_trends
 )
 
-app = FastAPI(title="AI Road Risk Prediction API")
+# ---------------------------------------------------
+# Startup
+# ---------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the filtered-dashboard cube now, not on the first filtered
+    # request (reloads rebuild it through dataset.after_reload)
+    warm_dashboard_cube()
+
+    # With GEOCODE_PREWARM=1, one worker geocodes the top hotspots in the
+    # background so risky-locations is served from the address cache
+    prewarm_hotspot_addresses()
+
+    yield
+
+
+app = FastAPI(title="AI Road Risk Prediction API", default_response_class=ORJSONResponse, lifespan=lifespan)
+
+# Endpoints that negotiate JSON vs columnar binary on the Accept header
+VARY_ACCEPT = {"Vary": "Accept"}
 
 
 # ---------------------------------------------------
@@ -98,6 +140,22 @@ class AccidentInput(BaseModel):
     Weather_Conditions: float | None = None
 
 
+# ---------------------------------------------------
+# Request Models (Batch)
+# ---------------------------------------------------
+MAX_BATCH_POINTS = 10000
+
+
+class LocationPoint(BaseModel):
+    lat: float
+    lon: float
+
+
+class BatchLocationInput(BaseModel):
+    points: list[LocationPoint]
+    narrate: bool = False  # LLM explanation + recommendations per point
+
+
 # ---------------------------------------------------
 # Health Check
 # ---------------------------------------------------
@@ -106,90 +164,189 @@ def root():
     return {"message": "AI Road Risk Prediction API Running"}
 
 
+@app.get("/cache/stats")
+def get_cache_stats():
+    """
+    Hit / miss / eviction counters for every in-process cache
+    Use these to size PREDICTION_CACHE_SIZE, AGENT_CACHE_SIZE, etc.
+    """
+    return cache_stats()
+
+
+@app.get("/llm/status")
+def get_llm_status():
+    """
+    Per-endpoint LLM latency budgets and circuit breaker state
+    """
+    return llm_status()
+
+
+@app.get("/geocode/status")
+def get_geocode_status():
+    """
+    Address cache size / hit rate and the background geocoder queue
+    """
+    return geocode_status()
+
+
+@app.get("/safety_ai/classifier/stats")
+def get_classifier_stats():
+    """
+    Local intent classifier hit rate and held-out accuracy
+    """
+    return classifier_stats()
+
+
 # ===================================================
 # DASHBOARD ENDPOINTS
 # ===================================================
 
+def dashboard_filters(
+    hour: list[int] | None = Query(None),
+    day_of_week: list[int] | None = Query(None),
+    month: list[int] | None = Query(None),
+    weather: list[int] | None = Query(None),
+    light: list[int] | None = Query(None),
+    road_surface: list[int] | None = Query(None),
+    speed_limit: list[int] | None = Query(None),
+    urban_rural: list[int] | None = Query(None),
+    severity: list[int] | None = Query(None)
+):
+    """
+    Optional dataset codes to filter on; repeat a parameter to match
+    several values, e.g. ?road_surface=2&light=4&light=5&light=6&speed_limit=30
+    """
+    return normalize_filters(
+        hour=hour, day_of_week=day_of_week, month=month, weather=weather,
+        light=light, road_surface=road_surface, speed_limit=speed_limit,
+        urban_rural=urban_rural, severity=severity
+    )
+
+
+def map_viewport(
+    min_lat: float | None = None,
+    min_lon: float | None = None,
+    max_lat: float | None = None,
+    max_lon: float | None = None
+):
+    """
+    Optional viewport for the map endpoints; all four bounds or none
+    """
+    try:
+        return bounding_box(min_lat, min_lon, max_lat, max_lon)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.get("/dashboard/statistics")
-def dashboard_statistics():
+def dashboard_statistics(filters=Depends(dashboard_filters)):
     """
     Returns overall accident statistics for dashboard
     Includes: total accidents, casualties, severity distribution, etc.
     """
     try:
-        return get_dashboard_statistics()
+        return ORJSONResponse(get_dashboard_statistics(filters))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/dashboard/risk-factors")
-def risk_factors():
+def risk_factors(filters=Depends(dashboard_filters)):
     """
     Returns distribution of various risk factors
     Includes: weather, light conditions, road surface, speed limits
     """
     try:
-        return get_risk_factors_distribution()
+        return ORJSONResponse(get_risk_factors_distribution(filters))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-geolocator = Nominatim(user_agent="accident-dashboard")
-reverse = RateLimiter(geolocator.reverse, min_delay_seconds=1)
-
-def enrich_with_address(locations):
-    for loc in locations:
-        try:
-            result = reverse(f"{loc['lat']}, {loc['lon']}", language="en")
-            loc["address"] = result.address if result else f"{loc['lat']:.4f}, {loc['lon']:.4f}"
-        except Exception:
-            loc["address"] = f"{loc['lat']:.4f}, {loc['lon']:.4f}"
-    return locations
+@app.get("/dashboard/risky-locations")
+async def risky_locations(limit: int = 10, offset: int = 0, addresses: bool = True):
+    """
+    Top hotspots, ranked. Uncached addresses are looked up in the
+    background for at most GEOCODE_DEADLINE seconds; locations still
+    waiting get a fallback address and "address_pending": true.
+    With addresses=false only the ranking is returned and the addresses
+    come from /dashboard/risky-locations/addresses.
+    offset pages through the ranking (ranks offset+1 .. offset+limit).
+    """
+    try:
+        if limit > 50:
+            limit = 50
+        locations = await run_in_threadpool(get_top_risky_locations, limit, max(offset, 0))
+        if not addresses:
+            queue_addresses(locations)
+            return ORJSONResponse(locations)
+        return ORJSONResponse(await enrich_with_address_async(locations))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/dashboard/risky-locations")
-def risky_locations(limit: int = 10):
+@app.get("/dashboard/risky-locations/addresses")
+async def risky_location_addresses(limit: int = 10, offset: int = 0):
+    """
+    Addresses for the top hotspots, by rank. Waits up to
+    GEOCODE_FOLLOWUP_DEADLINE seconds for pending lookups; poll again
+    while any "address_pending" is true.
+    """
     try:
         if limit > 50:
             limit = 50
-        locations = get_top_risky_locations(limit)
-        return enrich_with_address(locations)
+        locations = await run_in_threadpool(get_top_risky_locations, limit, max(offset, 0))
+        locations = await enrich_with_address_async(locations, timeout=GEOCODE_FOLLOWUP_DEADLINE)
+        return ORJSONResponse([
+            {
+                "rank": loc["rank"],
+                "lat": loc["lat"],
+                "lon": loc["lon"],
+                "address": loc["address"],
+                "address_pending": loc["address_pending"]
+            }
+            for loc in locations
+        ])
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/dashboard/severity-analysis")
-def severity_analysis():
+def severity_analysis(filters=Depends(dashboard_filters)):
     """
     Returns severity breakdown by different conditions
     Includes analysis by: speed, hour, day of week, weather, vehicle count
+    (vehicle count only when unfiltered)
     """
     try:
-        return get_severity_by_conditions()
+        return ORJSONResponse(get_severity_by_conditions(filters))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/dashboard/geo-distribution")
-def geo_distribution():
+def geo_distribution(request: Request, box=Depends(map_viewport)):
     """
     Returns geographical distribution of accidents
     Shows accident hotspots across different regions
+    (only inside min_lat/min_lon/max_lat/max_lon when given;
+    columnar binary with Accept: application/vnd.risk.columnar)
     """
     try:
-        return get_geographical_distribution()
+        if wants_columnar(request.headers.get("accept")):
+            return columnar_response(get_geographical_distribution_columns(box), headers=VARY_ACCEPT)
+        return ORJSONResponse(get_geographical_distribution(box), headers=VARY_ACCEPT)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/dashboard/time-trends")
-def time_trends():
+def time_trends(filters=Depends(dashboard_filters)):
     """
     Returns accident trends over time
     Includes: monthly, hourly, and daily patterns
     """
     try:
-        return get_time_trends()
+        return ORJSONResponse(get_time_trends(filters))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -199,33 +356,86 @@ def time_trends():
 # ===================================================
 
 @app.get("/risk_heatmap")
-def risk_heatmap(sample_size: int = 1000, severity: int | None = None):
+def risk_heatmap(
+    request: Request,
+    sample_size: int = 1000,
+    severity: int | None = None,
+    box=Depends(map_viewport)
+):
     """
     Returns heatmap data for accident visualization
     Query parameters:
     - sample_size: Number of points to return (default: 1000)
     - severity: Filter by severity (0=Fatal, 1=Serious, 2=Slight)
+    - min_lat, min_lon, max_lat, max_lon: Only points inside this viewport
+    Columnar binary with Accept: application/vnd.risk.columnar
     """
     try:
         if sample_size > 5000:
             sample_size = 5000  # Prevent overload
-        return get_heatmap_data(sample_size, severity)
+        if wants_columnar(request.headers.get("accept")):
+            return columnar_response(get_heatmap_columns(sample_size, severity, box), headers=VARY_ACCEPT)
+        return ORJSONResponse(get_heatmap_data(sample_size, severity, box), headers=VARY_ACCEPT)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/risk_heatmap_clustered")
-def risk_heatmap_clustered(grid_size: float = 0.05):
+def risk_heatmap_clustered(request: Request, grid_size: float = 0.05, box=Depends(map_viewport)):
     """
     Returns clustered heatmap data (better performance)
     Query parameter: grid_size (default: 0.05 degrees ≈ 5.5km)
+    Optional min_lat, min_lon, max_lat, max_lon: only accidents inside
+    Columnar binary with Accept: application/vnd.risk.columnar
     """
     try:
         if grid_size < 0.01:
             grid_size = 0.01
         if grid_size > 0.5:
             grid_size = 0.5
-        return get_clustered_heatmap_data(grid_size)
+        if wants_columnar(request.headers.get("accept")):
+            return columnar_response(get_clustered_heatmap_columns(grid_size, box), headers=VARY_ACCEPT)
+        return ORJSONResponse(get_clustered_heatmap_data(grid_size, box), headers=VARY_ACCEPT)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/tiles/{z}/{x}/{y}")
+def risk_tile(z: int, x: int, y: int, request: Request):
+    """
+    Accident aggregates (count, mean severity, casualties, vehicles) for
+    each non-empty cell of slippy-map tile z/x/y, from the precomputed
+    tile pyramid. Supports If-None-Match; the ETag changes only when the
+    dataset does.
+    """
+    if not valid_tile(z, x, y):
+        raise HTTPException(status_code=404, detail=f"No tile {z}/{x}/{y}")
+
+    try:
+        etag = tile_etag(z, x, y)
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={TILE_MAX_AGE}"}
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        return ORJSONResponse(get_tile(z, x, y), headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/area-stats")
+def area_stats(box=Depends(map_viewport)):
+    """
+    Accidents, casualties, fatal accidents and the severity breakdown
+    inside min_lat/min_lon/max_lat/max_lon, from precomputed summed-area
+    tables (constant time for any rectangle). The box is snapped outward
+    to the ~1km raster; "bounds" is the area actually counted.
+    """
+    if box is None:
+        raise HTTPException(status_code=400, detail="min_lat, min_lon, max_lat and max_lon are required")
+
+    try:
+        return ORJSONResponse(get_area_stats(box))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -234,6 +444,21 @@ def risk_heatmap_clustered(grid_size: float = 0.05):
 # PREDICTION ENDPOINTS
 # ===================================================
 
+def sse_event(event, payload):
+    """
+    Formats one Server-Sent Event
+    """
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def sse_response(events):
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 def format_response(agent_output):
     """
     Ensures frontend always receives the same response structure
@@ -276,6 +501,78 @@ def predict(data: AccidentInput):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/predict/stream")
+def predict_stream(data: AccidentInput):
+    """
+    Streaming (SSE) variant of /predict
+    Events: "prediction" (risk level, score, top factors) right after
+    the model runs, then "explanation" and "recommendation" as each LLM
+    call finishes, then "result" with the usual /predict response.
+    """
+    try:
+        prediction = predict_pipeline(data.dict())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    def events():
+        yield sse_event("prediction", {
+            "risk_level": prediction["risk_level"],
+            "risk_score": prediction["risk_score"],
+            "top_factors": prediction["top_factors"]
+        })
+
+        for name, output in stream_agent_pipeline(prediction, endpoint="predict"):
+            yield sse_event(name, output)
+
+        yield sse_event("result", format_response(prediction))
+
+    return sse_response(events())
+
+
+@app.post("/predict/batch")
+def predict_batch(data: list[AccidentInput], narrate: bool = False):
+    """
+    Manual prediction for many accident records in one call
+    Records are packed into one float32 matrix and scored with a single
+    model + SHAP pass. LLM narration is opt-in via ?narrate=true.
+    """
+    if len(data) > MAX_BATCH_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_POINTS} records per request"
+        )
+
+    if not data:
+        return []
+
+    try:
+        # Records → one model feature matrix
+        X = prepare_matrix([record.dict() for record in data])
+
+        # ML Prediction (single pass)
+        predictions = predict_pipeline_batch(X)
+
+        results = []
+        for prediction in predictions:
+            result = {
+                "risk_level": prediction["risk_level"],
+                "risk_score": prediction["risk_score"],
+                "top_factors": prediction["top_factors"]
+            }
+
+            if narrate:
+                narrated = format_response(agent_pipeline(prediction))
+                result["explanation"] = narrated["explanation"]
+                result["recommendation"] = narrated["recommendation"]
+
+            results.append(result)
+
+        return results
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/predict_location")
 def predict_location(lat: float, lon: float):
     """
@@ -296,12 +593,62 @@ def predict_location(lat: float, lon: float):
         prediction = predict_pipeline(features)
 
         # AI Agents
-        agent_output = agent_pipeline(prediction)
+        agent_output = agent_pipeline(prediction, endpoint="predict_location")
 
         return format_response(agent_output)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/predict_location/batch")
+def predict_location_batch(data: BatchLocationInput):
+    """
+    Location-based prediction for many coordinates in one call
+    Resolves all nearest accidents in one index query and runs the
+    model + SHAP once over the whole feature matrix.
+    LLM narration is opt-in via "narrate".
+    """
+    if len(data.points) > MAX_BATCH_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_POINTS} points per request"
+        )
+
+    if not data.points:
+        return []
+
+    try:
+        lats = [p.lat for p in data.points]
+        lons = [p.lon for p in data.points]
+
+        # Locations → one model feature matrix
+        X = get_features_from_locations(lats, lons)
+
+        # ML Prediction (single pass)
+        predictions = predict_pipeline_batch(X)
+
+        results = []
+        for point, prediction in zip(data.points, predictions):
+            result = {
+                "lat": point.lat,
+                "lon": point.lon,
+                "risk_level": prediction["risk_level"],
+                "risk_score": prediction["risk_score"],
+                "top_factors": prediction["top_factors"]
+            }
+
+            if data.narrate:
+                narrated = format_response(agent_pipeline(prediction, endpoint="predict_location"))
+                result["explanation"] = narrated["explanation"]
+                result["recommendation"] = narrated["recommendation"]
+
+            results.append(result)
+
+        return results
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
     
 # ===================================================
 # SAFETY AI CHATBOT ENDPOINT
@@ -328,7 +675,23 @@ def safety_ai_query(data: ChatQuery):
     """
     try:
         result = process_safety_query(data.query)
-        return result
+        return ORJSONResponse(result)
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/safety_ai/query/stream")
+def safety_ai_query_stream(data: ChatQuery):
+    """
+    Streaming (SSE) variant of /safety_ai/query
+    Events: "data" (intent, data, visualization) as soon as the analysis
+    is done, "token" chunks of the answer as the LLM generates them,
+    then "done" with the full response text (the structured answer,
+    replacing any partial tokens, if the LLM stream was cut short).
+    """
+    def events():
+        for event, payload in stream_safety_query(data.query):
+            yield sse_event(event, payload)
+
+    return sse_response(events())
\ No newline at end of file
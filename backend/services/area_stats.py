@@ -0,0 +1,176 @@
+"""
+Area Statistics
+Accident, casualty and per-severity totals for any lat/lon rectangle in
+constant time, from summed-area tables (2D prefix sums) built once per
+dataset version.
+
+Accidents are counted on a raster of AREA_CELL_DEGREES cells (~1km at
+0.01°). For every measure, table[r, c] holds the sum over all cells
+below row r and left of column c, so any block of cells is four lookups:
+
+    S = T[r1, c1] - T[r0, c1] - T[r1, c0] + T[r0, c0]
+
+A rectangle is snapped outward to whole cells; the response reports the
+area actually covered. Cost is independent of the number of accidents.
+"""
+
+import os
+import numpy as np
+from typing import Dict, Any
+
+from services.dataset import dataset, dataset_memoized, on_reload
+from services.dashboard_service import SEVERITY_MAP
+
+
+@on_reload
+def _use_dataset(df):
+    global dataset
+    dataset = df
+
+
+AREA_CELL_DEGREES = float(os.environ.get("AREA_CELL_DEGREES", 0.01))
+AREA_MAX_CELLS = int(os.environ.get("AREA_MAX_CELLS", 4_000_000))   # coarser cells beyond this
+
+SEVERITY_LAYERS = [(key, label) for key, label in SEVERITY_MAP.items()]
+LAYERS = ["accident_count", "total_casualties"] + [label for _, label in SEVERITY_LAYERS]
+
+
+# ---------------------------------------------------
+# Summed-Area Tables
+# ---------------------------------------------------
+# Absorbs representation error, so e.g. 51.4 / 0.01 lands in cell 5140
+CELL_EPSILON = 1e-9
+
+
+def raster_cells(values, cell_degrees):
+    # Absolute cell numbers, so cell edges fall on multiples of the cell size
+    return np.floor(np.asarray(values, dtype=np.float64) / cell_degrees + CELL_EPSILON).astype(np.int64)
+
+
+def covering_cells(low, high, cell_degrees):
+    """
+    First and last cell of [low, high]; a `high` on a cell edge closes the
+    range, so 51.4 .. 51.6 covers exactly 20 cells of 0.01°
+    """
+    first = int(raster_cells([low], cell_degrees)[0])
+    last = int(np.ceil(high / cell_degrees - CELL_EPSILON)) - 1
+    return first, max(first, last)
+
+
+def build_area_tables(df, cell_degrees=AREA_CELL_DEGREES) -> Dict[str, Any]:
+    """
+    {"tables": (layers, rows + 1, cols + 1) prefix sums, "layers",
+    "lat_cell0", "lon_cell0", "cell_degrees"}
+    """
+
+    lat = df["latitude"].to_numpy(dtype=np.float64)
+    lon = df["longitude"].to_numpy(dtype=np.float64)
+    located = ~(np.isnan(lat) | np.isnan(lon))
+    lat, lon = lat[located], lon[located]
+
+    # Outlying coordinates would make the raster huge: coarsen instead
+    while True:
+        lat_cells, lon_cells = raster_cells(lat, cell_degrees), raster_cells(lon, cell_degrees)
+        lat_cell0 = int(lat_cells.min()) if len(lat) else 0
+        lon_cell0 = int(lon_cells.min()) if len(lon) else 0
+        n_lat = int(lat_cells.max()) - lat_cell0 + 1 if len(lat) else 1
+        n_lon = int(lon_cells.max()) - lon_cell0 + 1 if len(lon) else 1
+        if n_lat * n_lon <= AREA_MAX_CELLS:
+            break
+        cell_degrees *= 2
+
+    flat = (lat_cells - lat_cell0) * n_lon + (lon_cells - lon_cell0)
+
+    severity = df["Accident_Severity"].to_numpy(dtype=np.float64)[located]
+    casualties = np.nan_to_num(df["Number_of_Casualties"].to_numpy(dtype=np.float64)[located])
+    weights = [None, casualties] + [(severity == key).astype(np.float64) for key, _ in SEVERITY_LAYERS]
+
+    tables = np.zeros((len(LAYERS), n_lat + 1, n_lon + 1), dtype=np.int64)
+    for layer, layer_weights in enumerate(weights):
+        raster = np.bincount(flat, weights=layer_weights, minlength=n_lat * n_lon)
+        tables[layer, 1:, 1:] = np.rint(raster).astype(np.int64).reshape(n_lat, n_lon).cumsum(axis=0).cumsum(axis=1)
+
+    if tables.max(initial=0) < 2 ** 31:
+        tables = tables.astype(np.int32)
+
+    return {
+        "tables": tables,
+        "layers": LAYERS,
+        "lat_cell0": lat_cell0,
+        "lon_cell0": lon_cell0,
+        "cell_degrees": cell_degrees
+    }
+
+
+@dataset_memoized("area.tables", maxsize=1, copy=False)
+def area_tables() -> Dict[str, Any]:
+    """
+    Summed-area tables for the shared dataset (read-only; built once per
+    dataset version)
+    """
+    return build_area_tables(dataset)
+
+
+# ---------------------------------------------------
+# Queries
+# ---------------------------------------------------
+def area_totals(sat, box) -> Dict[str, Any]:
+    """
+    {"bounds", "cell_degrees", layer: total...} for the cells covering
+    box = (min_lat, min_lon, max_lat, max_lon): four lookups per layer,
+    whatever the size of the box
+    """
+
+    min_lat, min_lon, max_lat, max_lon = box
+    size = sat["cell_degrees"]
+    tables = sat["tables"]
+    n_lat, n_lon = tables.shape[1] - 1, tables.shape[2] - 1
+
+    # Cells covering the box, then the part of them inside the raster
+    first_lat, last_lat = covering_cells(min_lat, max_lat, size)
+    first_lon, last_lon = covering_cells(min_lon, max_lon, size)
+
+    r0 = min(max(first_lat - sat["lat_cell0"], 0), n_lat)
+    r1 = min(max(last_lat - sat["lat_cell0"] + 1, 0), n_lat)
+    c0 = min(max(first_lon - sat["lon_cell0"], 0), n_lon)
+    c1 = min(max(last_lon - sat["lon_cell0"] + 1, 0), n_lon)
+
+    totals = (
+        tables[:, r1, c1].astype(np.int64) - tables[:, r0, c1] -
+        tables[:, r1, c0] + tables[:, r0, c0]
+    )
+
+    return {
+        "bounds": {
+            "min_lat": round(first_lat * size, 6),
+            "min_lon": round(first_lon * size, 6),
+            "max_lat": round((last_lat + 1) * size, 6),
+            "max_lon": round((last_lon + 1) * size, 6)
+        },
+        "cell_degrees": size,
+        **dict(zip(sat["layers"], totals.tolist()))
+    }
+
+
+def get_area_stats(box) -> Dict[str, Any]:
+    """
+    Accidents, casualties and severity breakdown inside a lat/lon box
+    (snapped outward to the AREA_CELL_DEGREES raster)
+    """
+
+    totals = area_totals(area_tables(), box)
+    count = totals["accident_count"]
+
+    by_severity = {label: totals[label] for _, label in SEVERITY_LAYERS}
+    known = sum(by_severity.values())
+    avg_severity = sum(key * by_severity[label] for key, label in SEVERITY_LAYERS) / known if known else None
+
+    return {
+        "bounds": totals["bounds"],
+        "cell_degrees": totals["cell_degrees"],
+        "accident_count": count,
+        "total_casualties": totals["total_casualties"],
+        "fatal_accidents": by_severity[SEVERITY_MAP[0.0]],
+        "by_severity": by_severity,
+        "avg_severity": None if avg_severity is None else round(avg_severity, 2)
+    }
@@ -0,0 +1,149 @@
+"""
+In-Process Caches
+Thread-safe LRU cache with size- and TTL-based eviction, plus a registry
+so every cache's hit/miss/eviction counters can be inspected in one place.
+"""
+
+import time
+import hashlib
+import functools
+import threading
+import numpy as np
+from copy import deepcopy
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+# name → cache, for the /cache/stats endpoint
+CACHES: Dict[str, "TTLCache"] = {}
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Least-recently-used cache bounded by entry count, with optional
+    per-entry time-to-live
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        CACHES[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Counters for every registered cache
+    """
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+# ---------------------------------------------------
+# Cache Keys
+# ---------------------------------------------------
+def feature_vector_key(row, decimals=4):
+    """
+    Hash of a quantized, aligned feature vector. NaNs are normalised so
+    that missing features always hash the same way.
+    """
+
+    quantized = np.round(np.asarray(row, dtype=np.float64), decimals)
+    quantized[np.isnan(quantized)] = np.inf
+    quantized += 0.0  # -0.0 → 0.0
+
+    return hashlib.blake2b(quantized.tobytes(), digest_size=16).hexdigest()
+
+
+# ---------------------------------------------------
+# Memoization
+# ---------------------------------------------------
+def memoize(name: str, version, maxsize: int = 256, copy: bool = True):
+    """
+    Caches a function's results keyed by version() plus its arguments.
+    When version() changes, earlier results are never served again.
+    Callers get a deep copy, so mutating a result can't corrupt the cache
+    (copy=False hands out the cached object itself; read-only use only).
+    """
+
+    def decorator(fn):
+        cache = TTLCache(name, maxsize=maxsize)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (version(), args, tuple(sorted(kwargs.items())))
+
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = fn(*args, **kwargs)
+                cache.set(key, value)
+
+            return deepcopy(value) if copy else value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
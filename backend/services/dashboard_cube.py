@@ -0,0 +1,282 @@
+"""
+Dashboard OLAP Cube
+Count / casualty / vehicle cubes over the categorical columns, so
+filtered dashboard queries ("time trends for wet roads at night in
+30 mph zones") are answered from per-cell sums instead of scanning rows.
+Small cubes are dense arrays that are sliced and summed; larger ones keep
+only the occupied cells, which are masked and binned.
+
+Each axis holds the values observed in the data. filtered_aggregates()
+returns the same structure as dashboard_engine.dashboard_aggregates(),
+so dashboard_service formats filtered and unfiltered results the same
+way. Location cells and Number_of_Vehicles are not cube axes; those
+breakdowns are only available unfiltered.
+"""
+
+import os
+import time
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+
+from services.dataset import dataset, dataset_memoized, on_reload, after_reload
+
+
+@on_reload
+def _use_dataset(df):
+    global dataset
+    dataset = df
+
+
+# Cube axes: (column, query parameter)
+CUBE_DIMENSIONS = [
+    ("Hour", "hour"),
+    ("Day_of_Week", "day_of_week"),
+    ("Month", "month"),
+    ("Weather_Conditions", "weather"),
+    ("Light_Conditions", "light"),
+    ("Road_Surface_Conditions", "road_surface"),
+    ("Speed_limit", "speed_limit"),
+    ("Urban_or_Rural_Area", "urban_rural"),
+    ("Accident_Severity", "severity")
+]
+
+CUBE_COLUMNS = [column for column, _ in CUBE_DIMENSIONS]
+FILTER_PARAMS = {param: column for column, param in CUBE_DIMENSIONS}
+SEVERITY_AXIS = CUBE_COLUMNS.index("Accident_Severity")
+
+# Dense cubes only pay off while most cells are occupied; beyond this
+# the cube keeps just the occupied cells (slicing and summing a mostly
+# empty dense cube costs more than a pass over its occupied cells)
+CUBE_MAX_CELLS = int(os.environ.get("CUBE_MAX_CELLS", 1_000_000))
+
+
+# ---------------------------------------------------
+# Filters
+# ---------------------------------------------------
+def normalize_filters(**params) -> Optional[Tuple]:
+    """
+    Query parameters → hashable filter spec, e.g.
+    (("Light_Conditions", (4.0, 5.0)), ("Speed_limit", (30.0,)))
+    None when nothing is filtered.
+    """
+
+    filters = []
+    for param, values in params.items():
+        if values is None:
+            continue
+        if param not in FILTER_PARAMS:
+            raise ValueError(f"Unknown dashboard filter: {param}")
+        filters.append((FILTER_PARAMS[param], tuple(sorted({float(v) for v in values}))))
+
+    return tuple(sorted(filters)) or None
+
+
+# ---------------------------------------------------
+# Cube
+# ---------------------------------------------------
+def smallest_uint(max_value):
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+def build_cube(df, max_cells=CUBE_MAX_CELLS) -> Dict[str, Any]:
+    """
+    {"keys", "dense", "counts", "casualties", "vehicles"}: dense cubes
+    when the axes span at most max_cells cells, otherwise per-cell sums
+    for the occupied cells plus their axis "codes".
+    Rows with a missing value on any axis can't be placed and are left
+    out of the cube
+    """
+
+    columns = [df[column].to_numpy(dtype=np.float64) for column in CUBE_COLUMNS]
+
+    placed = np.ones(len(df), dtype=bool)
+    for values in columns:
+        placed &= ~np.isnan(values)
+
+    keys = []
+    codes = []
+    for values in columns:
+        values = values[placed]
+        axis_keys = np.unique(values)
+        keys.append(axis_keys)
+        codes.append(np.searchsorted(axis_keys, values))
+
+    shape = tuple(len(k) for k in keys)
+    flat = np.ravel_multi_index(codes, shape) if len(codes[0]) else np.array([], dtype=np.intp)
+    size = int(np.prod(shape))
+
+    # Sums are taken per occupied cell (sorted runs of equal keys), then
+    # written into a cube of the final compact dtype: no temporaries the
+    # size of the cube, which is mostly empty
+    order = np.argsort(flat, kind="stable")
+    flat = flat[order]
+    starts = np.flatnonzero(np.concatenate(([True], flat[1:] != flat[:-1]))) if len(flat) else flat
+    cells = flat[starts]
+
+    def cell_sums(weights=None):
+        if weights is None:
+            sums = np.diff(np.append(starts, len(flat)))
+        elif len(flat):
+            sums = np.rint(np.add.reduceat(weights[order], starts))
+        else:
+            sums = np.zeros(0)
+        return sums.astype(smallest_uint(sums.max() if len(sums) else 0))
+
+    def cube(sums):
+        values = np.zeros(size, dtype=sums.dtype)
+        values[cells] = sums
+        return values.reshape(shape)
+
+    casualties = np.nan_to_num(df["Number_of_Casualties"].to_numpy(dtype=np.float64)[placed])
+    vehicles = np.nan_to_num(df["Number_of_Vehicles"].to_numpy(dtype=np.float64)[placed])
+    measures = {"counts": cell_sums(), "casualties": cell_sums(casualties), "vehicles": cell_sums(vehicles)}
+
+    if size <= max_cells:
+        return {"keys": keys, "dense": True, **{name: cube(sums) for name, sums in measures.items()}}
+
+    # Too many axis combinations for a dense cube: keep the occupied
+    # cells only (at most one per row)
+    cell_codes = np.unravel_index(cells, shape)
+    return {
+        "keys": keys,
+        "dense": False,
+        "codes": [axis_codes.astype(smallest_uint(len(k))) for axis_codes, k in zip(cell_codes, keys)],
+        **measures
+    }
+
+
+@dataset_memoized("dashboard.cube", maxsize=1, copy=False)
+def dashboard_cube() -> Dict[str, Any]:
+    """
+    Cube for the shared dataset (read-only; built once per dataset
+    version, at startup and after every reload via warm_dashboard_cube)
+    """
+    return build_cube(dataset)
+
+
+@after_reload
+def warm_dashboard_cube():
+    """
+    Builds the cube ahead of the first filtered query, so that request
+    doesn't pay for it
+    """
+    start = time.perf_counter()
+    cube = dashboard_cube()
+    layout = "dense" if cube["dense"] else "sparse"
+    print(f"Dashboard cube ready: {cube['counts'].size:,} {layout} cells in {time.perf_counter() - start:.2f}s")
+
+
+def slice_cube(cube, name, filters):
+    """
+    The cube restricted to the filtered axis values (axes are kept, so
+    the result can still be summed along any dimension)
+    """
+
+    values = cube[name]
+    for column, wanted in filters or ():
+        axis = CUBE_COLUMNS.index(column)
+        positions = np.flatnonzero(np.isin(cube["keys"][axis], wanted))
+        values = np.take(values, positions, axis=axis)
+    return values
+
+
+def sliced_keys(cube, filters):
+    keys = list(cube["keys"])
+    for column, wanted in filters or ():
+        axis = CUBE_COLUMNS.index(column)
+        keys[axis] = keys[axis][np.isin(keys[axis], wanted)]
+    return keys
+
+
+# ---------------------------------------------------
+# Filtered Aggregates
+# ---------------------------------------------------
+def marginal(values, axes):
+    """
+    Sum over every axis except `axes` (kept in order)
+    """
+    others = tuple(i for i in range(values.ndim) if i not in axes)
+    return values.sum(axis=others, dtype=np.int64)
+
+
+def dense_totals(cube, filters):
+    """
+    (keys, by_severity(axis), totals) from the sliced dense cube
+    """
+
+    counts = slice_cube(cube, "counts", filters)
+
+    def by_severity(axis):
+        if axis == SEVERITY_AXIS:
+            return marginal(counts, (axis,))[:, None] * np.eye(counts.shape[axis], dtype=np.int64)
+        return marginal(counts, (axis, SEVERITY_AXIS))
+
+    totals = {name: int(slice_cube(cube, name, filters).sum(dtype=np.int64)) for name in ("counts", "casualties", "vehicles")}
+    return sliced_keys(cube, filters), by_severity, totals
+
+
+def sparse_totals(cube, filters):
+    """
+    (keys, by_severity(axis), totals) from the occupied cells matching
+    the filters
+    """
+
+    keys, codes = cube["keys"], cube["codes"]
+    kept = [np.arange(len(axis_keys)) for axis_keys in keys]
+    selected = np.ones(len(cube["counts"]), dtype=bool)
+    for column, wanted in filters or ():
+        axis = CUBE_COLUMNS.index(column)
+        wanted_keys = np.isin(keys[axis], wanted)
+        selected &= wanted_keys[codes[axis]]
+        kept[axis] = np.flatnonzero(wanted_keys)
+
+    counts = cube["counts"][selected]
+    n_severity = len(keys[SEVERITY_AXIS])
+    severity_codes = codes[SEVERITY_AXIS][selected].astype(np.int64)
+
+    def by_severity(axis):
+        pairs = codes[axis][selected].astype(np.int64) * n_severity + severity_codes
+        table = np.bincount(pairs, weights=counts, minlength=len(keys[axis]) * n_severity)
+        table = np.rint(table).astype(np.int64).reshape(len(keys[axis]), n_severity)
+        return table[kept[axis]][:, kept[SEVERITY_AXIS]]
+
+    totals = {name: int(cube[name][selected].sum(dtype=np.int64)) for name in ("counts", "casualties", "vehicles")}
+    return [axis_keys[positions] for axis_keys, positions in zip(keys, kept)], by_severity, totals
+
+
+@dataset_memoized("dashboard.filtered_aggregates", maxsize=512, copy=False)
+def filtered_aggregates(filters) -> Dict[str, Any]:
+    """
+    dashboard_aggregates()-shaped result for the rows matching `filters`
+    (a normalize_filters() spec), computed from the cube only
+    """
+
+    cube = dashboard_cube()
+    keys, by_severity_of, totals = (dense_totals if cube["dense"] else sparse_totals)(cube, filters)
+
+    severity_keys = keys[SEVERITY_AXIS]
+    high_risk = severity_keys <= 1.0
+    rows = totals["counts"]
+
+    dimensions = {}
+    for axis, column in enumerate(CUBE_COLUMNS):
+        by_severity = by_severity_of(axis)
+
+        dimensions[column] = {
+            "keys": keys[axis],
+            "rows": by_severity.sum(axis=1),
+            "severity_count": by_severity.sum(axis=1),
+            "severity_sum": by_severity @ severity_keys,
+            "high_risk": by_severity[:, high_risk].sum(axis=1),
+            "first_seen": None  # ties in value_counts fall back to key order
+        }
+
+    return {
+        "rows": rows,
+        "total_casualties": float(totals["casualties"]),
+        "avg_vehicles": totals["vehicles"] / rows if rows else float("nan"),
+        "dimensions": dimensions
+    }
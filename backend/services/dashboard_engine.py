@@ -0,0 +1,374 @@
+"""
+Fused Dashboard Aggregation Engine
+Computes every aggregate behind the /dashboard/* endpoints in one pass
+over the columns: each categorical column is integer-coded once, then
+counts, severity sums and high-risk counts come from np.bincount.
+Location cells are coded the same way (rounded coordinates packed into
+one integer key), so no groupby / apply / dataframe copies are needed.
+Hotspot cells (top risky locations) live in hotspot_engine.
+
+dashboard_service formats its responses from the result of
+dashboard_aggregates(), which is computed once per dataset version.
+"""
+
+import numpy as np
+from typing import Dict, Any
+
+from services.dataset import dataset, dataset_memoized, on_reload
+from services.grid_index import rows_in_box
+
+
+@on_reload
+def _use_dataset(df):
+    global dataset
+    dataset = df
+
+
+# Columns grouped on by the dashboard
+DIMENSIONS = [
+    "Accident_Severity",
+    "Hour",
+    "Day_of_Week",
+    "Month",
+    "Weather_Conditions",
+    "Light_Conditions",
+    "Road_Surface_Conditions",
+    "Speed_limit",
+    "Urban_or_Rural_Area",
+    "Number_of_Vehicles"
+]
+
+GEO_BIN_SIZE = 0.1     # geographical distribution: ~11km cells
+
+
+# ---------------------------------------------------
+# Integer Coding
+# ---------------------------------------------------
+def integer_codes(values):
+    """
+    Maps a column to integer codes for bincount.
+    Returns (keys, codes, valid); rows with a missing value are dropped
+    (valid is None when there are none), matching pandas groupby.
+
+    Small-range integer columns are coded as value - min, so keys is the
+    whole range and may contain values that never occur; callers skip
+    empty codes. Anything else is coded through a sort (np.unique).
+    """
+
+    values = np.asarray(values)
+    valid = None
+
+    if values.dtype.kind == "f":
+        mask = ~np.isnan(values)
+        if not mask.all():
+            valid = mask
+            values = values[mask]
+
+    if len(values) == 0:
+        return np.array([], dtype=np.float64), np.array([], dtype=np.intp), valid
+
+    low, high = values.min(), values.max()
+    integral = values.dtype.kind in "iub" or np.array_equal(values, np.floor(values))
+
+    if integral and high - low < max(len(values), 1 << 16):
+        low = int(low)
+        codes = values.astype(np.intp) - low
+        keys = np.arange(low, int(high) + 1)
+    else:
+        keys, codes = np.unique(values, return_inverse=True)
+
+    return keys, codes, valid
+
+
+def masked(array, valid):
+    return array if valid is None else array[valid]
+
+
+def severity_table(codes, k, severity_codes, n_severity):
+    """
+    Rows per (category, severity) from one integer bincount; the last
+    severity column counts rows whose severity is unknown
+    """
+    joint = codes * (n_severity + 1)
+    joint += severity_codes
+    return np.bincount(joint, minlength=k * (n_severity + 1)).reshape(k, n_severity + 1)
+
+
+# ---------------------------------------------------
+# Aggregation
+# ---------------------------------------------------
+def aggregate_dimension(values, severity):
+    """
+    Per-category row count, severity count / sum and high-risk
+    (fatal + serious) count
+    """
+
+    keys, codes, valid = integer_codes(values)
+    table = severity_table(codes, len(keys), masked(severity["codes"], valid), len(severity["keys"]))
+    known = table[:, :-1]
+
+    rows = table.sum(axis=1)
+    result = {
+        "keys": keys.astype(np.float64),
+        "rows": rows,
+        "severity_count": known.sum(axis=1),
+        "severity_sum": known @ severity["keys"],
+        "high_risk": known[:, severity["keys"] <= 1.0].sum(axis=1),
+        "first_seen": None
+    }
+
+    # value_counts orders equal counts by first appearance
+    present = np.flatnonzero(rows)
+    if len(np.unique(rows[present])) < len(present):
+        first_seen = np.zeros(len(keys), dtype=np.int64)
+        for code in present:
+            first_seen[code] = np.argmax(codes == code)
+        result["first_seen"] = first_seen
+
+    return result
+
+
+def aggregate_cells(cell_keys, severity, casualties):
+    """
+    Count, mean severity and casualties per location cell. Cells come
+    back in ascending key order (the order groupby sorts them); cells
+    with no known severity have a count of 0 and a NaN mean.
+    """
+
+    if len(cell_keys) and cell_keys.max() - cell_keys.min() >= max(len(cell_keys), 1 << 16):
+        # Sparse keys (e.g. ~110m cells): sort instead of factorizing
+        cells = aggregate_sparse_cells(cell_keys, severity, casualties)
+        if cells is not None:
+            return cells
+
+    keys, codes, _ = integer_codes(cell_keys)
+    k = len(keys)
+    table = severity_table(codes, k, severity["codes"], len(severity["keys"]))[:, :-1]
+    count = table.sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_severity = (table @ severity["keys"]) / count
+
+    return {
+        "keys": keys,
+        "accident_count": count,
+        "avg_severity": avg_severity,
+        "total_casualties": np.bincount(codes, weights=casualties, minlength=k)
+    }
+
+
+def aggregate_sparse_cells(cell_keys, severity, casualties):
+    """
+    aggregate_cells by run-length counting: (cell, severity, casualties)
+    are packed into one int64 per row and sorted, so each run of equal
+    values is one combination and its length is the row count. Returns
+    None when casualties aren't small integers (the packing would
+    overflow).
+    """
+
+    casualty_keys, casualty_codes, _ = integer_codes(casualties)
+    n_severity = len(severity["keys"]) + 1
+    n_casualties = max(len(casualty_keys), 1)
+
+    low = int(cell_keys.min())
+    if (int(cell_keys.max()) - low + 1) * n_severity * n_casualties >= 2 ** 62:
+        return None
+
+    packed = cell_keys - low
+    packed *= n_severity
+    packed += severity["codes"]
+    packed *= n_casualties
+    packed += casualty_codes
+    packed.sort()
+
+    starts = np.flatnonzero(np.concatenate(([True], packed[1:] != packed[:-1])))
+    run_rows = np.diff(np.append(starts, len(packed)))
+    rest, casualty_code = np.divmod(packed[starts], n_casualties)
+    cell, severity_code = np.divmod(rest, n_severity)
+
+    cell_starts = np.flatnonzero(np.concatenate(([True], cell[1:] != cell[:-1])))
+
+    # Unknown severity is the last code; it adds rows but no count
+    severity_values = np.append(severity["keys"], 0.0)
+    known = severity_code < n_severity - 1
+
+    count = np.add.reduceat(run_rows * known, cell_starts)
+    severity_sum = np.add.reduceat(run_rows * severity_values[severity_code], cell_starts)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_severity = severity_sum / count
+
+    return {
+        "keys": cell[cell_starts] + low,
+        "accident_count": count,
+        "avg_severity": avg_severity,
+        "total_casualties": np.add.reduceat(run_rows * casualty_keys[casualty_code].astype(np.float64), cell_starts)
+    }
+
+
+def pack_cells(lat_i, lon_i):
+    """
+    (lat, lon) integer cell indices packed into one key that sorts
+    lexicographically; returns (keys, unpack)
+    """
+
+    lon_low = int(lon_i.min()) if len(lon_i) else 0
+    lon_span = int(lon_i.max()) - lon_low + 1 if len(lon_i) else 1
+
+    def unpack(keys):
+        lat_key, lon_key = np.divmod(keys, lon_span)
+        return lat_key, lon_key + lon_low
+
+    return lat_i.astype(np.int64) * lon_span + (lon_i - lon_low), unpack
+
+
+def masked_severity(severity, valid):
+    return {"keys": severity["keys"], "codes": masked(severity["codes"], valid)}
+
+
+def aggregate_geo_bins(lat, lon, severity, casualties, valid):
+    """
+    Cells of GEO_BIN_SIZE degrees (coordinates truncated toward zero)
+    """
+
+    keys, unpack = pack_cells(
+        (masked(lat, valid) / GEO_BIN_SIZE).astype(int),
+        (masked(lon, valid) / GEO_BIN_SIZE).astype(int)
+    )
+    cells = aggregate_cells(keys, masked_severity(severity, valid), masked(casualties, valid))
+
+    lat_key, lon_key = unpack(cells.pop("keys"))
+    cells["lat"] = lat_key * GEO_BIN_SIZE
+    cells["lon"] = lon_key * GEO_BIN_SIZE
+
+    return cells
+
+
+def severity_coding(values):
+    """
+    {"keys", "codes"} for a severity column; unknown severities get the
+    last code
+    """
+
+    severity_keys, codes, known = integer_codes(values)
+    if known is not None:
+        known_codes = codes
+        codes = np.full(len(values), len(severity_keys), dtype=np.intp)
+        codes[known] = known_codes
+    return {"keys": severity_keys.astype(np.float64), "codes": codes}
+
+
+def compute_geo_bins(df, positions) -> Dict[str, Any]:
+    """
+    geo_bins for the (located) rows of `df` at `positions` only, e.g. the
+    rows inside a map viewport
+    """
+
+    return aggregate_geo_bins(
+        df["latitude"].to_numpy()[positions].astype(np.float64),
+        df["longitude"].to_numpy()[positions].astype(np.float64),
+        severity_coding(df["Accident_Severity"].to_numpy()[positions]),
+        np.nan_to_num(df["Number_of_Casualties"].to_numpy()[positions].astype(np.float64)),
+        None
+    )
+
+
+def viewport_geo_bins(box) -> Dict[str, Any]:
+    """
+    geo_bins of the shared dataset's rows inside `box`
+    """
+    return compute_geo_bins(dataset, rows_in_box(box))
+
+
+def compute_dashboard_aggregates(df) -> Dict[str, Any]:
+    """
+    Every dashboard aggregate for `df`, from one read of each column
+    """
+
+    # Severity is coded once
+    severity = severity_coding(df["Accident_Severity"].to_numpy())
+
+    casualties = np.nan_to_num(df["Number_of_Casualties"].to_numpy(dtype=np.float64))
+    vehicles = df["Number_of_Vehicles"].to_numpy(dtype=np.float64)
+
+    lat = df["latitude"].to_numpy(dtype=np.float64)
+    lon = df["longitude"].to_numpy(dtype=np.float64)
+    located = ~(np.isnan(lat) | np.isnan(lon))
+    located = None if located.all() else located
+
+    return {
+        "rows": len(df),
+        "total_casualties": float(casualties.sum()),
+        "avg_vehicles": float(np.nanmean(vehicles)) if len(vehicles) else float("nan"),
+        "dimensions": {
+            col: aggregate_dimension(df[col].to_numpy(), severity)
+            for col in DIMENSIONS
+        },
+        "geo_bins": aggregate_geo_bins(lat, lon, severity, casualties, located)
+    }
+
+
+@dataset_memoized("dashboard.aggregates", maxsize=1, copy=False)
+def dashboard_aggregates() -> Dict[str, Any]:
+    """
+    Aggregates for the shared dataset (read-only; computed once per
+    dataset version)
+    """
+    return compute_dashboard_aggregates(dataset)
+
+
+# ---------------------------------------------------
+# Accessors
+# ---------------------------------------------------
+def top_k(scores, k):
+    """
+    Positions of the k highest scores, highest first, ties in position
+    order (like nlargest(k, keep='first')); NaN scores are never picked.
+    Partitions first, so only the candidates are sorted.
+    """
+
+    candidates = np.flatnonzero(~np.isnan(scores))
+    k = max(int(k), 0)
+
+    if k == 0 or len(candidates) == 0:
+        return np.array([], dtype=np.intp)
+
+    if k < len(candidates):
+        values = scores[candidates]
+        threshold = np.partition(values, len(values) - k)[len(values) - k]
+        candidates = candidates[values >= threshold]  # keeps every tie at the cutoff
+
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order[:k]]
+
+
+def value_counts(dimension):
+    """
+    (keys, counts) ordered like Series.value_counts()
+    """
+
+    rows = dimension["rows"]
+    present = np.flatnonzero(rows)
+
+    tie_break = dimension["first_seen"]
+    if tie_break is None:
+        order = present[np.argsort(-rows[present], kind="stable")]
+    else:
+        order = present[np.lexsort((tie_break[present], -rows[present]))]
+
+    return dimension["keys"][order], rows[order]
+
+
+def severity_by(dimension):
+    """
+    (keys, mean severity, count) for categories with a known severity,
+    in ascending key order like groupby(...).agg(['mean', 'count'])
+    """
+
+    count = dimension["severity_count"]
+    present = np.flatnonzero(dimension["rows"])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = dimension["severity_sum"][present] / count[present]
+
+    return dimension["keys"][present], mean, count[present]
@@ -2,9 +2,12 @@ import pandas as pd
 import numpy as np
 from collections import Counter
 
-# Load the processed dataset
-DATA_PATH = "model//processed_dataset.csv"
-dataset = pd.read_csv(DATA_PATH)
+# Shared processed dataset
+from services.dataset import dataset_memoized
+from services.dashboard_engine import dashboard_aggregates, viewport_geo_bins, value_counts, severity_by
+from services.hotspot_engine import top_hotspots
+from services.dashboard_cube import filtered_aggregates
+from services.serialization import to_records, round_values, map_labels
 
 
 # ---------------------------------------------------
@@ -57,18 +60,42 @@ DAY_OF_WEEK_MAP = {
 }
 
 
+def aggregates_for(filters):
+    """
+    Whole-dataset aggregates, or the OLAP cube slice for `filters`
+    (a dashboard_cube.normalize_filters() spec)
+    """
+    return filtered_aggregates(filters) if filters else dashboard_aggregates()
+
+
+def most_high_risk(dimension):
+    """
+    Key with the most fatal + serious accidents among present keys
+    """
+    present = np.flatnonzero(dimension["rows"])
+    if len(present) == 0:
+        return None
+    return dimension["keys"][present[np.argmax(dimension["high_risk"][present])]]
+
+
 # ---------------------------------------------------
 # Dashboard Statistics
 # ---------------------------------------------------
-def get_dashboard_statistics():
+@dataset_memoized("dashboard.get_dashboard_statistics")
+def get_dashboard_statistics(filters=None):
     """
     Returns overall statistics about accidents in the dataset
+    (or the rows matching `filters`)
     """
     
-    total_accidents = len(dataset)
+    aggregates = aggregates_for(filters)
+    dimensions = aggregates["dimensions"]
+    
+    total_accidents = aggregates["rows"]
     
     # Severity distribution (0=Fatal, 1=Serious, 2=Slight)
-    severity_counts = dataset['Accident_Severity'].value_counts().to_dict()
+    severity = dimensions["Accident_Severity"]
+    severity_counts = dict(zip(severity["keys"], severity["rows"]))
     severity_distribution = {
         "fatal": int(severity_counts.get(0.0, 0)),
         "serious": int(severity_counts.get(1.0, 0)),
@@ -76,23 +103,19 @@ def get_dashboard_statistics():
     }
     
     # High risk locations (Fatal + Serious accidents)
-    high_risk_count = int((dataset['Accident_Severity'] <= 1.0).sum())
+    high_risk_count = int(severity["high_risk"].sum())
     
     # Total casualties
-    total_casualties = int(dataset['Number_of_Casualties'].sum())
+    total_casualties = int(aggregates["total_casualties"])
     
     # Average vehicles per accident
-    avg_vehicles = int(dataset['Number_of_Vehicles'].mean())
+    avg_vehicles = int(aggregates["avg_vehicles"]) if total_accidents else 0
     
-    # Most dangerous hour
-    dangerous_hour = int(dataset.groupby('Hour')['Accident_Severity'].apply(
-        lambda x: (x <= 1.0).sum()
-    ).idxmax())
+    # Most dangerous hour / day (most fatal + serious accidents)
+    dangerous_hour = most_high_risk(dimensions["Hour"])
+    dangerous_hour = int(dangerous_hour) if dangerous_hour is not None else None
     
-    # Most dangerous day
-    dangerous_day_num = int(dataset.groupby('Day_of_Week')['Accident_Severity'].apply(
-        lambda x: (x <= 1.0).sum()
-    ).idxmax())
+    dangerous_day_num = most_high_risk(dimensions["Day_of_Week"])
     dangerous_day = DAY_OF_WEEK_MAP.get(dangerous_day_num, "Unknown")
     
     return {
@@ -113,67 +136,54 @@ def get_dashboard_statistics():
 # ---------------------------------------------------
 # Risk Factors Distribution
 # ---------------------------------------------------
-def get_risk_factors_distribution():
+@dataset_memoized("dashboard.get_risk_factors_distribution")
+def get_risk_factors_distribution(filters=None):
     """
     Returns distribution of top contributing factors
     """
     
+    aggregates = aggregates_for(filters)
+    dimensions = aggregates["dimensions"]
+    total = aggregates["rows"]
+    
+    def distribution(column, label, label_values, limit=None):
+        keys, counts = value_counts(dimensions[column])
+        keys, counts = keys[:limit], counts[:limit]
+        return to_records({
+            label: label_values(keys),
+            "count": counts,
+            "percentage": round_values((counts / total) * 100, 2)
+        })
+    
+    def condition_names(mapping):
+        return lambda keys: map_labels(keys, mapping, lambda k: f"Code {int(k)}")
+    
     factors = {}
     
     # Weather conditions distribution (top 5)
-    weather_counts = dataset['Weather_Conditions'].value_counts().head(5)
-    factors['weather_conditions'] = [
-        {
-            "condition": WEATHER_CONDITIONS_MAP.get(float(k), f"Code {int(k)}"),
-            "count": int(v),
-            "percentage": round((v / len(dataset)) * 100, 2)
-        }
-        for k, v in weather_counts.items()
-    ]
+    factors['weather_conditions'] = distribution(
+        'Weather_Conditions', "condition", condition_names(WEATHER_CONDITIONS_MAP), 5
+    )
     
     # Light conditions distribution (top 5)
-    light_counts = dataset['Light_Conditions'].value_counts().head(5)
-    factors['light_conditions'] = [
-        {
-            "condition": LIGHT_CONDITIONS_MAP.get(float(k), f"Code {int(k)}"),
-            "count": int(v),
-            "percentage": round((v / len(dataset)) * 100, 2)
-        }
-        for k, v in light_counts.items()
-    ]
+    factors['light_conditions'] = distribution(
+        'Light_Conditions', "condition", condition_names(LIGHT_CONDITIONS_MAP), 5
+    )
     
     # Road surface conditions (top 5)
-    road_counts = dataset['Road_Surface_Conditions'].value_counts().head(5)
-    factors['road_surface_conditions'] = [
-        {
-            "condition": ROAD_SURFACE_MAP.get(float(k), f"Code {int(k)}"),
-            "count": int(v),
-            "percentage": round((v / len(dataset)) * 100, 2)
-        }
-        for k, v in road_counts.items()
-    ]
+    factors['road_surface_conditions'] = distribution(
+        'Road_Surface_Conditions', "condition", condition_names(ROAD_SURFACE_MAP), 5
+    )
     
     # Speed limit distribution
-    speed_counts = dataset['Speed_limit'].value_counts().head(5)
-    factors['speed_limits'] = [
-        {
-            "speed": int(k),
-            "count": int(v),
-            "percentage": round((v / len(dataset)) * 100, 2)
-        }
-        for k, v in speed_counts.items()
-    ]
+    factors['speed_limits'] = distribution(
+        'Speed_limit', "speed", lambda keys: keys.astype(np.int64), 5
+    )
     
     # Urban vs Rural
-    urban_rural_counts = dataset['Urban_or_Rural_Area'].value_counts()
-    factors['urban_rural'] = [
-        {
-            "area": "Urban" if k == 1.0 else "Rural",
-            "count": int(v),
-            "percentage": round((v / len(dataset)) * 100, 2)
-        }
-        for k, v in urban_rural_counts.items()
-    ]
+    factors['urban_rural'] = distribution(
+        'Urban_or_Rural_Area', "area", lambda keys: np.where(keys == 1.0, "Urban", "Rural")
+    )
     
     return factors
 
@@ -181,146 +191,91 @@ def get_risk_factors_distribution():
 # ---------------------------------------------------
 # Top Risky Locations
 # ---------------------------------------------------
-def get_top_risky_locations(limit=10):
+@dataset_memoized("dashboard.get_top_risky_locations")
+def get_top_risky_locations(limit=10, offset=0):
     """
     Returns top locations with highest accident frequency and severity
+    (ranks offset+1 .. offset+limit)
     """
     
-    # Round coordinates to reduce granularity (cluster nearby accidents)
-    dataset_copy = dataset.copy()
-    dataset_copy['lat_rounded'] = dataset_copy['latitude'].round(3)
-    dataset_copy['lon_rounded'] = dataset_copy['longitude'].round(3)
-    
-    # Group by rounded location
-    location_groups = dataset_copy.groupby(['lat_rounded', 'lon_rounded']).agg({
-        'Accident_Severity': ['count', 'mean'],
-        'Number_of_Casualties': 'sum'
-    }).reset_index()
-    
-    location_groups.columns = ['lat', 'lon', 'accident_count', 'avg_severity', 'total_casualties']
-    
-    # Calculate risk score (lower severity number = more severe)
-    # 0=Fatal, 1=Serious, 2=Slight, so we invert it
-    location_groups['risk_score'] = (
-        (location_groups['accident_count'] * 0.4) + 
-        ((3 - location_groups['avg_severity']) * 10) +  # Invert severity
-        (location_groups['total_casualties'] * 0.3)
-    )
-    
-    # Sort by risk score
-    top_locations = location_groups.nlargest(limit, 'risk_score')
-    
-    result = []
-    for idx, row in top_locations.iterrows():
-        # Determine risk level based on severity
-        if row['avg_severity'] <= 0.5:
-            risk_level = "Critical"
-        elif row['avg_severity'] <= 1.2:
-            risk_level = "High"
-        else:
-            risk_level = "Medium"
-            
-        result.append({
-            "rank": len(result) + 1,
-            "lat": float(row['lat']),
-            "lon": float(row['lon']),
-            "accident_count": int(row['accident_count']),
-            "avg_severity": float(round(row['avg_severity'], 2)),
-            "total_casualties": int(row['total_casualties']),
-            "risk_score": float(round(row['risk_score'], 2)),
-            "risk_level": risk_level
-        })
-    
-    return result
+    # Coordinates rounded to 3 decimals cluster nearby accidents
+    cells, top = top_hotspots(3, "dashboard", limit, offset)
+    avg_severity = cells["avg_severity"][top]
+    
+    return to_records({
+        "rank": np.arange(offset + 1, offset + len(top) + 1),
+        "lat": cells["lat"][top],
+        "lon": cells["lon"][top],
+        "accident_count": cells["accident_count"][top],
+        "avg_severity": round_values(avg_severity, 2),
+        "total_casualties": cells["total_casualties"][top].astype(np.int64),
+        "risk_score": round_values(cells["scores"]["dashboard"][top], 2),
+        # Risk level based on severity
+        "risk_level": np.select(
+            [avg_severity <= 0.5, avg_severity <= 1.2],
+            ["Critical", "High"],
+            "Medium"
+        )
+    })
 
 
 # ---------------------------------------------------
 # Severity Analysis by Conditions
 # ---------------------------------------------------
-def get_severity_by_conditions():
+@dataset_memoized("dashboard.get_severity_by_conditions")
+def get_severity_by_conditions(filters=None):
     """
-    Returns severity breakdown by different conditions
+    Returns severity breakdown by different conditions. Number_of_Vehicles
+    isn't a cube axis, so by_vehicle_count is empty when filtered.
     """
     
+    dimensions = aggregates_for(filters)["dimensions"]
     result = {}
     
+    def severity_records(label, labels, avg, count):
+        return to_records({
+            label: labels,
+            "avg_severity": round_values(avg, 2),
+            "accident_count": count
+        })
+    
     # Severity by Speed Limit
-    speed_severity = dataset.groupby('Speed_limit').agg({
-        'Accident_Severity': ['mean', 'count']
-    }).reset_index()
-    speed_severity.columns = ['speed_limit', 'avg_severity', 'count']
-    speed_severity = speed_severity[speed_severity['count'] >= 10]  # Filter low counts
-    
-    result['by_speed_limit'] = [
-        {
-            "speed": int(row['speed_limit']),
-            "avg_severity": float(round(row['avg_severity'], 2)),
-            "accident_count": int(row['count'])
-        }
-        for _, row in speed_severity.sort_values('speed_limit').iterrows()
-    ]
+    speeds, avg, count = severity_by(dimensions['Speed_limit'])
+    keep = count >= 10  # Filter low counts
+    result['by_speed_limit'] = severity_records(
+        "speed", speeds[keep].astype(np.int64), avg[keep], count[keep]
+    )
     
     # Severity by Hour of Day
-    hourly_severity = dataset.groupby('Hour').agg({
-        'Accident_Severity': ['mean', 'count']
-    }).reset_index()
-    hourly_severity.columns = ['hour', 'avg_severity', 'count']
-    
-    result['by_hour'] = [
-        {
-            "hour": int(row['hour']),
-            "avg_severity": float(round(row['avg_severity'], 2)),
-            "accident_count": int(row['count'])
-        }
-        for _, row in hourly_severity.sort_values('hour').iterrows()
-    ]
+    hours, avg, count = severity_by(dimensions['Hour'])
+    result['by_hour'] = severity_records("hour", hours.astype(np.int64), avg, count)
     
     # Severity by Day of Week
-    daily_severity = dataset.groupby('Day_of_Week').agg({
-        'Accident_Severity': ['mean', 'count']
-    }).reset_index()
-    daily_severity.columns = ['day', 'avg_severity', 'count']
-    
-    result['by_day_of_week'] = [
-        {
-            "day": DAY_OF_WEEK_MAP.get(row['day'], "Unknown"),
-            "avg_severity": float(round(row['avg_severity'], 2)),
-            "accident_count": int(row['count'])
-        }
-        for _, row in daily_severity.sort_values('day').iterrows()
-    ]
-    
-    # Severity by Weather
-    weather_severity = dataset.groupby('Weather_Conditions').agg({
-        'Accident_Severity': ['mean', 'count']
-    }).reset_index()
-    weather_severity.columns = ['weather', 'avg_severity', 'count']
-    weather_severity = weather_severity[weather_severity['count'] >= 50]
-    
-    result['by_weather'] = [
-        {
-            "weather": WEATHER_CONDITIONS_MAP.get(row['weather'], f"Code {int(row['weather'])}"),
-            "avg_severity": float(round(row['avg_severity'], 2)),
-            "accident_count": int(row['count'])
-        }
-        for _, row in weather_severity.sort_values('avg_severity').iterrows()
-    ]
+    days, avg, count = severity_by(dimensions['Day_of_Week'])
+    result['by_day_of_week'] = severity_records(
+        "day", map_labels(days, DAY_OF_WEEK_MAP, lambda _: "Unknown"), avg, count
+    )
+    
+    # Severity by Weather (least severe first)
+    weather, avg, count = severity_by(dimensions['Weather_Conditions'])
+    keep = np.flatnonzero(count >= 50)
+    keep = keep[np.argsort(avg[keep], kind="stable")]
+    result['by_weather'] = severity_records(
+        "weather",
+        map_labels(weather[keep], WEATHER_CONDITIONS_MAP, lambda k: f"Code {int(k)}"),
+        avg[keep],
+        count[keep]
+    )
     
     # Severity by Number of Vehicles
-    vehicle_severity = dataset.groupby('Number_of_Vehicles').agg({
-        'Accident_Severity': ['mean', 'count']
-    }).reset_index()
-    vehicle_severity.columns = ['vehicles', 'avg_severity', 'count']
-    vehicle_severity = vehicle_severity[vehicle_severity['vehicles'] <= 5]
-    
-    result['by_vehicle_count'] = [
-        {
-            "vehicle_count": int(row['vehicles']),
-            "avg_severity": float(round(row['avg_severity'], 2)),
-            "accident_count": int(row['count'])
-        }
-        for _, row in vehicle_severity.sort_values('vehicles').iterrows()
-    ]
+    if 'Number_of_Vehicles' in dimensions:
+        vehicles, avg, count = severity_by(dimensions['Number_of_Vehicles'])
+        keep = vehicles <= 5
+        result['by_vehicle_count'] = severity_records(
+            "vehicle_count", vehicles[keep].astype(np.int64), avg[keep], count[keep]
+        )
+    else:
+        result['by_vehicle_count'] = []
     
     return result
 
@@ -328,88 +283,76 @@ def get_severity_by_conditions():
 # ---------------------------------------------------
 # Geographical Distribution
 # ---------------------------------------------------
-def get_geographical_distribution():
+@dataset_memoized("dashboard.get_geographical_distribution")
+def get_geographical_distribution(box=None):
     """
-    Returns accidents grouped by geographical regions (grid-based)
+    Returns accidents grouped by geographical regions (grid-based),
+    optionally only those inside a (min_lat, min_lon, max_lat, max_lon) box
+    """
+    return to_records(get_geographical_distribution_columns(box))
+
+
+def get_geographical_distribution_columns(box=None):
+    """
+    get_geographical_distribution as {column: array}
     """
     
-    # Create geographical grid (0.1 degree bins ≈ 11km)
-    dataset_copy = dataset.copy()
-    dataset_copy['lat_bin'] = (dataset_copy['latitude'] / 0.1).astype(int) * 0.1
-    dataset_copy['lon_bin'] = (dataset_copy['longitude'] / 0.1).astype(int) * 0.1
-    
-    geo_distribution = dataset_copy.groupby(['lat_bin', 'lon_bin']).agg({
-        'Accident_Severity': ['count', 'mean']
-    }).reset_index()
-    
-    geo_distribution.columns = ['lat', 'lon', 'accident_count', 'avg_severity']
-    
-    # Filter out low-count areas
-    geo_distribution = geo_distribution[geo_distribution['accident_count'] >= 5]
-    
-    # Sort by accident count and take top 30
-    geo_distribution = geo_distribution.nlargest(30, 'accident_count')
+    # Geographical grid (0.1 degree bins ≈ 11km)
+    cells = dashboard_aggregates()["geo_bins"] if box is None else viewport_geo_bins(box)
     
-    result = []
-    for _, row in geo_distribution.iterrows():
-        result.append({
-            "lat": float(row['lat'] + 0.05),  # Center of bin
-            "lon": float(row['lon'] + 0.05),
-            "accident_count": int(row['accident_count']),
-            "avg_severity": float(round(row['avg_severity'], 2))
-        })
+    # Filter out low-count areas, then take the top 30 by accident count
+    keep = np.flatnonzero(cells["accident_count"] >= 5)
+    keep = keep[np.argsort(-cells["accident_count"][keep], kind="stable")][:30]
     
-    return result
+    return {
+        "lat": cells["lat"][keep] + 0.05,  # Center of bin
+        "lon": cells["lon"][keep] + 0.05,
+        "accident_count": cells["accident_count"][keep],
+        "avg_severity": round_values(cells["avg_severity"][keep], 2)
+    }
 
 
 # ---------------------------------------------------
 # Time-based Trends
 # ---------------------------------------------------
-def get_time_trends():
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
+               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+@dataset_memoized("dashboard.get_time_trends")
+def get_time_trends(filters=None):
     """
     Returns accident trends by time (hourly, daily, monthly)
     """
     
+    dimensions = aggregates_for(filters)["dimensions"]
+    
     # Monthly distribution
-    monthly = dataset.groupby('Month').agg({
-        'Accident_Severity': ['count', 'mean']
-    }).reset_index()
-    monthly.columns = ['month', 'count', 'avg_severity']
-    
-    month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                   'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    
-    monthly_data = [
-        {
-            "month": month_names[int(row['month'])-1],
-            "accident_count": int(row['count']),
-            "avg_severity": float(round(row['avg_severity'], 2))
-        }
-        for _, row in monthly.sort_values('month').iterrows()
-    ]
+    months, avg, count = severity_by(dimensions['Month'])
+    monthly_data = to_records({
+        "month": np.array(MONTH_NAMES, dtype=object)[months.astype(np.int64) - 1],
+        "accident_count": count,
+        "avg_severity": round_values(avg, 2)
+    })
     
     # Hourly distribution
-    hourly = dataset.groupby('Hour').size().reset_index(name='count')
-    hourly_data = [
-        {
-            "hour": int(row['Hour']),
-            "accident_count": int(row['count'])
-        }
-        for _, row in hourly.sort_values('Hour').iterrows()
-    ]
+    hours = dimensions['Hour']
+    present = np.flatnonzero(hours['rows'])
+    hourly_data = to_records({
+        "hour": hours['keys'][present].astype(np.int64),
+        "accident_count": hours['rows'][present]
+    })
     
     # Day of week distribution
-    daily = dataset.groupby('Day_of_Week').size().reset_index(name='count')
-    daily_data = [
-        {
-            "day": DAY_OF_WEEK_MAP.get(row['Day_of_Week'], "Unknown"),
-            "accident_count": int(row['count'])
-        }
-        for _, row in daily.sort_values('Day_of_Week').iterrows()
-    ]
+    days = dimensions['Day_of_Week']
+    present = np.flatnonzero(days['rows'])
+    daily_data = to_records({
+        "day": map_labels(days['keys'][present], DAY_OF_WEEK_MAP, lambda _: "Unknown"),
+        "accident_count": days['rows'][present]
+    })
     
     return {
         "monthly": monthly_data,
         "hourly": hourly_data,
         "daily": daily_data
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,433 @@
+"""
+Shared Accident Dataset
+Loads processed_dataset.csv once per process with compact dtypes.
+Every service reads the same in-memory table through this module.
+
+A columnar snapshot (one .npy file per column plus manifest.json) can be
+built from the CSV; when its content hash matches the CSV, the snapshot
+is memory-mapped instead of parsing the CSV.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional
+
+from services.cache import memoize
+
+
+DATA_PATH = "model/processed_dataset.csv"
+SNAPSHOT_DIR = "model/processed_dataset.snapshot"
+MANIFEST_FILE = "manifest.json"
+SNAPSHOT_FORMAT = 2   # 2: coordinates kept as float64
+
+# Coordinates keep full float64 precision: payloads and grid cells
+# (e.g. clustered heatmap bins) depend on their exact values
+COORDINATE_COLUMNS = ["latitude", "longitude"]
+
+# Legacy layout: each service parsed its own float64 copy of the CSV
+LEGACY_COPIES = 4
+
+
+# ---------------------------------------------------
+# Compact dtype conversion
+# ---------------------------------------------------
+def _smallest_int_dtype(min_value, max_value):
+    """
+    Returns the narrowest signed integer dtype holding [min_value, max_value]
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= min_value and max_value <= info.max:
+            return dtype
+    return np.int64
+
+
+def compact_column(name, series):
+    """
+    Converts a parsed CSV column into a compact dtype:
+    - integral code columns (Weather_Conditions, Hour, ...) -> int8/int16
+      (lossless)
+    - coordinates -> float64, unchanged
+    - other fractional columns -> float32
+    - text columns -> category
+    """
+
+    if series.dtype == object or pd.api.types.is_string_dtype(series):
+        return series.astype("category")
+
+    if not pd.api.types.is_numeric_dtype(series):
+        return series
+
+    if name in COORDINATE_COLUMNS:
+        return series.astype(np.float64)
+
+    values = series.to_numpy()
+
+    if len(values) == 0 or np.isnan(values).any():
+        return series.astype(np.float32)
+
+    if np.array_equal(values, np.round(values)):
+        return series.astype(_smallest_int_dtype(values.min(), values.max()))
+
+    return series.astype(np.float32)
+
+
+def load_dataset(path=DATA_PATH):
+    """
+    Parses the processed dataset and compacts it column by column
+    """
+
+    df = pd.read_csv(path)
+
+    for col in df.columns:
+        df[col] = compact_column(col, df[col])
+
+    return df
+
+
+# ---------------------------------------------------
+# Columnar Snapshot
+# ---------------------------------------------------
+def file_sha256(path, chunk_size=1024 * 1024):
+    """
+    Streams a file through SHA-256 without loading it into memory
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(snapshot_dir=SNAPSHOT_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Returns the snapshot manifest, or None if no usable snapshot exists
+    """
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        return None
+
+    return manifest
+
+
+def snapshot_is_fresh(manifest, csv_path=DATA_PATH):
+    """
+    Checks the snapshot against the CSV it was built from.
+    Size + mtime is checked first; the content hash is only
+    recomputed when those differ (e.g. after a fresh checkout).
+    """
+
+    if not os.path.exists(csv_path):
+        # Snapshot-only deployment: nothing to compare against
+        return True
+
+    stat = os.stat(csv_path)
+    if (stat.st_size == manifest["source_size"]
+            and stat.st_mtime_ns == manifest["source_mtime_ns"]):
+        return True
+
+    return file_sha256(csv_path) == manifest["source_sha256"]
+
+
+def build_snapshot(df, csv_path=DATA_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Writes a compact dataframe as one .npy file per column plus a
+    manifest recording the source CSV hash. The snapshot is written
+    to a temporary directory and swapped in atomically.
+    """
+
+    tmp_dir = snapshot_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    stat = os.stat(csv_path)
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "source": os.path.basename(csv_path),
+        "source_sha256": file_sha256(csv_path),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "rows": len(df),
+        "columns": []
+    }
+
+    for i, col in enumerate(df.columns):
+        entry = {"name": col, "file": f"{i:03d}.npy"}
+        series = df[col]
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.cat.codes.to_numpy()
+            entry["categories"] = [str(c) for c in series.cat.categories]
+        else:
+            values = series.to_numpy()
+
+        np.save(os.path.join(tmp_dir, entry["file"]), np.ascontiguousarray(values))
+        entry["dtype"] = str(values.dtype)
+        manifest["columns"].append(entry)
+
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    os.replace(tmp_dir, snapshot_dir)
+
+    return manifest
+
+
+def open_snapshot(manifest, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Memory-maps every column of the snapshot. copy=False keeps each
+    column backed by its mapped file instead of consolidating blocks.
+    """
+
+    columns = {}
+    for entry in manifest["columns"]:
+        values = np.load(os.path.join(snapshot_dir, entry["file"]), mmap_mode="r")
+
+        if "categories" in entry:
+            values = pd.Categorical.from_codes(values, categories=entry["categories"])
+
+        columns[entry["name"]] = values
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def load_shared_dataset(csv_path=DATA_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Opens the snapshot when it is fresh, otherwise parses the CSV.
+    Returns the dataframe and a short report of how it was loaded.
+    """
+
+    start = time.perf_counter()
+
+    manifest = read_manifest(snapshot_dir)
+    if manifest is not None and snapshot_is_fresh(manifest, csv_path):
+        df = open_snapshot(manifest, snapshot_dir)
+        source = "snapshot"
+    else:
+        if manifest is not None:
+            print(f"Dataset snapshot is stale, falling back to {csv_path}")
+        df = load_dataset(csv_path)
+        source = "csv"
+
+    info = {
+        "source": source,
+        "rows": len(df),
+        "load_seconds": round(time.perf_counter() - start, 4)
+    }
+
+    return df, info
+
+
+def startup_report(csv_path=DATA_PATH, snapshot_dir=SNAPSHOT_DIR) -> Dict[str, Any]:
+    """
+    Times a cold load in both modes. A full scan of every column is
+    included so the lazily mapped snapshot pays for its page faults.
+    """
+
+    def timed(loader):
+        start = time.perf_counter()
+        df = loader()
+        opened = time.perf_counter() - start
+        for col in df.columns:
+            values = df[col].to_numpy()
+            if values.dtype.kind in "iuf":
+                values.sum()
+        return {
+            "open_seconds": round(opened, 4),
+            "open_and_scan_seconds": round(time.perf_counter() - start, 4)
+        }
+
+    report = {"csv": timed(lambda: load_dataset(csv_path))}
+
+    manifest = read_manifest(snapshot_dir)
+    if manifest is not None and snapshot_is_fresh(manifest, csv_path):
+        report["snapshot"] = timed(lambda: open_snapshot(manifest, snapshot_dir))
+        report["speedup"] = round(report["csv"]["open_seconds"] / max(report["snapshot"]["open_seconds"], 1e-9), 1)
+    else:
+        report["snapshot"] = None
+
+    return report
+
+
+# ---------------------------------------------------
+# Memory Report
+# ---------------------------------------------------
+def _legacy_column_bytes(series):
+    """
+    Bytes the column would take with pandas' default read_csv dtypes
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return int(series.astype(object).memory_usage(index=False, deep=True))
+    return len(series) * 8
+
+
+def memory_report(df=None) -> Dict[str, Any]:
+    """
+    Compares the compact shared table with the legacy layout
+    (one float64 copy per service)
+    """
+
+    if df is None:
+        df = dataset
+
+    columns = []
+    for col in df.columns:
+        columns.append({
+            "column": col,
+            "dtype": str(df[col].dtype),
+            "compact_bytes": int(df[col].memory_usage(index=False, deep=True)),
+            "legacy_bytes": _legacy_column_bytes(df[col])
+        })
+
+    compact_bytes = int(df.memory_usage(index=True, deep=True).sum())
+    legacy_per_copy = sum(c["legacy_bytes"] for c in columns) + int(df.index.memory_usage())
+    legacy_total = legacy_per_copy * LEGACY_COPIES
+
+    return {
+        "rows": len(df),
+        "columns": columns,
+        "legacy_bytes_per_copy": legacy_per_copy,
+        "legacy_copies": LEGACY_COPIES,
+        "legacy_total_bytes": legacy_total,
+        "compact_bytes": compact_bytes,
+        "reduction_factor": round(legacy_total / compact_bytes, 2) if compact_bytes else None
+    }
+
+
+def print_memory_report(report):
+    mb = 1024 * 1024
+
+    print(f"Rows: {report['rows']:,}")
+    print(f"{'column':<45}{'dtype':<10}{'legacy MB':>12}{'compact MB':>12}")
+    for col in report["columns"]:
+        print(
+            f"{col['column']:<45}{col['dtype']:<10}"
+            f"{col['legacy_bytes'] / mb:>12.2f}{col['compact_bytes'] / mb:>12.2f}"
+        )
+
+    print(
+        f"\nBefore: {report['legacy_copies']} x {report['legacy_bytes_per_copy'] / mb:.2f} MB"
+        f" = {report['legacy_total_bytes'] / mb:.2f} MB per worker"
+    )
+    print(f"After:  {report['compact_bytes'] / mb:.2f} MB per worker")
+    print(f"Reduction: {report['reduction_factor']}x")
+
+
+# ---------------------------------------------------
+# Shared instance (loaded once per process)
+# ---------------------------------------------------
+dataset, LOAD_INFO = load_shared_dataset()
+print(f"Dataset loaded from {LOAD_INFO['source']}: {LOAD_INFO['rows']:,} rows in {LOAD_INFO['load_seconds']:.3f}s")
+
+# Bumped every time the shared dataset is loaded; caches of values
+# derived from the data put it in their keys so a new dataset
+# never serves stale results
+_version = 1
+_reload_callbacks = []
+_after_reload_callbacks = []
+_reload_lock = threading.Lock()
+
+
+def dataset_version():
+    return _version
+
+
+def on_reload(callback):
+    """
+    Registers callback(df), called with the new dataframe after every
+    reload_dataset(). Modules that hold `dataset` (or structures built
+    from it) use this to swap in the new data.
+    """
+    _reload_callbacks.append(callback)
+    return callback
+
+
+def after_reload(callback):
+    """
+    Registers callback(), called once a reloaded dataset is live (after
+    every on_reload callback and the version bump); for warming
+    structures built from it
+    """
+    _after_reload_callbacks.append(callback)
+    return callback
+
+
+def reload_dataset(csv_path=DATA_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Loads the dataset again (e.g. after the CSV was replaced), hands it
+    to every on_reload callback, then bumps the version so memoized
+    results computed from the old data are retired
+    """
+    global dataset, LOAD_INFO, _version
+
+    with _reload_lock:
+        df, info = load_shared_dataset(csv_path, snapshot_dir)
+        dataset, LOAD_INFO = df, info
+
+        for callback in _reload_callbacks:
+            callback(df)
+
+        _version += 1
+
+        for callback in _after_reload_callbacks:
+            callback()
+
+    print(f"Dataset reloaded from {info['source']}: {info['rows']:,} rows in {info['load_seconds']:.3f}s (version {_version})")
+    return info
+
+
+def dataset_memoized(name, maxsize=256, copy=True):
+    """
+    memoize() keyed by dataset_version(); for pure aggregates over the
+    shared dataset. The cache is also emptied on reload.
+    """
+
+    def decorator(fn):
+        wrapper = memoize(name, dataset_version, maxsize, copy)(fn)
+        on_reload(lambda df: wrapper.cache.clear())
+        return wrapper
+
+    return decorator
+
+if __name__ == "__main__":
+    # Usage (from backend/):
+    #   python -m services.dataset [report]   memory footprint
+    #   python -m services.dataset build      write the columnar snapshot
+    #   python -m services.dataset startup    cold-load time, CSV vs snapshot
+    parser = argparse.ArgumentParser(description="Shared accident dataset tools")
+    parser.add_argument("command", nargs="?", default="report", choices=["report", "build", "startup"])
+    parser.add_argument("--force", action="store_true", help="rebuild even if the snapshot is fresh")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if LOAD_INFO["source"] == "snapshot" and not args.force:
+            print(f"Snapshot at {SNAPSHOT_DIR} is up to date")
+        else:
+            source_df = dataset if LOAD_INFO["source"] == "csv" else load_dataset()
+            manifest = build_snapshot(source_df)
+            print(f"Wrote {manifest['rows']:,} rows x {len(manifest['columns'])} columns to {SNAPSHOT_DIR}")
+
+    elif args.command == "startup":
+        report = startup_report()
+        print(f"CSV:      open {report['csv']['open_seconds']:.3f}s, open+scan {report['csv']['open_and_scan_seconds']:.3f}s")
+        if report["snapshot"] is None:
+            print("Snapshot: missing or stale (run: python -m services.dataset build)")
+        else:
+            print(f"Snapshot: open {report['snapshot']['open_seconds']:.3f}s, open+scan {report['snapshot']['open_and_scan_seconds']:.3f}s")
+            print(f"Speedup:  {report['speedup']}x")
+
+    else:
+        print_memory_report(memory_report())
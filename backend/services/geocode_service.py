@@ -0,0 +1,450 @@
+"""
+Reverse Geocoding for Dashboard Hotspots
+Addresses are served from a persistent SQLite cache keyed by rounded
+coordinates; Nominatim only ever runs on a background pool:
+
+    cache hit   → cached Nominatim address
+    cache miss  → a Nominatim lookup starts on a bounded worker pool;
+                  the request waits for it until a short deadline,
+                  then answers with the nearest place in the bundled
+                  gazetteer (if enabled), else "lat, lon". Late results
+                  land in the cache for the next call.
+
+A background job pre-warms the cache with the top risky locations.
+"""
+
+import os
+import csv
+import time
+import asyncio
+import sqlite3
+import threading
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock, one worker is assumed
+    fcntl = None
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from geopy.geocoders import Nominatim
+from geopy.extra.rate_limiter import RateLimiter
+from typing import Dict, Any, List, Optional, Tuple
+
+from services.cache import CACHES
+from services.spatial_index import build_location_index, query_nearest
+
+
+GEOCODE_CACHE_PATH = os.environ.get("GEOCODE_CACHE_PATH", ".cache/geocode_cache.sqlite3")
+GEOCODE_CACHE_TTL = float(os.environ.get("GEOCODE_CACHE_TTL", 90 * 24 * 3600))
+
+# Coordinates are rounded to this many decimals for the cache key (~11m)
+GEOCODE_KEY_DECIMALS = int(os.environ.get("GEOCODE_KEY_DECIMALS", 4))
+
+# Background Nominatim lookups (Nominatim's usage policy: 1 request/second,
+# shared by every worker thread)
+GEOCODE_ONLINE = os.environ.get("GEOCODE_ONLINE", "1") == "1"
+GEOCODE_MIN_DELAY = float(os.environ.get("GEOCODE_MIN_DELAY", 1))
+GEOCODE_USER_AGENT = os.environ.get("GEOCODE_USER_AGENT", "accident-dashboard")
+GEOCODE_WORKERS = int(os.environ.get("GEOCODE_WORKERS", 4))
+GEOCODE_MAX_PENDING = int(os.environ.get("GEOCODE_MAX_PENDING", 500))
+
+# How long a request waits for uncached addresses (seconds) before
+# answering with fallbacks; the follow-up addresses endpoint waits longer
+GEOCODE_DEADLINE = float(os.environ.get("GEOCODE_DEADLINE", 0.1))
+GEOCODE_FOLLOWUP_DEADLINE = float(os.environ.get("GEOCODE_FOLLOWUP_DEADLINE", 3))
+
+# Offline reverse geocoding from the bundled place-name gazetteer
+GAZETTEER_PATH = os.environ.get("GAZETTEER_PATH", "model/uk_places.csv")
+GAZETTEER_ENABLED = os.environ.get("GAZETTEER_ENABLED", "1") == "1"
+GAZETTEER_MAX_KM = float(os.environ.get("GAZETTEER_MAX_KM", 25))
+
+# Hotspots geocoded by the pre-warm job (the endpoint serves at most 50).
+# Opt-in: with several workers only the one holding the lock file runs it,
+# so Nominatim still sees a single client
+GEOCODE_PREWARM = os.environ.get("GEOCODE_PREWARM", "0") == "1"
+GEOCODE_PREWARM_LIMIT = int(os.environ.get("GEOCODE_PREWARM_LIMIT", 50))
+GEOCODE_PREWARM_LOCK = os.environ.get("GEOCODE_PREWARM_LOCK", GEOCODE_CACHE_PATH + ".prewarm.lock")
+
+
+# ---------------------------------------------------
+# Keys
+# ---------------------------------------------------
+def coordinate_key(lat, lon) -> Tuple[int, int]:
+    scale = 10 ** GEOCODE_KEY_DECIMALS
+    return round(float(lat) * scale), round(float(lon) * scale)
+
+
+def key_coordinates(key) -> Tuple[float, float]:
+    scale = 10 ** GEOCODE_KEY_DECIMALS
+    return key[0] / scale, key[1] / scale
+
+
+def coordinate_label(lat, lon) -> str:
+    return f"{lat:.4f}, {lon:.4f}"
+
+
+# ---------------------------------------------------
+# SQLite Cache
+# ---------------------------------------------------
+class GeocodeCache:
+    """
+    (lat_key, lon_key) → address on SQLite (WAL mode, shared by every
+    worker on the host and kept across restarts). One connection per
+    thread.
+    """
+
+    def __init__(self, path=GEOCODE_CACHE_PATH, ttl=GEOCODE_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+
+        self._local = threading.local()
+
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection().execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                lat_key INTEGER NOT NULL,
+                lon_key INTEGER NOT NULL,
+                address TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (lat_key, lon_key)
+            )
+            """
+        )
+
+        CACHES["geocode_persistent"] = self
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys) -> Dict[Tuple[int, int], str]:
+        """
+        Cached addresses for `keys` (one query); missing / expired keys
+        are left out
+        """
+
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        placeholders = ", ".join("(?, ?)" for _ in keys)
+        params = [part for key in keys for part in key]
+        min_created = time.time() - self.ttl if self.ttl else 0.0
+
+        try:
+            rows = self._connection().execute(
+                f"""
+                SELECT lat_key, lon_key, address FROM geocode_cache
+                WHERE (lat_key, lon_key) IN (VALUES {placeholders}) AND created_at > ?
+                """,
+                params + [min_created]
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Geocode cache read failed: {e}")
+            rows = []
+
+        found = {(lat_key, lon_key): address for lat_key, lon_key, address in rows}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key, address):
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO geocode_cache (lat_key, lon_key, address, created_at) VALUES (?, ?, ?, ?)",
+                (key[0], key[1], address, time.time())
+            )
+        except sqlite3.Error as e:
+            print(f"Geocode cache write failed: {e}")
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "size": len(self),
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+
+geocode_cache = GeocodeCache()
+
+
+# ---------------------------------------------------
+# Offline Gazetteer
+# ---------------------------------------------------
+class Gazetteer:
+    """
+    Nearest bundled place name (haversine BallTree), within max_km
+    """
+
+    def __init__(self, path=GAZETTEER_PATH, max_km=GAZETTEER_MAX_KM):
+        self.max_km = max_km
+
+        with open(path, newline="", encoding="utf-8") as f:
+            places = list(csv.DictReader(f))
+
+        self.labels = [
+            ", ".join(dict.fromkeys((p["name"], p["region"], p["country"])))
+            for p in places
+        ]
+        self.index = build_location_index(
+            [float(p["lat"]) for p in places],
+            [float(p["lon"]) for p in places]
+        )
+
+    def lookup(self, lats, lons) -> List[Optional[str]]:
+        if len(lats) == 0:
+            return []
+
+        positions, distances = query_nearest(self.index, lats, lons)
+        return [
+            f"Near {self.labels[position]}" if distance <= self.max_km else None
+            for position, distance in zip(positions.tolist(), distances.tolist())
+        ]
+
+
+gazetteer = None
+if GAZETTEER_ENABLED:
+    try:
+        gazetteer = Gazetteer()
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Offline gazetteer unavailable: {e}")
+
+
+# ---------------------------------------------------
+# Address Resolver
+# ---------------------------------------------------
+class AddressResolver:
+    """
+    Resolves coordinate keys through Nominatim on a bounded worker pool.
+    The workers share one rate limiter, and each result is written to
+    the cache. Callers get a Future per key; a key already in flight
+    reuses its Future, and at most max_pending keys are in flight.
+    """
+
+    def __init__(self, cache, workers=GEOCODE_WORKERS, max_pending=GEOCODE_MAX_PENDING,
+                 min_delay=GEOCODE_MIN_DELAY):
+        self.cache = cache
+        self.max_pending = max_pending
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="geocode")
+        self._reverse = RateLimiter(
+            Nominatim(user_agent=GEOCODE_USER_AGENT).reverse,
+            min_delay_seconds=min_delay,
+            max_retries=0
+        )
+        self._inflight: Dict[Tuple[int, int], Future] = {}
+        self._lock = threading.Lock()
+
+        self.resolved = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def resolve(self, keys) -> Dict[Tuple[int, int], Future]:
+        futures = {}
+        with self._lock:
+            for key in keys:
+                future = self._inflight.get(key)
+                if future is None:
+                    if len(self._inflight) >= self.max_pending:
+                        self.dropped += 1
+                        continue
+                    future = self._executor.submit(self._lookup, key)
+                    self._inflight[key] = future
+                    future.add_done_callback(lambda _, key=key: self._done(key))
+                futures[key] = future
+        return futures
+
+    def _done(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def _lookup(self, key) -> Optional[str]:
+        lat, lon = key_coordinates(key)
+
+        try:
+            result = self._reverse(f"{lat}, {lon}", language="en")
+        except Exception as e:
+            self.failed += 1
+            print(f"Reverse geocoding failed for {lat}, {lon}: {e}")
+            return None
+
+        address = result.address if result else coordinate_label(lat, lon)
+        self.cache.set(key, address)
+        self.resolved += 1
+        return address
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._inflight)
+        return {
+            "pending": pending,
+            "max_pending": self.max_pending,
+            "resolved": self.resolved,
+            "failed": self.failed,
+            "dropped": self.dropped
+        }
+
+
+address_resolver = AddressResolver(geocode_cache)
+
+
+# ---------------------------------------------------
+# Enrichment
+# ---------------------------------------------------
+def start_enrichment(locations):
+    """
+    Looks every location up in the cache and starts background lookups
+    for the misses. Returns (keys, cached, futures).
+    """
+
+    keys = [coordinate_key(loc["lat"], loc["lon"]) for loc in locations]
+    cached = geocode_cache.get_many(keys)
+
+    futures = {}
+    if GEOCODE_ONLINE:
+        futures = address_resolver.resolve([key for key in keys if key not in cached])
+
+    return keys, cached, futures
+
+
+def finish_enrichment(locations, keys, cached, futures):
+    """
+    Sets "address" and "address_pending" on each location: cached or
+    already resolved addresses first, then the gazetteer, then "lat, lon".
+    Lookups still running keep going and land in the cache.
+    """
+
+    addresses = []
+    pending = []
+    for key in keys:
+        address = cached.get(key)
+        future = futures.get(key)
+        if address is None and future is not None and future.done():
+            address = future.result()
+        addresses.append(address)
+        pending.append(address is None and future is not None and not future.done())
+
+    missing = [i for i, address in enumerate(addresses) if address is None]
+    if gazetteer is not None and missing:
+        offline = gazetteer.lookup(
+            np.array([locations[i]["lat"] for i in missing]),
+            np.array([locations[i]["lon"] for i in missing])
+        )
+        for i, address in zip(missing, offline):
+            addresses[i] = address
+
+    for loc, address, is_pending in zip(locations, addresses, pending):
+        loc["address"] = address or coordinate_label(loc["lat"], loc["lon"])
+        loc["address_pending"] = is_pending
+
+    return locations
+
+
+def enrich_with_address(locations, timeout=0.0):
+    """
+    Adds an "address" to each {"lat", "lon", ...} location, waiting at
+    most `timeout` seconds for addresses that aren't cached
+    """
+
+    keys, cached, futures = start_enrichment(locations)
+    if futures and timeout > 0:
+        wait(set(futures.values()), timeout=timeout)
+    return finish_enrichment(locations, keys, cached, futures)
+
+
+async def enrich_with_address_async(locations, timeout=GEOCODE_DEADLINE):
+    """
+    enrich_with_address for async endpoints: the event loop awaits the
+    lookups, so no threadpool slot is held while they run
+    """
+
+    keys, cached, futures = start_enrichment(locations)
+    if futures and timeout > 0:
+        await asyncio.wait([asyncio.wrap_future(f) for f in set(futures.values())], timeout=timeout)
+    return finish_enrichment(locations, keys, cached, futures)
+
+
+def queue_addresses(locations):
+    """
+    Starts lookups for uncached addresses without waiting for them
+    """
+    start_enrichment(locations)
+
+
+_prewarm_lock_file = None
+
+
+def claim_prewarm(path=GEOCODE_PREWARM_LOCK) -> bool:
+    """
+    True in the one process that gets the pre-warm lock; the lock is held
+    until the process exits
+    """
+    global _prewarm_lock_file
+
+    if fcntl is None:
+        return True
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    lock_file = open(path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+
+    _prewarm_lock_file = lock_file
+    return True
+
+
+def prewarm_hotspot_addresses(limit=GEOCODE_PREWARM_LIMIT):
+    """
+    Queues the top risky locations that aren't cached yet, from a
+    background thread (computing the hotspots isn't free at startup).
+    Runs only with GEOCODE_PREWARM=1, and in one worker
+    """
+
+    def warm():
+        from services.dashboard_service import get_top_risky_locations
+
+        try:
+            keys, cached, futures = start_enrichment(get_top_risky_locations(limit))
+        except Exception as e:
+            print(f"Geocode pre-warm failed: {e}")
+            return
+
+        print(f"Geocode pre-warm: {len(cached)}/{len(keys)} hotspots cached, {len(futures)} queued")
+
+    if GEOCODE_PREWARM and GEOCODE_ONLINE and limit > 0 and claim_prewarm():
+        threading.Thread(target=warm, name="geocode-prewarm", daemon=True).start()
+
+
+def geocode_status() -> Dict[str, Any]:
+    return {
+        "online": GEOCODE_ONLINE,
+        "deadline_seconds": GEOCODE_DEADLINE,
+        "gazetteer_places": len(gazetteer.labels) if gazetteer is not None else 0,
+        "cache": geocode_cache.stats(),
+        "resolver": address_resolver.stats()
+    }
@@ -0,0 +1,140 @@
+"""
+Viewport Grid Index
+Answers "which rows lie inside this lat/lon box?" for the map endpoints
+(viewport filtering) without scanning the whole table. Nearest-neighbour
+lookups live in spatial_index.
+
+Located rows are bucketed into a uniform grid of GRID_CELL_DEGREES
+cells, stored CSR-style: row positions sorted by (grid row, grid column),
+plus the start of every cell's run. The cells of one grid row that a box
+covers are adjacent, so a query is one slice per covered grid row and an
+exact coordinate test on those candidates: O(grid rows + rows near the
+box), independent of the size of the table.
+"""
+
+import os
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+
+from services.dataset import dataset, dataset_memoized, on_reload
+
+
+@on_reload
+def _use_dataset(df):
+    global dataset
+    dataset = df
+
+
+GRID_CELL_DEGREES = float(os.environ.get("GRID_CELL_DEGREES", 0.05))   # ~5.5km
+
+BoundingBox = Tuple[float, float, float, float]   # (min_lat, min_lon, max_lat, max_lon)
+
+
+def bounding_box(min_lat=None, min_lon=None, max_lat=None, max_lon=None) -> Optional[BoundingBox]:
+    """
+    Normalized viewport, or None when no bound is given; raises
+    ValueError for a partial, non-finite or inverted box
+    """
+
+    bounds = (min_lat, min_lon, max_lat, max_lon)
+    if all(bound is None for bound in bounds):
+        return None
+    if any(bound is None for bound in bounds):
+        raise ValueError("min_lat, min_lon, max_lat and max_lon must be given together")
+
+    bounds = tuple(float(bound) for bound in bounds)
+    if not all(np.isfinite(bounds)):
+        raise ValueError("Bounding box coordinates must be finite numbers")
+    if bounds[0] > bounds[2] or bounds[1] > bounds[3]:
+        raise ValueError("Bounding box minimum exceeds its maximum")
+    return bounds
+
+
+# ---------------------------------------------------
+# Index
+# ---------------------------------------------------
+def grid_cells(values, origin, size, cells):
+    # Monotone in `values`, so boxes and rows land in consistent cells
+    return np.clip(np.floor((values - origin) / size), 0, cells - 1).astype(np.int64)
+
+
+def build_grid_index(df, cell_degrees=GRID_CELL_DEGREES) -> Dict[str, Any]:
+    """
+    {"positions", "starts", "lat", "lon", grid geometry} for the located
+    rows of df; positions are in (cell, row) order
+    """
+
+    lat = df["latitude"].to_numpy(dtype=np.float64)
+    lon = df["longitude"].to_numpy(dtype=np.float64)
+    located = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+    lat, lon = lat[located], lon[located]
+
+    lat_origin = float(lat.min()) if len(lat) else 0.0
+    lon_origin = float(lon.min()) if len(lon) else 0.0
+    n_lat = int((lat.max() - lat_origin) // cell_degrees) + 1 if len(lat) else 1
+    n_lon = int((lon.max() - lon_origin) // cell_degrees) + 1 if len(lon) else 1
+
+    keys = grid_cells(lat, lat_origin, cell_degrees, n_lat) * n_lon + grid_cells(lon, lon_origin, cell_degrees, n_lon)
+    order = np.argsort(keys, kind="stable")
+
+    return {
+        "positions": located[order],
+        "starts": np.concatenate(([0], np.cumsum(np.bincount(keys, minlength=n_lat * n_lon)))),
+        "lat": lat[order],
+        "lon": lon[order],
+        "lat_origin": lat_origin,
+        "lon_origin": lon_origin,
+        "cell_degrees": cell_degrees,
+        "n_lat": n_lat,
+        "n_lon": n_lon
+    }
+
+
+@dataset_memoized("grid.index", maxsize=1, copy=False)
+def grid_index() -> Dict[str, Any]:
+    """
+    Index over the shared dataset (read-only; built once per dataset
+    version)
+    """
+    return build_grid_index(dataset)
+
+
+# ---------------------------------------------------
+# Queries
+# ---------------------------------------------------
+def query_box(index, box: BoundingBox) -> np.ndarray:
+    """
+    Positions of the rows with min_lat <= lat <= max_lat and
+    min_lon <= lon <= max_lon, in ascending (dataset) order
+    """
+
+    min_lat, min_lon, max_lat, max_lon = box
+    size = index["cell_degrees"]
+    lat_origin, lon_origin = index["lat_origin"], index["lon_origin"]
+    n_lat, n_lon = index["n_lat"], index["n_lon"]
+
+    # Box entirely outside the indexed extent
+    if (max_lat < lat_origin or max_lon < lon_origin or
+            min_lat > lat_origin + n_lat * size or min_lon > lon_origin + n_lon * size):
+        return np.empty(0, dtype=np.int64)
+
+    first_lat, last_lat = grid_cells(np.array([min_lat, max_lat]), lat_origin, size, n_lat)
+    first_lon, last_lon = grid_cells(np.array([min_lon, max_lon]), lon_origin, size, n_lon)
+
+    starts = index["starts"]
+    runs = [
+        (starts[row * n_lon + first_lon], starts[row * n_lon + last_lon + 1])
+        for row in range(first_lat, last_lat + 1)
+    ]
+    candidates = np.concatenate([np.arange(start, stop) for start, stop in runs])
+
+    lat, lon = index["lat"][candidates], index["lon"][candidates]
+    inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+    return np.sort(index["positions"][candidates[inside]])
+
+
+def rows_in_box(box: BoundingBox) -> np.ndarray:
+    """
+    query_box over the shared dataset
+    """
+    return query_box(grid_index(), box)
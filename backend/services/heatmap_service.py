@@ -1,76 +1,215 @@
+import os
 import pandas as pd
 import numpy as np
+from services.dataset import dataset, dataset_memoized, on_reload
+from services.serialization import to_records, round_values, round_like_python, map_labels
+from services.grid_index import rows_in_box
 
-dataset = pd.read_csv("model/processed_dataset.csv")
 
+@on_reload
+def _use_dataset(df):
+    global dataset
+    dataset = df
 
-def get_heatmap_data(sample_size=1000, severity_filter=None):
+
+SEVERITY_LABELS = {0.0: "Fatal", 1.0: "Serious", 2.0: "Slight"}
+
+# Largest sample served from the pre-drawn reservoirs (the endpoint cap);
+# bigger samples are drawn per call
+HEATMAP_MAX_SAMPLE = int(os.environ.get("HEATMAP_MAX_SAMPLE", 5000))
+SAMPLE_SEED = 42
+
+
+# ---------------------------------------------------
+# Point Columns
+# ---------------------------------------------------
+def take(df, column, positions):
+    # Gathers first, so only the selected rows are converted
+    return df[column].to_numpy()[positions].astype(np.float64)
+
+
+def heatmap_columns(df, positions):
+    """
+    Payload columns for the rows at `positions`, in that order
+    """
+    
+    severity = take(df, "Accident_Severity", positions)
+    casualties = take(df, "Number_of_Casualties", positions)
+    
+    # Calculate intensity based on severity and casualties
+    # 0=Fatal (high intensity), 1=Serious (medium), 2=Slight (low)
+    intensity = np.select([severity == 0.0, severity == 1.0], [1.0, 0.7], 0.4)
+    
+    # Adjust intensity based on casualties
+    intensity = np.minimum(1.0, intensity * (1 + casualties * 0.1))
+    
+    return {
+        "lat": take(df, "latitude", positions),
+        "lon": take(df, "longitude", positions),
+        "severity": severity.astype(np.int64),
+        "severity_label": map_labels(severity, SEVERITY_LABELS, lambda _: "Slight"),
+        "intensity": round_like_python(intensity, 2),
+        "casualties": casualties.astype(np.int64),
+        "vehicles": take(df, "Number_of_Vehicles", positions).astype(np.int64)
+    }
+
+
+def filter_positions(df, severity_filter):
+    if severity_filter is None:
+        return np.arange(len(df))
+    return np.flatnonzero(df["Accident_Severity"].to_numpy(dtype=np.float64) == severity_filter)
+
+
+def sample_order(count, size):
+    """
+    Same rows, in the same order, as DataFrame.sample(size, random_state=42)
+    on `count` rows: a prefix of one seeded permutation, so every sample
+    size is a prefix of the largest one
+    """
+    return np.random.RandomState(SAMPLE_SEED).permutation(count)[:size]
+
+
+# ---------------------------------------------------
+# Pre-drawn Reservoirs
+# ---------------------------------------------------
+def build_reservoirs(df):
+    """
+    Per severity filter (None = all rows): the row count, the payload
+    columns of the first HEATMAP_MAX_SAMPLE sampled rows, and — when the
+    filter matches no more rows than that — the columns of every row in
+    dataset order (served when the sample would cover all of them)
+    """
+    
+    severity = df["Accident_Severity"].to_numpy(dtype=np.float64)
+    filters = [None] + np.unique(severity[~np.isnan(severity)]).tolist()
+    
+    reservoirs = {}
+    for severity_filter in filters:
+        positions = filter_positions(df, severity_filter)
+        count = len(positions)
+        
+        reservoirs[severity_filter] = {
+            "count": count,
+            "sample": heatmap_columns(df, positions[sample_order(count, HEATMAP_MAX_SAMPLE)]),
+            "rows": heatmap_columns(df, positions) if count <= HEATMAP_MAX_SAMPLE else None
+        }
+    
+    return reservoirs
+
+
+@dataset_memoized("heatmap.reservoirs", maxsize=1, copy=False)
+def heatmap_reservoirs():
+    """
+    Reservoirs for the shared dataset (read-only; drawn once per dataset
+    version)
+    """
+    return build_reservoirs(dataset)
+
+
+def head(columns, n=None):
+    return {name: values[:n] for name, values in columns.items()}
+
+
+def get_heatmap_data(sample_size=1000, severity_filter=None, box=None):
     """
     Returns heatmap data with optional severity filtering
     
     Args:
         sample_size: Number of points to return (for performance)
         severity_filter: Optional severity level (0=Fatal, 1=Serious, 2=Slight)
+        box: Optional (min_lat, min_lon, max_lat, max_lon) viewport
     
     Returns:
         List of dictionaries with lat, lon, severity, and intensity
     """
+    return to_records(get_heatmap_columns(sample_size, severity_filter, box))
+
+
+def get_heatmap_columns(sample_size=1000, severity_filter=None, box=None):
+    """
+    get_heatmap_data as {column: array}
+    """
     
-    data_subset = dataset.copy()
+    if sample_size < 0:
+        raise ValueError("sample_size must be non-negative")
     
-    # Filter by severity if specified
-    if severity_filter is not None:
-        data_subset = data_subset[data_subset['Accident_Severity'] == severity_filter]
+    if box is not None:
+        return viewport_heatmap_columns(sample_size, severity_filter, box)
+    
+    reservoirs = heatmap_reservoirs()
+    key = None if severity_filter is None else float(severity_filter)
+    reservoir = reservoirs.get(key)
+    
+    # A severity that never occurs matches no rows
+    if reservoir is None:
+        return head(reservoirs[None]["sample"], 0)
+    
+    count = reservoir["count"]
     
     # If filtered dataset is smaller than sample size, use all
-    if len(data_subset) > sample_size:
-        data_subset = data_subset.sample(sample_size, random_state=42)
-    
-    data = []
-    for _, row in data_subset.iterrows():
-        # Calculate intensity based on severity and casualties
-        # 0=Fatal (high intensity), 1=Serious (medium), 2=Slight (low)
-        if row['Accident_Severity'] == 0.0:
-            intensity = 1.0  # Fatal - maximum intensity
-        elif row['Accident_Severity'] == 1.0:
-            intensity = 0.7  # Serious
-        else:
-            intensity = 0.4  # Slight
-        
-        # Adjust intensity based on casualties
-        intensity = min(1.0, intensity * (1 + row['Number_of_Casualties'] * 0.1))
-        
-        data.append({
-            "lat": float(row["latitude"]),
-            "lon": float(row["longitude"]),
-            "severity": int(row["Accident_Severity"]),
-            "severity_label": "Fatal" if row["Accident_Severity"] == 0 else 
-                             "Serious" if row["Accident_Severity"] == 1 else "Slight",
-            "intensity": float(round(intensity, 2)),
-            "casualties": int(row["Number_of_Casualties"]),
-            "vehicles": int(row["Number_of_Vehicles"])
-        })
+    if count <= sample_size and reservoir["rows"] is not None:
+        return head(reservoir["rows"])
+    
+    if count > sample_size and sample_size <= HEATMAP_MAX_SAMPLE:
+        return head(reservoir["sample"], sample_size)
     
-    return data
+    # Larger than the reservoirs: draw this sample directly
+    positions = filter_positions(dataset, key)
+    if count > sample_size:
+        positions = positions[sample_order(count, sample_size)]
+    return heatmap_columns(dataset, positions)
 
 
-def get_clustered_heatmap_data(grid_size=0.05):
+def viewport_heatmap_columns(sample_size, severity_filter, box):
+    """
+    Same sample as the unfiltered path, drawn from the rows inside `box`
+    (found through the spatial index)
+    """
+    
+    positions = rows_in_box(box)
+    if severity_filter is not None:
+        positions = positions[take(dataset, "Accident_Severity", positions) == float(severity_filter)]
+    
+    count = len(positions)
+    if count > sample_size:
+        positions = positions[sample_order(count, sample_size)]
+    return heatmap_columns(dataset, positions)
+
+
+CLUSTER_COLUMNS = ["latitude", "longitude", "Accident_Severity", "Number_of_Casualties", "Number_of_Vehicles"]
+
+
+def get_clustered_heatmap_data(grid_size=0.05, box=None):
     """
     Returns aggregated heatmap data clustered by geographical grid
     Better performance for large datasets
     
     Args:
         grid_size: Size of geographical grid in degrees (default 0.05 ≈ 5.5km)
+        box: Optional (min_lat, min_lon, max_lat, max_lon); only accidents
+             inside it are clustered
     
     Returns:
         List of cluster points with aggregated statistics
     """
+    return to_records(get_clustered_heatmap_columns(grid_size, box))
+
+
+def get_clustered_heatmap_columns(grid_size=0.05, box=None):
+    """
+    get_clustered_heatmap_data as {column: array}
+    """
     
-    dataset_copy = dataset.copy()
+    if box is None:
+        dataset_copy = dataset[CLUSTER_COLUMNS].copy()
+    else:
+        # Only the rows in the viewport are read
+        positions = rows_in_box(box)
+        dataset_copy = pd.DataFrame({col: dataset[col].to_numpy()[positions] for col in CLUSTER_COLUMNS})
     
     # Create grid bins
-    dataset_copy['lat_bin'] = (dataset_copy['latitude'] / grid_size).astype(int) * grid_size
-    dataset_copy['lon_bin'] = (dataset_copy['longitude'] / grid_size).astype(int) * grid_size
+    dataset_copy['lat_bin'] = (dataset_copy['latitude'].astype(np.float64) / grid_size).astype(int) * grid_size
+    dataset_copy['lon_bin'] = (dataset_copy['longitude'].astype(np.float64) / grid_size).astype(int) * grid_size
     
     # Aggregate by grid
     clustered = dataset_copy.groupby(['lat_bin', 'lon_bin']).agg({
@@ -82,25 +221,28 @@ def get_clustered_heatmap_data(grid_size=0.05):
     clustered.columns = ['lat', 'lon', 'accident_count', 'avg_severity', 
                         'max_severity', 'total_casualties', 'total_vehicles']
     
-    data = []
-    for _, row in clustered.iterrows():
-        # Calculate intensity based on accident count and severity
-        base_intensity = min(1.0, row['accident_count'] / 50)  # Normalize by max expected
-        severity_factor = (3 - row['avg_severity']) / 3  # Invert: 0=worst, 2=best
-        intensity = (base_intensity * 0.6 + severity_factor * 0.4)
-        
-        data.append({
-            "lat": float(row['lat'] + grid_size/2),  # Center of grid
-            "lon": float(row['lon'] + grid_size/2),
-            "accident_count": int(row['accident_count']),
-            "avg_severity": float(round(row['avg_severity'], 2)),
-            "total_casualties": int(row['total_casualties']),
-            "total_vehicles": int(row['total_vehicles']),
-            "intensity": float(round(intensity, 2)),
-            "severity_label": "High Risk" if row['avg_severity'] < 1.5 else 
-                             "Medium Risk" if row['avg_severity'] < 2.0 else "Low Risk"
-        })
-    
-    # Sort by intensity and return top clusters
-    data.sort(key=lambda x: x['intensity'], reverse=True)
-    return data[:500]  # Return top 500 clusters
\ No newline at end of file
+    count = clustered['accident_count'].to_numpy(dtype=np.float64)
+    avg_severity = clustered['avg_severity'].to_numpy(dtype=np.float64)
+    
+    # Calculate intensity based on accident count and severity
+    base_intensity = np.minimum(1.0, count / 50)  # Normalize by max expected
+    severity_factor = (3 - avg_severity) / 3  # Invert: 0=worst, 2=best
+    intensity = round_values(base_intensity * 0.6 + severity_factor * 0.4, 2)
+    
+    # Sort by intensity and return top 500 clusters
+    top = np.argsort(-intensity, kind="stable")[:500]
+    
+    return {
+        "lat": clustered['lat'].to_numpy()[top] + grid_size/2,  # Center of grid
+        "lon": clustered['lon'].to_numpy()[top] + grid_size/2,
+        "accident_count": count[top].astype(np.int64),
+        "avg_severity": round_values(avg_severity[top], 2),
+        "total_casualties": clustered['total_casualties'].to_numpy(dtype=np.float64)[top].astype(np.int64),
+        "total_vehicles": clustered['total_vehicles'].to_numpy(dtype=np.float64)[top].astype(np.int64),
+        "intensity": intensity[top],
+        "severity_label": np.select(
+            [avg_severity[top] < 1.5, avg_severity[top] < 2.0],
+            ["High Risk", "Medium Risk"],
+            "Low Risk"
+        )
+    }
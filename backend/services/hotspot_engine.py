@@ -0,0 +1,146 @@
+"""
+Multi-Resolution Hotspot Engine
+Per-cell aggregates of rounded coordinates, computed once per dataset
+version at every resolution in HOTSPOT_RESOLUTIONS, with each scoring
+formula evaluated up front. Top-k / paged requests are answered from the
+precomputed arrays: the first HOTSPOT_RANKED_DEPTH cells of every
+(resolution, score) ranking are kept, and deeper pages are selected by
+partition (top_k) instead of a sort.
+
+Used by dashboard_service.get_top_risky_locations (3 decimals, ~110m)
+and safetyai.get_top_risky_areas (2 decimals, ~1.1km).
+"""
+
+import os
+import numpy as np
+from typing import Dict, Any, Tuple
+
+from services.dataset import dataset, dataset_memoized, on_reload
+from services.dashboard_engine import (
+    pack_cells,
+    masked,
+    masked_severity,
+    severity_coding,
+    aggregate_cells,
+    top_k
+)
+
+
+@on_reload
+def _use_dataset(df):
+    global dataset
+    dataset = df
+
+
+HOTSPOT_RESOLUTIONS = (2, 3)   # decimals of the rounded coordinates
+
+# Cells of each ranking kept in order; deeper pages are partitioned
+HOTSPOT_RANKED_DEPTH = int(os.environ.get("HOTSPOT_RANKED_DEPTH", 1000))
+
+
+# ---------------------------------------------------
+# Scoring Formulas
+# ---------------------------------------------------
+def dashboard_risk_score(cells):
+    # Lower severity number = more severe, so it is inverted
+    return (
+        (cells["accident_count"] * 0.4) +
+        ((3 - cells["avg_severity"]) * 10) +
+        (cells["total_casualties"] * 0.3)
+    )
+
+
+def area_risk_score(cells):
+    return cells["accident_count"] * 0.5 + cells["avg_severity"] * 0.5
+
+
+SCORES = {
+    "dashboard": dashboard_risk_score,
+    "area": area_risk_score
+}
+
+
+# ---------------------------------------------------
+# Precomputation
+# ---------------------------------------------------
+def aggregate_grid(lat, lon, severity, casualties, valid, decimals):
+    """
+    Cells of (lat, lon) rounded to `decimals`, in ascending cell order
+    (the order groupby sorts them), with every score and ranking
+    """
+
+    # Same values as Series.round(decimals)
+    scale = 10 ** decimals
+    keys, unpack = pack_cells(
+        np.rint(masked(lat, valid) * scale).astype(np.int64),
+        np.rint(masked(lon, valid) * scale).astype(np.int64)
+    )
+    cells = aggregate_cells(keys, masked_severity(severity, valid), masked(casualties, valid))
+
+    lat_key, lon_key = unpack(cells.pop("keys"))
+    cells["lat"] = lat_key / scale
+    cells["lon"] = lon_key / scale
+
+    cells["scores"] = {name: score(cells) for name, score in SCORES.items()}
+    cells["ranked"] = {
+        name: top_k(scores, HOTSPOT_RANKED_DEPTH)
+        for name, scores in cells["scores"].items()
+    }
+
+    return cells
+
+
+def compute_hotspots(df) -> Dict[int, Dict[str, Any]]:
+    """
+    {decimals: cells} for every resolution
+    """
+
+    severity = severity_coding(df["Accident_Severity"].to_numpy())
+
+    casualties = np.nan_to_num(df["Number_of_Casualties"].to_numpy(dtype=np.float64))
+
+    lat = df["latitude"].to_numpy(dtype=np.float64)
+    lon = df["longitude"].to_numpy(dtype=np.float64)
+    located = ~(np.isnan(lat) | np.isnan(lon))
+    located = None if located.all() else located
+
+    return {
+        decimals: aggregate_grid(lat, lon, severity, casualties, located, decimals)
+        for decimals in HOTSPOT_RESOLUTIONS
+    }
+
+
+@dataset_memoized("hotspots.grids", maxsize=1, copy=False)
+def hotspot_grids() -> Dict[int, Dict[str, Any]]:
+    """
+    Hotspot cells for the shared dataset (read-only; computed once per
+    dataset version)
+    """
+    return compute_hotspots(dataset)
+
+
+# ---------------------------------------------------
+# Queries
+# ---------------------------------------------------
+def ranked_positions(cells, score, limit, offset=0):
+    """
+    Positions of the cells ranked offset+1 .. offset+limit by `score`,
+    highest first, ties in cell order (like nlargest(keep='first'))
+    """
+
+    offset, limit = max(int(offset), 0), max(int(limit), 0)
+    ranked = cells["ranked"][score]
+
+    if offset + limit <= len(ranked) or len(ranked) < HOTSPOT_RANKED_DEPTH:
+        return ranked[offset:offset + limit]
+
+    return top_k(cells["scores"][score], offset + limit)[offset:]
+
+
+def top_hotspots(decimals, score, limit, offset=0) -> Tuple[Dict[str, Any], np.ndarray]:
+    """
+    (cells, positions) of the top-ranked cells at a resolution
+    """
+
+    cells = hotspot_grids()[decimals]
+    return cells, ranked_positions(cells, score, limit, offset)
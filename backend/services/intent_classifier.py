@@ -0,0 +1,218 @@
+"""
+Local Intent Classifier
+TF-IDF (word + character n-gram) logistic regression trained at import on
+the bundled labelled queries in model/intent_queries.csv. safetyai only
+asks the LLM to classify a query when the local confidence is below
+INTENT_CONFIDENCE_THRESHOLD.
+
+sklearn is only used for fitting: a single query through the pipeline
+costs ~1.5 ms of per-call overhead, so the fitted vectorizers and weights
+are compiled into a dict-based scorer (~0.15 ms per query).
+"""
+
+import os
+import csv
+import threading
+import numpy as np
+from collections import Counter
+from typing import Dict, Any, Optional
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline, make_union
+
+
+INTENT_DATA_PATH = os.environ.get("INTENT_DATA_PATH", "model/intent_queries.csv")
+INTENT_CONFIDENCE_THRESHOLD = float(os.environ.get("INTENT_CONFIDENCE_THRESHOLD", 0.35))
+
+# Chart each intent gets when classified locally
+# (matches what the LLM / keyword fallback return)
+INTENT_VISUALIZATION = {
+    "severity_distribution": "pie",
+    "time_patterns": "bar",
+    "weather_impact": "bar",
+    "speed_analysis": "bar",
+    "junction_analysis": "bar",
+    "casualty_stats": None,
+    "vehicle_analysis": "bar",
+    "risky_areas": "map",
+    "monthly_trends": "line",
+    "general_overview": None
+}
+
+
+# ---------------------------------------------------
+# Training
+# ---------------------------------------------------
+def load_labelled_queries(path=INTENT_DATA_PATH):
+    """
+    Returns {"train": (queries, intents), "test": (queries, intents)}
+    """
+    splits = {"train": ([], []), "test": ([], [])}
+
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            queries, intents = splits[row["split"]]
+            queries.append(row["query"])
+            intents.append(row["intent"])
+
+    return splits
+
+
+def build_classifier():
+    features = make_union(
+        TfidfVectorizer(analyzer="word", ngram_range=(1, 2), sublinear_tf=True),
+        TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 5), sublinear_tf=True)
+    )
+    return make_pipeline(features, LogisticRegression(C=20, max_iter=2000))
+
+
+def evaluate(classifier, queries, intents, threshold=INTENT_CONFIDENCE_THRESHOLD) -> Dict[str, Any]:
+    """
+    Accuracy on a labelled set, overall and on the queries confident
+    enough to skip the LLM
+    """
+
+    if not queries:
+        return {"size": 0}
+
+    proba = classifier.predict_proba(queries)
+    predicted = classifier.classes_[proba.argmax(axis=1)]
+    confident = proba.max(axis=1) >= threshold
+    correct = predicted == np.asarray(intents)
+
+    return {
+        "size": len(queries),
+        "accuracy": round(float(correct.mean()), 4),
+        "local_coverage": round(float(confident.mean()), 4),
+        "local_accuracy": round(float(correct[confident].mean()), 4) if confident.any() else None
+    }
+
+
+def train_classifier(path=INTENT_DATA_PATH):
+    """
+    Scores a model fitted on the train split against the held-out split,
+    then refits on everything for serving
+    """
+
+    splits = load_labelled_queries(path)
+    train_queries, train_intents = splits["train"]
+    test_queries, test_intents = splits["test"]
+
+    held_out = build_classifier().fit(train_queries, train_intents)
+    report = evaluate(held_out, test_queries, test_intents)
+
+    classifier = build_classifier().fit(train_queries + test_queries, train_intents + test_intents)
+
+    return classifier, report
+
+
+# ---------------------------------------------------
+# Compiled Scorer
+# ---------------------------------------------------
+class CompiledIntentModel:
+    """
+    Same decision function as the fitted pipeline, without sklearn's
+    per-call overhead: each n-gram maps straight to idf and its column
+    of class weights
+    """
+
+    def __init__(self, classifier):
+        union, logistic = classifier.steps[0][1], classifier.steps[-1][1]
+
+        self.classes_ = logistic.classes_
+        self.intercept = logistic.intercept_.copy()
+        self.blocks = []
+
+        offset = 0
+        for _, vectorizer in union.transformer_list:
+            size = len(vectorizer.vocabulary_)
+            coef = logistic.coef_[:, offset:offset + size]
+            offset += size
+
+            terms = {
+                term: (vectorizer.idf_[i], coef[:, i].copy())
+                for term, i in vectorizer.vocabulary_.items()
+            }
+            self.blocks.append((vectorizer.build_analyzer(), terms))
+
+    def predict_proba(self, queries):
+        return np.vstack([self.proba(q) for q in queries])
+
+    def proba(self, query):
+        scores = self.intercept.copy()
+
+        for analyzer, terms in self.blocks:
+            weights = []
+            columns = []
+            for term, count in Counter(analyzer(query)).items():
+                entry = terms.get(term)
+                if entry is not None:
+                    weights.append((1.0 + np.log(count)) * entry[0])
+                    columns.append(entry[1])
+
+            if weights:
+                weights = np.asarray(weights)
+                scores += (weights / np.sqrt(weights @ weights)) @ np.asarray(columns)
+
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+
+
+try:
+    intent_model, HELD_OUT_REPORT = train_classifier()
+    intent_model = CompiledIntentModel(intent_model)
+except (OSError, ValueError) as e:
+    print(f"Local intent classifier unavailable: {e}")
+    intent_model, HELD_OUT_REPORT = None, {"size": 0}
+
+
+# ---------------------------------------------------
+# Inference
+# ---------------------------------------------------
+_stats_lock = threading.Lock()
+_counts = {"local": 0, "llm": 0}
+
+
+def classify_locally(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Classification in the same shape the LLM returns, plus "source".
+    None when the model isn't confident enough (the caller asks the LLM).
+    """
+
+    if intent_model is None:
+        confident = False
+    else:
+        proba = intent_model.proba(query)
+        best = int(proba.argmax())
+        confident = proba[best] >= INTENT_CONFIDENCE_THRESHOLD
+
+    with _stats_lock:
+        _counts["local" if confident else "llm"] += 1
+
+    if not confident:
+        return None
+
+    intent = str(intent_model.classes_[best])
+    viz_type = INTENT_VISUALIZATION.get(intent)
+
+    return {
+        "intent": intent,
+        "confidence": round(float(proba[best]), 4),
+        "needs_visualization": viz_type is not None,
+        "visualization_type": viz_type,
+        "source": "local"
+    }
+
+
+def classifier_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        local, llm = _counts["local"], _counts["llm"]
+
+    total = local + llm
+    return {
+        "threshold": INTENT_CONFIDENCE_THRESHOLD,
+        "local_hits": local,
+        "llm_consults": llm,
+        "local_hit_rate": round(local / total, 4) if total else None,
+        "held_out": HELD_OUT_REPORT
+    }
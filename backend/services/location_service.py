@@ -2,32 +2,35 @@ import pandas as pd
 import numpy as np
 import joblib
 
-# Load processed dataset used for training
+# Shared processed dataset used for training
 # IMPORTANT: This should be the SAME dataset used to train model
-DATA_PATH = "model//processed_dataset.csv"
-
-dataset = pd.read_csv(DATA_PATH)
+from services.dataset import dataset, on_reload
+from services.spatial_index import build_location_index, query_nearest
 
 # Load feature columns used during training
 feature_columns = joblib.load("model//model_features.pkl")
 
+# Haversine BallTree built once over every accident location
+location_index = build_location_index(dataset["latitude"], dataset["longitude"])
+
+
+@on_reload
+def _use_dataset(df):
+    global dataset, location_index
+    location_index = build_location_index(df["latitude"], df["longitude"])
+    dataset = df
+
 
 # ---------------------------------------------------------
 # Helper Function: Find nearest accident location
 # ---------------------------------------------------------
 def find_nearest_location(lat, lon):
     """
-    Finds the nearest accident record based on latitude & longitude
+    Finds the nearest accident record by great-circle distance
     """
 
-    # Euclidean distance (fast enough for hackathon scale)
-    distances = (
-        (dataset["latitude"] - lat) ** 2 +
-        (dataset["longitude"] - lon) ** 2
-    )
-
-    nearest_index = distances.idxmin()
-    nearest_row = dataset.loc[nearest_index]
+    positions, _ = query_nearest(location_index, [lat], [lon])
+    nearest_row = dataset.iloc[positions[0]]
 
     return nearest_row
 
@@ -52,3 +55,19 @@ def get_features_from_location(lat, lon):
             feature_dict[col] = np.nan
 
     return feature_dict
+
+
+# ---------------------------------------------------------
+# Batch Function: Many locations → one feature matrix
+# ---------------------------------------------------------
+def get_features_from_locations(lats, lons):
+    """
+    Resolves every coordinate in one vectorized index query and returns
+    a model-ready float32 matrix (one row per coordinate, training column order)
+    """
+
+    positions, _ = query_nearest(location_index, lats, lons)
+
+    nearest_accidents = dataset.iloc[positions].reindex(columns=feature_columns)
+
+    return nearest_accidents.to_numpy(dtype=np.float32, na_value=np.nan)
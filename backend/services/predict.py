@@ -1,7 +1,8 @@
+import os
 import joblib
-import pandas as pd
 import numpy as np
-import shap
+import xgboost as xgb
+from services.cache import TTLCache, feature_vector_key
 
 
 # ---------------------------------------------------
@@ -10,7 +11,14 @@ import shap
 model = joblib.load("model/accident_risk_xgb_model.pkl")
 feature_columns = joblib.load("model/model_features.pkl")
 
-explainer = shap.TreeExplainer(model)
+booster = model.get_booster()
+
+# Explanation backend: "native" | "native_approx" | "shap"
+EXPLAINER_BACKEND = os.environ.get("EXPLAINER_BACKEND", "native")
+
+# Column name → position in the model's feature matrix
+FEATURE_NAMES = np.asarray(list(feature_columns))
+FEATURE_POSITIONS = {col: i for i, col in enumerate(FEATURE_NAMES)}
 
 
 # ---------------------------------------------------
@@ -25,90 +33,214 @@ EXCLUDED_FEATURES = [
     "LSOA_of_Accident_Location"
 ]
 
+EXCLUDED_MASK = np.isin(FEATURE_NAMES, EXCLUDED_FEATURES)
+
+TOP_K_FACTORS = 5
+
+RISK_MAP = {
+    0: "Low",
+    1: "Medium",
+    2: "High"
+}
+
+
+# ---------------------------------------------------
+# Prediction Cache (keyed by quantized feature vector)
+# ---------------------------------------------------
+prediction_cache = TTLCache(
+    "prediction",
+    maxsize=int(os.environ.get("PREDICTION_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("PREDICTION_CACHE_TTL", 3600))
+)
+
 
 # ---------------------------------------------------
 # Prepare Input for Model
 # ---------------------------------------------------
-def prepare_input(input_dict):
+def prepare_matrix(records):
     """
-    Converts incoming data into model-ready dataframe
+    Maps feature dicts straight into a preallocated float32 matrix
+    (training column order). Missing or None features stay NaN and
+    unknown keys are ignored.
     """
 
-    df = pd.DataFrame([input_dict])
+    X = np.full((len(records), len(FEATURE_NAMES)), np.nan, dtype=np.float32)
+
+    for row, record in enumerate(records):
+        for col, value in record.items():
+            pos = FEATURE_POSITIONS.get(col)
+            if pos is not None and value is not None:
+                X[row, pos] = value
 
-    # Ensure all training columns exist
-    for col in feature_columns:
-        if col not in df.columns:
-            df[col] = np.nan
+    return X
 
-    # Maintain training column order
-    df = df[feature_columns]
 
-    return df
+def prepare_input(input_dict):
+    """
+    Converts incoming data into a model-ready (1, n_features) matrix
+    """
+    return prepare_matrix([input_dict])
 
 
 # ---------------------------------------------------
 # Model Prediction
 # ---------------------------------------------------
+def predict_severity_batch(X):
+    """
+    Class and confidence for every row from a single probability pass
+    """
+
+    pred_prob = model.predict_proba(X)
+
+    pred_classes = pred_prob.argmax(axis=1)
+    confidences = pred_prob.max(axis=1)
+
+    return pred_classes, confidences
+
+
 def predict_severity(input_dict):
 
     X = prepare_input(input_dict)
 
-    pred_class = model.predict(X)[0]
-    pred_prob = model.predict_proba(X)[0]
+    pred_classes, confidences = predict_severity_batch(X)
 
-    confidence = float(np.max(pred_prob))
-
-    return X, int(pred_class), confidence
+    return X, int(pred_classes[0]), float(confidences[0])
 
 
 # ---------------------------------------------------
-# SHAP Explanation
+# SHAP Explanation Backends
+# Each returns per-class contributions shaped (rows, features, classes)
 # ---------------------------------------------------
-def get_shap_explanation(X, pred_class):
+def native_contributions(X, approximate=False):
+    """
+    Tree SHAP values straight from the booster (pred_contribs).
+    approximate=True uses the much cheaper Saabas attribution.
+    """
+
+    contribs = booster.predict(
+        xgb.DMatrix(X, missing=np.nan),
+        pred_contribs=True,
+        approx_contribs=approximate
+    )
+
+    # (rows, classes, features + bias) -> (rows, features, classes)
+    return np.transpose(contribs[:, :, :-1], (0, 2, 1))
+
+
+_shap_explainer = None
+
+
+def shap_contributions(X):
+    """
+    Reference path through shap.TreeExplainer (imported on first use)
+    """
+    global _shap_explainer
+
+    if _shap_explainer is None:
+        import shap
+        _shap_explainer = shap.TreeExplainer(model)
 
-    shap_values = explainer.shap_values(X)
+    return _shap_explainer.shap_values(X)
 
-    # SHAP values for predicted class
-    shap_values_class = shap_values[0][:, pred_class]
 
-    shap_df = pd.DataFrame({
-        "feature": X.columns,
-        "impact": np.abs(shap_values_class)
-    })
+EXPLAINER_BACKENDS = {
+    "native": native_contributions,
+    "native_approx": lambda X: native_contributions(X, approximate=True),
+    "shap": shap_contributions
+}
 
-    # Sort by importance
-    shap_df = shap_df.sort_values(by="impact", ascending=False)
+
+def top_factors_from_contributions(contributions, pred_classes, k=TOP_K_FACTORS):
+    """
+    Picks the k features with the largest |contribution| to each row's
+    predicted class, skipping EXCLUDED_FEATURES
+    """
+
+    # |SHAP| of each row's predicted class -> (rows, features)
+    rows = np.arange(len(contributions))
+    impacts = np.abs(contributions[rows, :, pred_classes])
 
     # Remove non-causal features
-    shap_df = shap_df[
-        ~shap_df["feature"].isin(EXCLUDED_FEATURES)
-    ]
+    impacts[:, EXCLUDED_MASK] = -np.inf
+
+    k = min(k, int((~EXCLUDED_MASK).sum()))
+    if k == 0:
+        return [[] for _ in rows]
+
+    # Unordered top-k, then order just those k (ties → training column order)
+    top = np.argpartition(-impacts, k - 1, axis=1)[:, :k]
+    top_impacts = np.take_along_axis(impacts, top, axis=1)
+    order = np.lexsort((top, -top_impacts), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+
+    return [FEATURE_NAMES[row_top].tolist() for row_top in top]
 
-    # Top contributing factors
-    top_features = shap_df.head(5)["feature"].tolist()
 
-    return top_features
+def get_shap_explanation_batch(X, pred_classes, backend=None):
+    """
+    Top contributing factors for every row, from a single explainer pass
+    """
+
+    contributions = EXPLAINER_BACKENDS[backend or EXPLAINER_BACKEND](X)
+
+    return top_factors_from_contributions(contributions, np.asarray(pred_classes))
+
+
+def get_shap_explanation(X, pred_class, backend=None):
+
+    return get_shap_explanation_batch(X, [pred_class], backend)[0]
 
 
 # ---------------------------------------------------
 # Main Prediction Pipeline
 # ---------------------------------------------------
-def predict_pipeline(input_dict):
+def _score_matrix(X):
+    """
+    Runs the model and SHAP once over a feature matrix
+    """
+
+    pred_classes, confidences = predict_severity_batch(X)
+
+    top_factors = get_shap_explanation_batch(X, pred_classes)
+
+    return [
+        {
+            "risk_level": RISK_MAP[int(pred_class)],
+            "risk_score": float(confidence),
+            "severity_class": int(pred_class),
+            "top_factors": factors
+        }
+        for pred_class, confidence, factors in zip(pred_classes, confidences, top_factors)
+    ]
+
+
+def predict_pipeline_batch(X):
+    """
+    Returns one prediction dict per row of an aligned float32 feature
+    matrix. Cached rows skip the model; the rest are scored in one pass.
+    """
+
+    X = np.asarray(X, dtype=np.float32)
+
+    if len(X) == 0:
+        return []
 
-    X, pred_class, confidence = predict_severity(input_dict)
+    keys = [feature_vector_key(row) for row in X]
+    results = [prediction_cache.get(key) for key in keys]
 
-    top_factors = get_shap_explanation(X, pred_class)
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        for i, prediction in zip(misses, _score_matrix(X[misses])):
+            prediction_cache.set(keys[i], prediction)
+            results[i] = prediction
 
-    risk_map = {
-        0: "Low",
-        1: "Medium",
-        2: "High"
-    }
+    # Callers (agent_pipeline) add keys to the dict, so hand out copies
+    return [
+        dict(result, top_factors=list(result["top_factors"]))
+        for result in results
+    ]
+
+
+def predict_pipeline(input_dict):
 
-    return {
-        "risk_level": risk_map[pred_class],
-        "risk_score": confidence,
-        "severity_class": pred_class,
-        "top_factors": top_factors
-    }
+    return predict_pipeline_batch(prepare_input(input_dict))[0]
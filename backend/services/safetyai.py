@@ -7,20 +7,32 @@ import pandas as pd
 import numpy as np
 from langchain_groq import ChatGroq
 import os
+import copy
 import json
 import re
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+from services.cache import TTLCache
+from services.serialization import to_records, to_keyed_records
+from services.intent_classifier import classify_locally
+from services.hotspot_engine import top_hotspots
+from agents.llm_guard import LLM_REQUEST_TIMEOUT, call_llm, stream_llm_call, deadline_for
 
-# Load dataset
-DATA_PATH = "model/processed_dataset.csv"
-dataset = pd.read_csv(DATA_PATH)
+# Shared dataset
+from services.dataset import dataset, dataset_version, dataset_memoized, on_reload
+
+
+@on_reload
+def _use_dataset(df):
+    global dataset
+    dataset = df
 
 # Initialize LLM
 llm = ChatGroq(
     model="llama-3.3-70b-versatile",
     api_key=os.environ.get("GROQ_API_KEY"),
     temperature=0.3,
-    max_tokens=2000
+    max_tokens=2000,
+    timeout=LLM_REQUEST_TIMEOUT
 )
 
 
@@ -28,6 +40,7 @@ llm = ChatGroq(
 # DATA ANALYSIS FUNCTIONS
 # ============================================================
 
+@dataset_memoized("safetyai.get_severity_distribution")
 def get_severity_distribution() -> Dict[str, Any]:
     """Get accident severity distribution"""
     severity_counts = dataset['Accident_Severity'].value_counts().to_dict()
@@ -44,6 +57,7 @@ def get_severity_distribution() -> Dict[str, Any]:
     }
 
 
+@dataset_memoized("safetyai.get_time_patterns")
 def get_time_patterns() -> Dict[str, Any]:
     """Analyze accident patterns by time"""
     if 'Hour' not in dataset.columns:
@@ -68,6 +82,7 @@ def get_time_patterns() -> Dict[str, Any]:
     }
 
 
+@dataset_memoized("safetyai.get_weather_impact")
 def get_weather_impact() -> Dict[str, Any]:
     """Analyze weather conditions impact"""
     if 'Weather_Conditions' not in dataset.columns:
@@ -78,17 +93,16 @@ def get_weather_impact() -> Dict[str, Any]:
     }).reset_index()
     weather_severity.columns = ['condition', 'accident_count', 'avg_severity']
     
-    result = {}
-    for _, row in weather_severity.iterrows():
-        condition = int(row['condition']) if not pd.isna(row['condition']) else 'unknown'
-        result[condition] = {
-            "accident_count": int(row['accident_count']),
-            "avg_severity": float(row['avg_severity'])
+    return to_keyed_records(
+        weather_severity['condition'].to_numpy().astype(np.int64),
+        {
+            "accident_count": weather_severity['accident_count'].to_numpy(),
+            "avg_severity": weather_severity['avg_severity'].to_numpy(dtype=np.float64)
         }
-    
-    return result
+    )
 
 
+@dataset_memoized("safetyai.get_speed_limit_analysis")
 def get_speed_limit_analysis() -> Dict[str, Any]:
     """Analyze accidents by speed limit"""
     if 'Speed_limit' not in dataset.columns:
@@ -99,17 +113,16 @@ def get_speed_limit_analysis() -> Dict[str, Any]:
     }).reset_index()
     speed_analysis.columns = ['speed_limit', 'accident_count', 'avg_severity']
     
-    result = {}
-    for _, row in speed_analysis.iterrows():
-        speed = int(row['speed_limit']) if not pd.isna(row['speed_limit']) else 'unknown'
-        result[speed] = {
-            "accident_count": int(row['accident_count']),
-            "avg_severity": float(row['avg_severity'])
+    return to_keyed_records(
+        speed_analysis['speed_limit'].to_numpy().astype(np.int64),
+        {
+            "accident_count": speed_analysis['accident_count'].to_numpy(),
+            "avg_severity": speed_analysis['avg_severity'].to_numpy(dtype=np.float64)
         }
-    
-    return result
+    )
 
 
+@dataset_memoized("safetyai.get_junction_analysis")
 def get_junction_analysis() -> Dict[str, Any]:
     """Analyze junction-related accidents"""
     if 'Junction_Detail' not in dataset.columns:
@@ -120,17 +133,16 @@ def get_junction_analysis() -> Dict[str, Any]:
     }).reset_index()
     junction_analysis.columns = ['junction_type', 'accident_count', 'avg_severity']
     
-    result = {}
-    for _, row in junction_analysis.iterrows():
-        junc_type = int(row['junction_type']) if not pd.isna(row['junction_type']) else 'unknown'
-        result[junc_type] = {
-            "accident_count": int(row['accident_count']),
-            "avg_severity": float(row['avg_severity'])
+    return to_keyed_records(
+        junction_analysis['junction_type'].to_numpy().astype(np.int64),
+        {
+            "accident_count": junction_analysis['accident_count'].to_numpy(),
+            "avg_severity": junction_analysis['avg_severity'].to_numpy(dtype=np.float64)
         }
-    
-    return result
+    )
 
 
+@dataset_memoized("safetyai.get_casualty_statistics")
 def get_casualty_statistics() -> Dict[str, Any]:
     """Get casualty statistics"""
     if 'Number_of_Casualties' not in dataset.columns:
@@ -144,6 +156,7 @@ def get_casualty_statistics() -> Dict[str, Any]:
     }
 
 
+@dataset_memoized("safetyai.get_vehicle_analysis")
 def get_vehicle_analysis() -> Dict[str, Any]:
     """Analyze accidents by number of vehicles"""
     if 'Number_of_Vehicles' not in dataset.columns:
@@ -158,40 +171,25 @@ def get_vehicle_analysis() -> Dict[str, Any]:
     }
 
 
+@dataset_memoized("safetyai.get_top_risky_areas")
 def get_top_risky_areas(limit: int = 10) -> List[Dict[str, Any]]:
     """Get most dangerous geographical areas"""
     if 'latitude' not in dataset.columns or 'longitude' not in dataset.columns:
         return [{"error": "Location data not available"}]
     
-    dataset_copy = dataset.copy()
-    dataset_copy['lat_rounded'] = dataset_copy['latitude'].round(2)
-    dataset_copy['lon_rounded'] = dataset_copy['longitude'].round(2)
-    
-    location_stats = dataset_copy.groupby(['lat_rounded', 'lon_rounded']).agg({
-        'Accident_Severity': ['count', 'mean']
-    }).reset_index()
-    location_stats.columns = ['lat', 'lon', 'accident_count', 'avg_severity']
+    # Precomputed ~1.1km cells, ranked by the area score
+    cells, top = top_hotspots(2, "area", limit)
     
-    location_stats['risk_score'] = (
-        location_stats['accident_count'] * 0.5 + 
-        location_stats['avg_severity'] * 0.5
-    )
-    
-    top_locations = location_stats.nlargest(limit, 'risk_score')
-    
-    result = []
-    for _, row in top_locations.iterrows():
-        result.append({
-            "lat": float(row['lat']),
-            "lon": float(row['lon']),
-            "accident_count": int(row['accident_count']),
-            "avg_severity": float(row['avg_severity']),
-            "risk_score": float(row['risk_score'])
-        })
-    
-    return result
+    return to_records({
+        "lat": cells['lat'][top],
+        "lon": cells['lon'][top],
+        "accident_count": cells['accident_count'][top],
+        "avg_severity": cells['avg_severity'][top],
+        "risk_score": cells['scores']['area'][top]
+    })
 
 
+@dataset_memoized("safetyai.get_monthly_trends")
 def get_monthly_trends() -> Dict[str, Any]:
     """Get accident trends by month"""
     if 'Month' not in dataset.columns:
@@ -431,8 +429,15 @@ def generate_structured_response(intent: str, data: Dict[str, Any]) -> str:
 # QUERY PROCESSING
 # ============================================================
 
-def classify_query_intent(query: str) -> Dict[str, Any]:
-    """Classify user query intent with LLM fallback to keywords"""
+def classify_query_intent(query: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+    """Classify user query intent: local model, then LLM, then keywords"""
+    
+    local = classify_locally(query)
+    if local is not None:
+        return local
+    
+    if deadline is None:
+        deadline = deadline_for("safety_ai")
     
     classification_prompt = f"""
 You are a query classifier. Classify this query into ONE intent.
@@ -445,15 +450,17 @@ Return ONLY JSON:
 {{"intent": "intent_name", "confidence": 0.9, "needs_visualization": true, "visualization_type": "bar"}}
 """
     
-    try:
-        response = llm.invoke(classification_prompt)
-        content = response.content.strip()
-        
-        json_match = re.search(r'\{.*\}', content, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group())
-    except Exception as e:
-        print(f"Classification error: {e}")
+    response, ok = call_llm(llm.invoke, classification_prompt, deadline=deadline, name="Intent classification")
+    
+    if ok:
+        try:
+            content = response.content.strip()
+            
+            json_match = re.search(r'\{.*\}', content, re.DOTALL)
+            if json_match:
+                return json.loads(json_match.group())
+        except Exception as e:
+            print(f"Classification error: {e}")
     
     # Fallback: Keyword matching
     query_lower = query.lower()
@@ -501,29 +508,52 @@ def execute_analysis(intent: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
         }
 
 
-def generate_natural_response(query: str, data: Dict[str, Any], intent: str) -> str:
-    """Generate response with LLM fallback to structured"""
-    
-    response_prompt = f"""Answer this question concisely (under 150 words).
+def build_response_prompt(query: str, data: Dict[str, Any]) -> str:
+    """Prompt for the natural language answer"""
+    return f"""Answer this question concisely (under 150 words).
 
 Question: "{query}"
 Data: {json.dumps(data, indent=2)}
 
 Provide clear, insightful response with specific numbers.
 """
+
+
+def generate_natural_response(query: str, data: Dict[str, Any], intent: str,
+                              deadline: Optional[float] = None) -> str:
+    """Generate response with LLM fallback to structured"""
+    return answer_query(query, data, intent, deadline)[0]
+
+
+def valid_llm_response(text: str) -> bool:
+    """Whether an LLM answer is worth serving (and caching)"""
+    return len(text) > 50 and 'error' not in text.lower()
+
+
+def answer_query(query: str, data: Dict[str, Any], intent: str,
+                 deadline: Optional[float] = None) -> Tuple[str, bool]:
+    """generate_natural_response, plus whether the LLM answered"""
+    
+    if deadline is None:
+        deadline = deadline_for("safety_ai")
+    
+    response_prompt = build_response_prompt(query, data)
     
     try:
-        response = llm.invoke(response_prompt)
+        response, ok = call_llm(llm.invoke, response_prompt, deadline=deadline, name="Safety AI response")
+        if not ok:
+            raise Exception("LLM over budget or unavailable")
+        
         llm_response = response.content.strip()
         
-        if len(llm_response) > 50 and 'error' not in llm_response.lower():
-            return llm_response
+        if valid_llm_response(llm_response):
+            return llm_response, True
         else:
             raise Exception("Invalid LLM response")
             
     except Exception as e:
         print(f"LLM failed, using structured response: {e}")
-        return generate_structured_response(intent, data)
+        return generate_structured_response(intent, data), False
 
 
 def prepare_visualization(data: Dict[str, Any], viz_type: str, intent: str) -> Optional[Dict[str, Any]]:
@@ -574,6 +604,41 @@ def prepare_visualization(data: Dict[str, Any], viz_type: str, intent: str) -> O
     return None
 
 
+# ============================================================
+# QUERY CACHE
+# ============================================================
+
+# Words that don't change what is being asked
+QUERY_STOP_WORDS = {
+    "a", "an", "the", "of", "in", "on", "at", "for", "to", "by", "with",
+    "is", "are", "was", "were", "be", "do", "does", "did", "there",
+    "what", "whats", "which", "me", "my", "i", "you", "your", "we", "us",
+    "can", "could", "would", "please", "tell", "show", "give", "about",
+    "and", "or", "it", "its", "that", "this", "these", "those", "have", "has"
+}
+
+# Repeated phrasings of the same question reuse the full response
+query_cache = TTLCache(
+    "safety_query",
+    maxsize=int(os.environ.get("SAFETY_QUERY_CACHE_SIZE", 1024)),
+    ttl=float(os.environ.get("SAFETY_QUERY_CACHE_TTL", 3600))
+)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Lowercase, punctuation and stop-words stripped, e.g.
+    "What's the most dangerous hour?" → "most dangerous hour"
+    """
+    words = re.sub(r"[^a-z0-9\s]", "", query.lower()).split()
+    return " ".join(w for w in words if w not in QUERY_STOP_WORDS)
+
+
+def query_cache_key(query: str):
+    # The dataset version retires every entry when new data is loaded
+    return (dataset_version(), normalize_query(query))
+
+
 # ============================================================
 # MAIN FUNCTION
 # ============================================================
@@ -581,27 +646,41 @@ def prepare_visualization(data: Dict[str, Any], viz_type: str, intent: str) -> O
 def process_safety_query(query: str) -> Dict[str, Any]:
     """Main query processing function"""
     
+    key = query_cache_key(query)
+    cached = query_cache.get(key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+    
     try:
-        classification = classify_query_intent(query)
+        # One latency budget shared by classification and answer generation
+        deadline = deadline_for("safety_ai")
+        
+        classification = classify_query_intent(query, deadline)
         intent = classification.get("intent", "general_overview")
         parameters = classification.get("parameters", {})
         needs_viz = classification.get("needs_visualization", False)
         viz_type = classification.get("visualization_type", "table")
         
         analysis_data = execute_analysis(intent, parameters)
-        natural_response = generate_natural_response(query, analysis_data, intent)
+        natural_response, from_llm = answer_query(query, analysis_data, intent, deadline)
         
         visualization = None
         if needs_viz:
             visualization = prepare_visualization(analysis_data, viz_type, intent)
         
-        return {
+        result = {
             "response": natural_response,
             "data": analysis_data,
             "intent": intent,
             "visualization": visualization
         }
         
+        # Never pin a fallback answer in the cache
+        if from_llm:
+            query_cache.set(key, copy.deepcopy(result))
+        
+        return result
+        
     except Exception as e:
         print(f"Query processing error: {e}")
         return {
@@ -609,4 +688,88 @@ def process_safety_query(query: str) -> Dict[str, Any]:
             "data": {},
             "intent": "error",
             "visualization": None
-        }
\ No newline at end of file
+        }
+
+
+def stream_safety_query(query: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streaming variant of process_safety_query. Yields (event, payload):
+    - "data":  intent, analysis data and visualization, sent as soon as
+               execute_analysis returns
+    - "token": LLM answer text as it is generated
+    - "done":  full response text and whether it came from the LLM,
+               the structured template or the query cache. When the LLM
+               stream was cut short or its answer is invalid, this is the
+               structured answer (source "template") and replaces the
+               tokens sent so far.
+    """
+    
+    key = query_cache_key(query)
+    cached = query_cache.get(key)
+    if cached is not None:
+        cached = copy.deepcopy(cached)
+        yield "data", {
+            "data": cached["data"],
+            "intent": cached["intent"],
+            "visualization": cached["visualization"]
+        }
+        yield "token", {"text": cached["response"]}
+        yield "done", {"response": cached["response"], "source": "cache"}
+        return
+    
+    try:
+        deadline = deadline_for("safety_ai")
+        
+        classification = classify_query_intent(query, deadline)
+        intent = classification.get("intent", "general_overview")
+        parameters = classification.get("parameters", {})
+        needs_viz = classification.get("needs_visualization", False)
+        viz_type = classification.get("visualization_type", "table")
+        
+        analysis_data = execute_analysis(intent, parameters)
+        
+        visualization = None
+        if needs_viz:
+            visualization = prepare_visualization(analysis_data, viz_type, intent)
+        
+        yield "data", {
+            "data": analysis_data,
+            "intent": intent,
+            "visualization": visualization
+        }
+        
+    except Exception as e:
+        print(f"Query processing error: {e}")
+        yield "error", {
+            "response": "I encountered an error processing your query. Please try rephrasing your question.",
+            "intent": "error"
+        }
+        return
+    
+    parts = []
+    status = {}
+    for text in stream_llm_call(llm.stream, build_response_prompt(query, analysis_data),
+                                deadline, "Safety AI response", status):
+        parts.append(text)
+        yield "token", {"text": text}
+    
+    response = "".join(parts).strip()
+    
+    # Only a finished, valid answer is cached and labelled as the LLM's
+    if status["complete"] and valid_llm_response(response):
+        query_cache.set(key, copy.deepcopy({
+            "response": response,
+            "data": analysis_data,
+            "intent": intent,
+            "visualization": visualization
+        }))
+        yield "done", {"response": response, "source": "llm"}
+        return
+    
+    # Over budget, breaker open, truncated or invalid: send the structured answer
+    structured = generate_structured_response(intent, analysis_data)
+    if parts:
+        print("LLM stream incomplete or invalid, using structured response")
+    else:
+        yield "token", {"text": structured}
+    yield "done", {"response": structured, "source": "template"}
@@ -0,0 +1,237 @@
+"""
+Response Serialization
+Column-wise helpers that turn result arrays / frames into JSON payloads
+without per-row Python work (no iterrows, no per-cell float(round(...))),
+an orjson-backed response class that serializes NumPy types natively,
+and a compact columnar binary encoding for large point payloads.
+"""
+
+import struct
+import numpy as np
+import orjson
+from starlette.responses import JSONResponse, Response
+from typing import Any, Dict, List, Optional
+
+
+# ---------------------------------------------------
+# Response Class
+# ---------------------------------------------------
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered by orjson. Same bytes as the default
+    JSONResponse for our payloads (compact separators, UTF-8, int keys
+    as strings), plus native NumPy scalars / arrays.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+
+
+# ---------------------------------------------------
+# Column Helpers
+# ---------------------------------------------------
+def to_list(values) -> list:
+    """
+    Bulk conversion to Python scalars (float64 → float, ints → int)
+    """
+    if isinstance(values, list):
+        return values
+    return np.asarray(values).tolist()
+
+
+def to_records(columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    {"lat": array, "lon": array, ...} → [{"lat": .., "lon": ..}, ...]
+    Key order follows `columns`.
+    """
+    names = list(columns)
+    values = [to_list(col) for col in columns.values()]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def to_keyed_records(keys, columns: Dict[str, Any]) -> Dict[Any, Dict[str, Any]]:
+    """
+    Like to_records, but returns {key: record}
+    """
+    return dict(zip(to_list(keys), to_records(columns)))
+
+
+def round_values(values, decimals=2) -> np.ndarray:
+    """
+    Vectorized round with NumPy semantics; identical to calling round()
+    on each np.float64 element
+    """
+    return np.round(np.asarray(values, dtype=np.float64), decimals)
+
+
+def round_like_python(values, decimals=2) -> np.ndarray:
+    """
+    Identical to round() on each element as a Python float (correctly
+    rounded, which can differ from np.round in the last digit). Each
+    distinct value is rounded once.
+    """
+    uniques, inverse = np.unique(np.asarray(values, dtype=np.float64), return_inverse=True)
+    rounded = np.array([round(float(v), decimals) for v in uniques], dtype=np.float64)
+    return rounded[inverse]
+
+
+def map_labels(values, mapping, default=None) -> np.ndarray:
+    """
+    Label per element via one lookup per distinct value; `default(value)`
+    labels values missing from `mapping`
+    """
+    uniques, inverse = np.unique(np.asarray(values), return_inverse=True)
+    labels = np.empty(len(uniques), dtype=object)
+    for i, value in enumerate(uniques.tolist()):
+        labels[i] = mapping[value] if value in mapping else (default(value) if default else None)
+    return labels[inverse]
+
+
+# ---------------------------------------------------
+# Columnar Binary Encoding
+# ---------------------------------------------------
+# Layout (all little-endian):
+#   magic      b"RCOL"
+#   uint32     header length in bytes
+#   header     UTF-8 JSON: {"version", "rows", "columns": [{"name", "dtype",
+#              "offset", "length", "labels"?}], "meta"}
+#   padding    to an 8-byte boundary
+#   body       one packed array per column, each starting on an 8-byte
+#              boundary; offsets are relative to the start of the body
+#
+# Floats are sent as float32, integers as the smallest unsigned type that
+# holds them (int32 / float64 if negative or too large), and strings as
+# uint8/uint16 codes into the column's "labels". NaN stands for null.
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.risk.columnar"
+COLUMNAR_MAGIC = b"RCOL"
+COLUMNAR_VERSION = 1
+COLUMNAR_ALIGN = 8
+
+COLUMNAR_DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float64": np.dtype("<f8"),
+    "uint8": np.dtype("<u1"),
+    "uint16": np.dtype("<u2"),
+    "uint32": np.dtype("<u4"),
+    "int32": np.dtype("<i4")
+}
+
+
+def _integer_dtype(values):
+    if len(values) == 0:
+        return "uint8"
+    low, high = int(values.min()), int(values.max())
+    if low >= 0:
+        for name in ("uint8", "uint16", "uint32"):
+            if high <= np.iinfo(COLUMNAR_DTYPES[name]).max:
+                return name
+    elif np.iinfo(np.int32).min <= low and high <= np.iinfo(np.int32).max:
+        return "int32"
+    return "float64"
+
+
+def encode_column(values):
+    """
+    (packed array, header entry) for one column
+    """
+
+    values = np.asarray(values)
+    entry = {}
+
+    if values.dtype.kind in "OUS":
+        # Dictionary-encoded; a None becomes a trailing null label
+        values = values.astype(object)
+        missing = np.equal(values, None)
+        labels, codes = np.unique(values[~missing].astype(str), return_inverse=True)
+        labels = labels.tolist()
+        if missing.any():
+            labels.append(None)
+        values = np.full(len(missing), len(labels) - 1, dtype=np.int64)
+        values[~missing] = codes
+        entry["labels"] = labels
+        dtype = "uint8" if len(labels) <= 256 else "uint16" if len(labels) <= 65536 else "uint32"
+    elif values.dtype.kind in "iub":
+        dtype = _integer_dtype(values)
+    else:
+        dtype = "float32"
+
+    entry["dtype"] = dtype
+    return np.ascontiguousarray(values, dtype=COLUMNAR_DTYPES[dtype]), entry
+
+
+def _padding(size):
+    return -size % COLUMNAR_ALIGN
+
+
+def encode_columns(columns: Dict[str, Any], meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    {name: array} → columnar binary payload (see layout above)
+    """
+
+    arrays = []
+    entries = []
+    offset = 0
+    rows = 0
+
+    for name, values in columns.items():
+        array, entry = encode_column(values)
+        rows = len(array)
+        entries.append({"name": name, **entry, "offset": offset, "length": len(array)})
+        arrays.append(array)
+        offset += array.nbytes + _padding(array.nbytes)
+
+    header = orjson.dumps({
+        "version": COLUMNAR_VERSION,
+        "rows": rows,
+        "columns": entries,
+        "meta": meta or {}
+    })
+    prefix = COLUMNAR_MAGIC + struct.pack("<I", len(header)) + header
+    prefix += b"\0" * _padding(len(prefix))
+
+    parts = [prefix]
+    for array in arrays:
+        parts.append(array.tobytes())
+        parts.append(b"\0" * _padding(array.nbytes))
+    return b"".join(parts)
+
+
+def decode_columns(payload: bytes) -> Dict[str, Any]:
+    """
+    Inverse of encode_columns: {"columns": {name: array}, "rows", "meta"};
+    dictionary-coded columns come back as label arrays
+    """
+
+    if payload[:4] != COLUMNAR_MAGIC:
+        raise ValueError("Not a columnar payload")
+
+    (header_length,) = struct.unpack_from("<I", payload, 4)
+    header = orjson.loads(payload[8:8 + header_length])
+    body = 8 + header_length + _padding(8 + header_length)
+
+    columns = {}
+    for entry in header["columns"]:
+        values = np.frombuffer(
+            payload, dtype=COLUMNAR_DTYPES[entry["dtype"]],
+            count=entry["length"], offset=body + entry["offset"]
+        )
+        if "labels" in entry:
+            values = np.asarray(entry["labels"], dtype=object)[values]
+        columns[entry["name"]] = values
+
+    return {"columns": columns, "rows": header["rows"], "meta": header["meta"]}
+
+
+def wants_columnar(accept: Optional[str]) -> bool:
+    """
+    True when the Accept header asks for the columnar encoding
+    """
+    return bool(accept) and COLUMNAR_MEDIA_TYPE in accept
+
+
+def columnar_response(columns: Dict[str, Any], meta: Optional[Dict[str, Any]] = None, headers=None) -> Response:
+    return Response(encode_columns(columns, meta), media_type=COLUMNAR_MEDIA_TYPE, headers=headers)
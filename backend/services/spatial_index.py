@@ -0,0 +1,38 @@
+"""
+Spatial Index Helpers
+Haversine BallTree over accident coordinates for nearest-neighbour lookups
+"""
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_radians(lats, lons):
+    """
+    Stacks latitude/longitude arrays into the (n, 2) radian layout
+    expected by the haversine metric
+    """
+    return np.radians(np.column_stack([
+        np.asarray(lats, dtype=np.float64),
+        np.asarray(lons, dtype=np.float64)
+    ]))
+
+
+def build_location_index(lats, lons, leaf_size=40):
+    """
+    Builds a BallTree using true great-circle (haversine) distance.
+    Construction is O(N log N); each query is O(log N).
+    """
+    return BallTree(to_radians(lats, lons), leaf_size=leaf_size, metric="haversine")
+
+
+def query_nearest(index, lats, lons):
+    """
+    Returns (row positions, distances in km) of the nearest indexed point
+    for every query coordinate
+    """
+    distances, positions = index.query(to_radians(lats, lons), k=1)
+    return positions[:, 0], distances[:, 0] * EARTH_RADIUS_KM
@@ -0,0 +1,222 @@
+"""
+Risk Map Tiles
+Per-tile accident aggregates for slippy maps (/tiles/{z}/{x}/{y}), served
+from a pyramid precomputed once per dataset version.
+
+Every zoom level z holds cells of the Web Mercator grid at zoom
+z + TILE_CELL_BITS (32 x 32 cells per tile by default), keyed by their
+Morton (Z-order) code. The cells inside a tile share a key prefix, so they
+sit in one contiguous, sorted run: a request is two searchsorted calls and
+a slice, O(log cells + cells in tile), and never touches the rows.
+
+The finest level is aggregated from the rows; each coarser level merges
+groups of 4 cells (key >> 2) from the level below.
+"""
+
+import os
+import hashlib
+import numpy as np
+from typing import Dict, Any, Optional
+
+from services.dataset import dataset, dataset_memoized, on_reload
+from services.serialization import to_records, round_values
+
+
+@on_reload
+def _use_dataset(df):
+    global dataset
+    dataset = df
+
+
+TILE_MIN_ZOOM = 0
+TILE_MAX_ZOOM = int(os.environ.get("TILE_MAX_ZOOM", 12))
+TILE_CELL_BITS = int(os.environ.get("TILE_CELL_BITS", 5))   # 2^5 = 32 cells per tile side
+TILE_MAX_AGE = int(os.environ.get("TILE_MAX_AGE", 300))     # Cache-Control max-age (seconds)
+
+MAX_MERCATOR_LAT = 85.05112878
+
+MEASURES = ["accident_count", "severity_sum", "severity_count", "total_casualties", "total_vehicles"]
+
+
+# ---------------------------------------------------
+# Web Mercator / Morton Codes
+# ---------------------------------------------------
+def mercator_cells(lat, lon, level):
+    """
+    Integer (x, y) cell of each coordinate on the 2^level Web Mercator grid
+    """
+
+    n = 1 << level
+    lat = np.radians(np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+
+    x = (lon + 180.0) / 360.0 * n
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * n
+
+    return (
+        np.clip(x.astype(np.int64), 0, n - 1),
+        np.clip(y.astype(np.int64), 0, n - 1)
+    )
+
+
+def cell_centers(x, y, level):
+    """
+    (lat, lon) of the centre of each (x, y) cell on the 2^level grid
+    """
+
+    n = float(1 << level)
+    lon = (x + 0.5) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * (y + 0.5) / n))))
+    return lat, lon
+
+
+def spread_bits(v):
+    v = np.asarray(v, dtype=np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF),
+                        (4, 0x0F0F0F0F0F0F0F0F), (2, 0x3333333333333333),
+                        (1, 0x5555555555555555)):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def compact_bits(v):
+    v = np.asarray(v, dtype=np.uint64) & np.uint64(0x5555555555555555)
+    for shift, mask in ((1, 0x3333333333333333), (2, 0x0F0F0F0F0F0F0F0F),
+                        (4, 0x00FF00FF00FF00FF), (8, 0x0000FFFF0000FFFF),
+                        (16, 0x00000000FFFFFFFF)):
+        v = (v | (v >> np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def morton(x, y):
+    return (spread_bits(x) | (spread_bits(y) << np.uint64(1))).astype(np.int64)
+
+
+def unmorton(keys):
+    keys = np.asarray(keys, dtype=np.uint64)
+    return compact_bits(keys).astype(np.int64), compact_bits(keys >> np.uint64(1)).astype(np.int64)
+
+
+# ---------------------------------------------------
+# Pyramid
+# ---------------------------------------------------
+def compact_counts(values):
+    return values.astype(np.int32) if len(values) == 0 or values.max() < 2 ** 31 else values
+
+
+def merge_runs(keys, measures):
+    """
+    Sums measures over runs of equal (sorted) keys; sums are stored as
+    int32 when they fit
+    """
+
+    if len(keys) == 0:
+        return keys, {name: compact_counts(values) for name, values in measures.items()}
+
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    merged = {
+        name: compact_counts(np.add.reduceat(values, starts, dtype=np.int64))
+        for name, values in measures.items()
+    }
+    return keys[starts], merged
+
+
+def build_pyramid(df) -> Dict[str, Any]:
+    """
+    {"levels": {z: {"keys", measures...}}, "fingerprint"}
+    """
+
+    lat = df["latitude"].to_numpy(dtype=np.float64)
+    lon = df["longitude"].to_numpy(dtype=np.float64)
+    located = ~(np.isnan(lat) | np.isnan(lon))
+
+    severity = df["Accident_Severity"].to_numpy(dtype=np.float64)[located]
+    known = ~np.isnan(severity)
+
+    x, y = mercator_cells(lat[located], lon[located], TILE_MAX_ZOOM + TILE_CELL_BITS)
+    keys = morton(x, y)
+    order = np.argsort(keys, kind="stable")
+
+    rows = {
+        "accident_count": np.ones(len(keys), dtype=np.int32),
+        "severity_sum": np.where(known, severity, 0.0).astype(np.int32),
+        "severity_count": known.astype(np.int32),
+        "total_casualties": np.nan_to_num(df["Number_of_Casualties"].to_numpy(dtype=np.float64)[located]).astype(np.int32),
+        "total_vehicles": np.nan_to_num(df["Number_of_Vehicles"].to_numpy(dtype=np.float64)[located]).astype(np.int32)
+    }
+
+    keys, measures = merge_runs(keys[order], {name: values[order] for name, values in rows.items()})
+    levels = {TILE_MAX_ZOOM: {"keys": keys, **measures}}
+
+    for z in range(TILE_MAX_ZOOM - 1, TILE_MIN_ZOOM - 1, -1):
+        finer = levels[z + 1]
+        keys, measures = merge_runs(finer["keys"] >> 2, {name: finer[name] for name in MEASURES})
+        levels[z] = {"keys": keys, **measures}
+
+    base = levels[TILE_MAX_ZOOM]
+    digest = hashlib.blake2b(f"{TILE_MAX_ZOOM}/{TILE_CELL_BITS}".encode(), digest_size=8)
+    for values in [base["keys"]] + [base[name] for name in MEASURES]:
+        digest.update(values.tobytes())
+
+    return {"levels": levels, "fingerprint": digest.hexdigest()}
+
+
+@dataset_memoized("tiles.pyramid", maxsize=1, copy=False)
+def tile_pyramid() -> Dict[str, Any]:
+    """
+    Pyramid for the shared dataset (read-only; built once per dataset
+    version)
+    """
+    return build_pyramid(dataset)
+
+
+# ---------------------------------------------------
+# Tiles
+# ---------------------------------------------------
+def valid_tile(z, x, y):
+    return TILE_MIN_ZOOM <= z <= TILE_MAX_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+def tile_etag(z, x, y) -> str:
+    return f'"{tile_pyramid()["fingerprint"]}-{z}-{x}-{y}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def get_tile(z, x, y) -> Dict[str, Any]:
+    """
+    Aggregates for every non-empty cell of tile (z, x, y)
+    """
+
+    level = tile_pyramid()["levels"][z]
+    span = 2 * TILE_CELL_BITS
+
+    tile_key = int(morton(np.array([x]), np.array([y]))[0])
+    start, stop = np.searchsorted(level["keys"], [tile_key << span, (tile_key + 1) << span])
+
+    cell_level = z + TILE_CELL_BITS
+    cx, cy = unmorton(level["keys"][start:stop])
+    lat, lon = cell_centers(cx, cy, cell_level)
+
+    count = level["accident_count"][start:stop]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_severity = level["severity_sum"][start:stop] / level["severity_count"][start:stop]
+
+    return {
+        "z": z,
+        "x": x,
+        "y": y,
+        "cell_zoom": cell_level,
+        "cells": to_records({
+            "lat": round_values(lat, 6),
+            "lon": round_values(lon, 6),
+            "accident_count": count,
+            "avg_severity": round_values(avg_severity, 2),
+            "total_casualties": level["total_casualties"][start:stop],
+            "total_vehicles": level["total_vehicles"][start:stop]
+        })
+    }
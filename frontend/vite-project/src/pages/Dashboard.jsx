@@ -36,6 +36,7 @@ import {
   getDashboardStatistics,
   getRiskFactors,
   getRiskyLocations,
+  getRiskyLocationAddresses,
   getSeverityAnalysis,
   getTimeTrends
 } from '../services/api';
@@ -60,7 +61,7 @@ const Dashboard = () => {
       const [stats, factors, locations, severity, trends] = await Promise.all([
         getDashboardStatistics(),
         getRiskFactors(),
-        getRiskyLocations(10),
+        getRiskyLocations(10, false),
         getSeverityAnalysis(),
         getTimeTrends()
       ]);
@@ -71,6 +72,8 @@ const Dashboard = () => {
       setSeverityAnalysis(severity);
       setTimeTrends(trends);
       
+      loadLocationAddresses(10);
+      
       toast.success('Dashboard loaded successfully!');
     } catch (error) {
       console.error('Error loading dashboard:', error);
@@ -80,6 +83,22 @@ const Dashboard = () => {
     }
   };
 
+  // Addresses arrive after the ranking; retry while lookups are pending
+  const loadLocationAddresses = async (limit, attempts = 3) => {
+    try {
+      const addresses = await getRiskyLocationAddresses(limit);
+      const byRank = Object.fromEntries(addresses.map((a) => [a.rank, a.address]));
+      setRiskyLocations((locations) =>
+        locations.map((location) => ({ ...location, address: byRank[location.rank] ?? location.address }))
+      );
+      if (attempts > 1 && addresses.some((a) => a.address_pending)) {
+        loadLocationAddresses(limit, attempts - 1);
+      }
+    } catch (error) {
+      console.error('Error loading location addresses:', error);
+    }
+  };
+
   if (loading) {
     return (
       <div className="loading-container">
@@ -417,7 +436,7 @@ const Dashboard = () => {
                   </td>
                   <td>
                     <div className="location-name" title={`${location.lat.toFixed(4)}, ${location.lon.toFixed(4)}`}>
-                      {location.address}
+                      {location.address ?? `${location.lat.toFixed(4)}, ${location.lon.toFixed(4)}`}
                     </div>
                   </td>
                   <td>
@@ -9,6 +9,82 @@ const api = axios.create({
   },
 });
 
+// ---------------------------------------------------
+// Columnar binary responses
+// ---------------------------------------------------
+// Map endpoints also answer Accept: application/vnd.risk.columnar with
+// "RCOL" + uint32 header length + JSON header + 8-byte aligned little-endian
+// column buffers (see backend/services/serialization.py).
+const COLUMNAR_MEDIA_TYPE = 'application/vnd.risk.columnar';
+
+const COLUMNAR_ARRAYS = {
+  float32: Float32Array,
+  float64: Float64Array,
+  uint8: Uint8Array,
+  uint16: Uint16Array,
+  uint32: Uint32Array,
+  int32: Int32Array,
+};
+
+// ArrayBuffer -> { rows, meta, columns: { name: TypedArray | Array } }
+export const decodeColumns = (buffer) => {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== 'RCOL') {
+    throw new Error('Not a columnar payload');
+  }
+
+  const headerLength = view.getUint32(4, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+  const body = Math.ceil((8 + headerLength) / 8) * 8;
+
+  const columns = {};
+  header.columns.forEach(({ name, dtype, offset, length, labels }) => {
+    const values = new COLUMNAR_ARRAYS[dtype](buffer, body + offset, length);
+    columns[name] = labels ? Array.from(values, (code) => labels[code]) : values;
+  });
+  return { rows: header.rows, meta: header.meta, columns };
+};
+
+// Same records the JSON response carries: NaN -> null, and float32 values
+// read back at 7 significant digits (so 0.4 stays 0.4, not 0.4000000059)
+export const columnsToRecords = ({ rows, columns }) => {
+  const names = Object.keys(columns);
+  const readers = names.map((name) => {
+    const values = columns[name];
+    if (values instanceof Float32Array) {
+      return (i) => (Number.isNaN(values[i]) ? null : Number(values[i].toPrecision(7)));
+    }
+    if (values instanceof Float64Array) {
+      return (i) => (Number.isNaN(values[i]) ? null : values[i]);
+    }
+    return (i) => values[i];
+  });
+
+  const records = new Array(rows);
+  for (let i = 0; i < rows; i++) {
+    const record = {};
+    names.forEach((name, j) => {
+      record[name] = readers[j](i);
+    });
+    records[i] = record;
+  }
+  return records;
+};
+
+const getColumnar = async (url) => {
+  const response = await api.get(url, {
+    headers: { Accept: `${COLUMNAR_MEDIA_TYPE}, application/json;q=0.5` },
+    responseType: 'arraybuffer',
+  });
+  const contentType = response.headers['content-type'] || '';
+  if (contentType.startsWith(COLUMNAR_MEDIA_TYPE)) {
+    return columnsToRecords(decodeColumns(response.data));
+  }
+  // Older servers ignore the Accept header and send JSON
+  return JSON.parse(new TextDecoder().decode(response.data));
+};
+
 // Dashboard APIs
 export const getDashboardStatistics = async () => {
   const response = await api.get('/dashboard/statistics');
@@ -20,8 +96,18 @@ export const getRiskFactors = async () => {
   return response.data;
 };
 
-export const getRiskyLocations = async (limit = 10) => {
-  const response = await api.get(`/dashboard/risky-locations?limit=${limit}`);
+export const getRiskyLocations = async (limit = 10, withAddresses = true) => {
+  const params = new URLSearchParams({ limit });
+  if (!withAddresses) {
+    params.append('addresses', 'false');
+  }
+  const response = await api.get(`/dashboard/risky-locations?${params.toString()}`);
+  return response.data;
+};
+
+// Addresses for getRiskyLocations(limit, false), by rank
+export const getRiskyLocationAddresses = async (limit = 10) => {
+  const response = await api.get(`/dashboard/risky-locations/addresses?limit=${limit}`);
   return response.data;
 };
 
@@ -30,9 +116,21 @@ export const getSeverityAnalysis = async () => {
   return response.data;
 };
 
-export const getGeoDistribution = async () => {
-  const response = await api.get('/dashboard/geo-distribution');
-  return response.data;
+// Optional map viewport { minLat, minLon, maxLat, maxLon } (e.g. from a
+// Leaflet map's getBounds()) for the map endpoints below
+const viewportParams = (params, bounds) => {
+  if (bounds) {
+    params.append('min_lat', bounds.minLat);
+    params.append('min_lon', bounds.minLon);
+    params.append('max_lat', bounds.maxLat);
+    params.append('max_lon', bounds.maxLon);
+  }
+  return params;
+};
+
+export const getGeoDistribution = async (bounds = null) => {
+  const params = viewportParams(new URLSearchParams(), bounds);
+  return getColumnar(`/dashboard/geo-distribution?${params.toString()}`);
 };
 
 export const getTimeTrends = async () => {
@@ -41,17 +139,31 @@ export const getTimeTrends = async () => {
 };
 
 // Heatmap APIs
-export const getRiskHeatmap = async (sampleSize = 1000, severity = null) => {
+export const getRiskHeatmap = async (sampleSize = 1000, severity = null, bounds = null) => {
   const params = new URLSearchParams({ sample_size: sampleSize });
   if (severity !== null) {
     params.append('severity', severity);
   }
-  const response = await api.get(`/risk_heatmap?${params.toString()}`);
+  viewportParams(params, bounds);
+  return getColumnar(`/risk_heatmap?${params.toString()}`);
+};
+
+export const getClusteredHeatmap = async (gridSize = 0.05, bounds = null) => {
+  const params = viewportParams(new URLSearchParams({ grid_size: gridSize }), bounds);
+  return getColumnar(`/risk_heatmap_clustered?${params.toString()}`);
+};
+
+// Per-tile aggregates for slippy maps (z/x/y as in Leaflet tile URLs);
+// tiles carry ETags, so the browser revalidates instead of refetching
+export const getRiskTile = async (z, x, y) => {
+  const response = await api.get(`/tiles/${z}/${x}/${y}`);
   return response.data;
 };
 
-export const getClusteredHeatmap = async (gridSize = 0.05) => {
-  const response = await api.get(`/risk_heatmap_clustered?grid_size=${gridSize}`);
+// Accident, casualty and severity totals inside { minLat, minLon, maxLat, maxLon }
+export const getAreaStats = async (bounds) => {
+  const params = viewportParams(new URLSearchParams(), bounds);
+  const response = await api.get(`/area-stats?${params.toString()}`);
   return response.data;
 };
 